@@ -0,0 +1,3 @@
+from applepassgenerator.cli import main
+
+main()
@@ -1,17 +1,36 @@
 # Standard Library
+import asyncio
 import decimal
 import hashlib
 import json
-import zipfile
+import time
 from io import BytesIO
 from uuid import uuid4
 
 # Third Party Stuff
-from cryptography import x509
-from cryptography.hazmat.primitives import hashes, serialization
-from cryptography.hazmat.primitives.serialization import pkcs7
+from cryptography.hazmat.primitives import hashes
+
+from applepassgenerator.archive import (
+    FIXED_DATE_TIME,
+    ZIP_STORED,
+    ZipEntry,
+    iter_zip,
+    write_zip,
+    write_zip_async,
+    write_zip_bytes,
+    write_zip_bytes_async,
+)
+from applepassgenerator.assets import Asset, FileAsset
+from applepassgenerator.instrumentation import (
+    MANIFEST,
+    PASS_JSON,
+    SIGNATURE,
+    ZIP,
+    _call,
+)
+from applepassgenerator.signer import Signer
+from applepassgenerator.utils import Barcode, BarcodeFormat
 
-from applepassgenerator.utils import BarcodeFormat
 
 # The full reference can be found here: https://developer.apple.com/documentation/walletpasses/pass
 class ApplePass(object):
@@ -22,6 +41,12 @@ class ApplePass(object):
         pass_type_identifier="",
         organization_name="",
         team_identifier="",
+        signer=None,
+        compression=ZIP_STORED,
+        compresslevel=None,
+        instrumentation=None,
+        deterministic=False,
+        cache=None,
     ):
 
         self._files = {}  # Holds the files to include in the .pkpass
@@ -94,81 +119,389 @@ class ApplePass(object):
         self.voided = None
 
         self.pass_information = pass_information
-    
+
+        # Optional. Reusable Signer used by create() when none is passed
+        self.signer = signer
+
+        # Archive compression, ZIP_STORED or ZIP_DEFLATED (with zlib level)
+        self.compression = compression
+        self.compresslevel = compresslevel
+
+        # Optional. Instrumentation receiving the timing of each create() stage
+        self.instrumentation = instrumentation
+
+        # If true, identical content always gives the same archive: fixed
+        # timestamps, files sorted by name and sorted JSON keys. The PKCS7
+        # signature still holds its signing time, use a cache to get the
+        # exact same bytes back.
+        self.deterministic = deterministic
+
+        # Optional. MemoryPassCache or DiskPassCache of created archives, a
+        # pass whose content is in the cache isn't signed again
+        self.cache = cache
+
+        # Content hash of the archive of the last create() with a cache,
+        # usable as an HTTP ETag. None when created without a cache.
+        self.etag = None
+
+    # The signer isn't pickled with the pass, batch workers use their own.
+    # Neither are the instrumentation and the cache: they hold locks, and
+    # what worker processes would record or store never reaches the parent.
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["signer"] = None
+        state["instrumentation"] = None
+        state["cache"] = None
+        return state
+
     # Adds file to the file array
+    # fd can also be a path or a buffer (bytes, mmap, ...), which are only
+    # read, in chunks, when the pass is created (see FileAsset)
     def add_file(self, name, fd):
-        self._files[name] = fd.read()
+        if hasattr(fd, "read"):
+            self._files[name] = fd.read()
+        else:
+            self._files[name] = FileAsset(fd)
+
+    # Reads the file at path without blocking the event loop and adds it
+    async def add_file_async(self, name, path, executor=None):
+        loop = asyncio.get_running_loop()
+        self._files[name] = await loop.run_in_executor(executor, _read_file, path)
+
+    # Adds a shared Asset (see AssetStore), its bytes and SHA1 are reused as is
+    def add_asset(self, name, asset):
+        self._files[name] = asset
+
+    # Adds the xx.lproj/ files (pass.strings, localized images) of a
+    # Localization, shared by every pass it is added to
+    def add_localization(self, localization):
+        self._files.update(localization.files)
 
     # Creates the actual .pkpass file
-    def create(self, certificate, key, wwdr_certificate, password, zip_file=None):
-        pass_json = self._create_pass_json()
-        print(pass_json)
-        manifest = self._create_manifest(pass_json)
-        signature = self._create_signature_crypto(
-            manifest, certificate, key, wwdr_certificate, password
+    # Either pass the certificate paths or a prebuilt Signer (recommended
+    # when creating many passes, the keys are then only loaded once).
+    # With return_etag, returns (zip_file, etag): the content hash of the
+    # archive when it is cached, else None. Prefer it to reading self.etag
+    # back when the same pass may be created from several threads.
+    def create(
+        self,
+        certificate=None,
+        key=None,
+        wwdr_certificate=None,
+        password=None,
+        zip_file=None,
+        signer=None,
+        instrumentation=None,
+        cache=None,
+        return_etag=False,
+    ):
+        signer = self._get_signer(signer, certificate, key, wwdr_certificate, password)
+        instrumentation = instrumentation or self.instrumentation
+        measure = instrumentation.measure if instrumentation else _call
+        pass_json = measure(PASS_JSON, self._create_pass_json)
+        zip_file, self.etag = self._create_from_pass_json(
+            pass_json, signer, zip_file, instrumentation, cache
+        )
+        return (zip_file, self.etag) if return_etag else zip_file
+
+    # Asynchronous create(). Key loading, manifest hashing, signing and zip
+    # construction run in the executor (the loop's default thread pool when
+    # None) so the event loop is never blocked. Cancelling the task stops it
+    # between stages.
+    async def create_async(
+        self,
+        certificate=None,
+        key=None,
+        wwdr_certificate=None,
+        password=None,
+        zip_file=None,
+        signer=None,
+        executor=None,
+        instrumentation=None,
+        cache=None,
+        return_etag=False,
+    ):
+        loop = asyncio.get_running_loop()
+        signer = signer or self.signer
+        if signer is None:
+            signer = await loop.run_in_executor(
+                executor, Signer, certificate, key, wwdr_certificate, password
+            )
+        instrumentation = instrumentation or self.instrumentation
+        measure = instrumentation.measure if instrumentation else _call
+        pass_json = measure(PASS_JSON, self._create_pass_json)
+        manifest = await loop.run_in_executor(
+            executor, measure, MANIFEST, self._create_manifest, pass_json
+        )
+        if cache is None:
+            cache = self.cache
+        etag = self._cache_key(manifest, signer, cache)
+        data = None
+        if etag is not None:
+            data = await loop.run_in_executor(executor, cache.get, etag)
+
+        if not zip_file:
+            zip_file = BytesIO()
+        if data is None:
+            signature = await loop.run_in_executor(
+                executor, measure, SIGNATURE, signer.sign, manifest
+            )
+            if etag is None:
+                await loop.run_in_executor(
+                    executor,
+                    measure,
+                    ZIP,
+                    self._create_zip,
+                    pass_json,
+                    manifest,
+                    signature,
+                    zip_file,
+                )
+            else:
+                data = await loop.run_in_executor(
+                    executor,
+                    measure,
+                    ZIP,
+                    self._cache_archive,
+                    cache,
+                    etag,
+                    pass_json,
+                    manifest,
+                    signature,
+                )
+        if data is not None:
+            await loop.run_in_executor(executor, write_zip_bytes, zip_file, data)
+        self.etag = etag
+        return (zip_file, etag) if return_etag else zip_file
+
+    # Streams the .pkpass to any sink (file, socket or callable taking bytes)
+    # without building the archive in memory, the peak memory is bounded by
+    # the largest single file of the pass. Cached passes are built in memory
+    # once, to be stored.
+    def stream(
+        self,
+        sink,
+        certificate=None,
+        key=None,
+        wwdr_certificate=None,
+        password=None,
+        signer=None,
+        instrumentation=None,
+        cache=None,
+    ):
+        self.create(
+            certificate,
+            key,
+            wwdr_certificate,
+            password,
+            zip_file=sink,
+            signer=signer,
+            instrumentation=instrumentation,
+            cache=cache,
+        )
+
+    # Same as stream() for asynchronous sinks (e.g. asyncio.StreamWriter)
+    async def stream_async(
+        self,
+        sink,
+        certificate=None,
+        key=None,
+        wwdr_certificate=None,
+        password=None,
+        signer=None,
+        instrumentation=None,
+        cache=None,
+    ):
+        instrumentation = instrumentation or self.instrumentation
+        data, entries = self._signed_archive(
+            signer, certificate, key, wwdr_certificate, password, instrumentation, cache
+        )
+        if data is not None:
+            await write_zip_bytes_async(sink, data)
+            return
+        start = time.perf_counter()
+        size = await write_zip_async(sink, entries)
+        if instrumentation:
+            instrumentation.record(ZIP, time.perf_counter() - start, size)
+
+    # Yields the .pkpass in chunks, usable as a WSGI response body or to
+    # build the body messages of an ASGI response
+    def iter_chunks(
+        self,
+        certificate=None,
+        key=None,
+        wwdr_certificate=None,
+        password=None,
+        signer=None,
+        instrumentation=None,
+        cache=None,
+    ):
+        instrumentation = instrumentation or self.instrumentation
+        data, entries = self._signed_archive(
+            signer, certificate, key, wwdr_certificate, password, instrumentation, cache
         )
+        if data is not None:
+            return iter([data])
+        if not instrumentation:
+            return iter_zip(entries)
+        return instrumentation.measure_chunks(ZIP, iter_zip(entries))
+
+    def _get_signer(self, signer, certificate, key, wwdr_certificate, password):
+        signer = signer or self.signer
+        if signer is None:
+            signer = Signer(certificate, key, wwdr_certificate, password)
+        return signer
+
+    def _signed_archive(
+        self,
+        signer,
+        certificate,
+        key,
+        wwdr_certificate,
+        password,
+        instrumentation,
+        cache,
+    ):
+        """
+        :returns (archive bytes, None) when the pass is cached, otherwise
+            (None, the zip entries to write)
+        """
+        signer = self._get_signer(signer, certificate, key, wwdr_certificate, password)
+        measure = instrumentation.measure if instrumentation else _call
+        if cache is None:
+            cache = self.cache
+        pass_json = measure(PASS_JSON, self._create_pass_json)
+        manifest = measure(MANIFEST, self._create_manifest, pass_json)
+        etag = self._cache_key(manifest, signer, cache)
+        data = cache.get(etag) if etag is not None else None
+        if data is not None:
+            return data, None
+        signature = measure(SIGNATURE, signer.sign, manifest)
+        if etag is not None:
+            args = (cache, etag, pass_json, manifest, signature)
+            return measure(ZIP, self._cache_archive, *args), None
+        return None, self._zip_entries(pass_json, manifest, signature)
+
+    # Manifest, signature and archive for an already serialized pass.json.
+    # Nothing is stored on the pass, templates render from several threads.
+    def _create_from_pass_json(
+        self, pass_json, signer, zip_file=None, instrumentation=None, cache=None
+    ):
+        """
+        :returns (zip_file or a BytesIO, etag or None)
+        """
+        instrumentation = instrumentation or self.instrumentation
+        measure = instrumentation.measure if instrumentation else _call
+        if cache is None:
+            cache = self.cache
+        manifest = measure(MANIFEST, self._create_manifest, pass_json)
 
         if not zip_file:
             zip_file = BytesIO()
-        self._create_zip(pass_json, manifest, signature, zip_file=zip_file)
-        return zip_file
+        etag = self._cache_key(manifest, signer, cache)
+        data = cache.get(etag) if etag is not None else None
+        if data is None:
+            signature = measure(SIGNATURE, signer.sign, manifest)
+            if etag is None:
+                measure(ZIP, self._create_zip, pass_json, manifest, signature, zip_file)
+                return zip_file, None
+            args = (cache, etag, pass_json, manifest, signature)
+            data = measure(ZIP, self._cache_archive, *args)
+        write_zip_bytes(zip_file, data)
+        return zip_file, etag
+
+    def _cache_key(self, manifest, signer, cache):
+        """
+        :returns the content hash the archive is cached under, None when it
+            isn't cached
+        """
+        if cache is None:
+            return None
+        return self._content_hash(manifest, signer)
+
+    def _cache_archive(self, cache, etag, pass_json, manifest, signature):
+        archive = BytesIO()
+        self._create_zip(pass_json, manifest, signature, archive)
+        data = archive.getvalue()
+        cache.set(etag, data)
+        return data
+
+    def _content_hash(self, manifest, signer):
+        """
+        Hash of pass.json and the files (through their manifest hashes), the
+        signing certificate and archive settings: equal hashes mean equal
+        archives, apart from the signing time.
+        :returns None for signers with neither a fingerprint nor a
+            certificate, whose archives can't be cached
+        """
+        fingerprint = getattr(signer, "fingerprint", None)
+        if fingerprint is None:
+            certificate = getattr(signer, "certificate", None)
+            if certificate is None:
+                return None
+            fingerprint = certificate.fingerprint(hashes.SHA256()).hex()
+        content = hashlib.sha1(manifest.encode("utf-8"))
+        content.update(fingerprint.encode("ascii"))
+        content.update(
+            f"{self.compression}:{self.compresslevel}:{self.deterministic}".encode()
+        )
+        return content.hexdigest()
 
     def _create_pass_json(self):
-        return json.dumps(self, default=pass_handler)
+        return json.dumps(self, default=pass_handler, sort_keys=self.deterministic)
 
     def _create_manifest(self, pass_json):
         """
         Creates the hashes for all the files included in the pass file.
         """
-        self._hashes["pass.json"] = hashlib.sha1(pass_json.encode("utf-8")).hexdigest()
+        # Kept local, nothing is stored on the pass: templates render from
+        # several threads
+        hashes = {"pass.json": hashlib.sha1(pass_json.encode("utf-8")).hexdigest()}
         for filename, filedata in self._files.items():
-            self._hashes[filename] = hashlib.sha1(filedata).hexdigest()
-        return json.dumps(self._hashes)
-
-    def _read_file_bytes(self, path):
-        """
-        Utility function to read files as byte data
-        :param path: file path
-        :returns bytes
-        """
-        file = open(path)
-        return file.read().encode("UTF-8")
+            if isinstance(filedata, Asset):
+                hashes[filename] = filedata.sha1
+            else:
+                hashes[filename] = hashlib.sha1(filedata).hexdigest()
+        return json.dumps(hashes, sort_keys=self.deterministic)
 
     def _create_signature_crypto(
         self, manifest, certificate, key, wwdr_certificate, password
     ):
         """
         Creates a signature (DER encoded) of the manifest.
-        Rewritten to use cryptography library instead of M2Crypto
         The manifest is the file
         containing a list of files included in the pass file (and their hashes).
+        Loads the signing material on every call, prefer a reusable Signer.
         """
-        cert = x509.load_pem_x509_certificate(self._read_file_bytes(certificate))
-        priv_key = serialization.load_pem_private_key(
-            self._read_file_bytes(key), password=password.encode("UTF-8")
-        )
-        wwdr_cert = x509.load_pem_x509_certificate(
-            self._read_file_bytes(wwdr_certificate)
-        )
-
-        options = [pkcs7.PKCS7Options.DetachedSignature]
-        return (
-            pkcs7.PKCS7SignatureBuilder()
-            .set_data(manifest.encode("UTF-8"))
-            .add_signer(cert, priv_key, hashes.SHA256())
-            .add_certificate(wwdr_cert)
-            .sign(serialization.Encoding.DER, options)
-        )
+        return Signer(certificate, key, wwdr_certificate, password).sign(manifest)
 
     # Creates .pkpass (zip archive)
+    # Returns the size of the archive in bytes
     def _create_zip(self, pass_json, manifest, signature, zip_file=None):
-        zf = zipfile.ZipFile(zip_file or "pass.pkpass", "w")
-        zf.writestr("signature", signature)
-        zf.writestr("manifest.json", manifest)
-        zf.writestr("pass.json", pass_json)
-        for filename, filedata in self._files.items():
-            zf.writestr(filename, filedata)
-        zf.close()
+        return write_zip(
+            zip_file or "pass.pkpass",
+            self._zip_entries(pass_json, manifest, signature),
+        )
+
+    def _zip_entries(self, pass_json, manifest, signature):
+        """
+        Yields the archive members. Assets reuse their cached compressed
+        entry, everything else is compressed for this pass only.
+        """
+        options = (self.compression, self.compresslevel)
+        if self.deterministic:
+            options += (FIXED_DATE_TIME,)
+            files = sorted(self._files.items())
+        else:
+            files = self._files.items()
+        yield ZipEntry.compress("signature", signature, *options)
+        yield ZipEntry.compress("manifest.json", manifest, *options)
+        yield ZipEntry.compress("pass.json", pass_json, *options)
+        for filename, filedata in files:
+            if isinstance(filedata, Asset):
+                yield filedata.zip_entry(filename, *options)
+            else:
+                yield ZipEntry.compress(filename, filedata, *options)
 
     def json_dict(self):
         d = {
@@ -193,7 +526,9 @@ class ApplePass(object):
             new_barcodes = [self.barcode.json_dict()]
             if self.barcode.format not in original_formats:
                 legacy_barcode = Barcode(
-                    self.barcode.message, BarcodeFormat.PDF417, self.barcode.altText
+                    self.barcode.message,
+                    BarcodeFormat.PDF417,
+                    getattr(self.barcode, "altText", ""),
                 )
             d.update({"barcodes": new_barcodes})
             d.update({"barcode": legacy_barcode})
@@ -232,6 +567,11 @@ class ApplePass(object):
         return d
 
 
+def _read_file(path):
+    with open(path, "rb") as fd:
+        return fd.read()
+
+
 def pass_handler(obj):
     if hasattr(obj, "json_dict"):
         return obj.json_dict()
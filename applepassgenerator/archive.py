@@ -0,0 +1,306 @@
+# Standard Library
+import inspect
+import struct
+import time
+import zipfile
+import zlib
+from io import BytesIO
+
+ZIP_STORED = zipfile.ZIP_STORED
+ZIP_DEFLATED = zipfile.ZIP_DEFLATED
+
+# Same values zipfile uses for the members it writes
+_VERSION = 20
+_CREATE_SYSTEM = 3  # Unix
+_EXTERNAL_ATTR = 0o600 << 16
+_UTF8_FLAG = 0x800
+
+# Timestamp of every member of deterministic archives (the zip epoch)
+FIXED_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+
+_LOCAL_HEADER = struct.Struct("<4s2B4HL2L2H")
+_CENTRAL_HEADER = struct.Struct("<4s4B4HL2L5H2L")
+_END_OF_CENTRAL_DIR = struct.Struct("<4s4H2LH")
+
+
+def _dos_date_time(date_time):
+    year, month, day, hour, minute, second = date_time
+    dos_date = (year - 1980) << 9 | month << 5 | day
+    dos_time = hour << 11 | minute << 5 | second // 2
+    return dos_date, dos_time
+
+
+def _compressor(compresslevel=None):
+    level = zlib.Z_DEFAULT_COMPRESSION if compresslevel is None else compresslevel
+    return zlib.compressobj(level, zlib.DEFLATED, -15)
+
+
+def iter_compressed(chunks, compression=ZIP_STORED, compresslevel=None):
+    """
+    Yields the payload of an archive member from its uncompressed chunks,
+    compressing them one by one.
+    """
+    if compression == ZIP_STORED:
+        yield from chunks
+    elif compression == ZIP_DEFLATED:
+        compressor = _compressor(compresslevel)
+        for chunk in chunks:
+            data = compressor.compress(chunk)
+            if data:
+                yield data
+        yield compressor.flush()
+    else:
+        raise ValueError(f"Unsupported compression {compression!r}")
+
+
+class ZipEntry(object):
+    """ An already compressed archive member.
+
+    The local file header, CRC32 and compressed payload are computed once, so
+    the same entry can be spliced raw into any number of archives.
+    Subclasses may produce the payload lazily by overriding iter_payload(),
+    compress_size must then be given.
+    """
+
+    def __init__(
+        self,
+        name,
+        payload,
+        crc,
+        file_size,
+        compress_type,
+        date_time,
+        compress_size=None,
+    ):
+        self.name = name
+        self.payload = payload
+        self.compress_size = len(payload) if compress_size is None else compress_size
+        self.crc = crc
+        self.file_size = file_size
+        self.compress_type = compress_type
+        self.date_time = date_time
+
+        self._encoded_name = name.encode("utf-8")
+        self._flags = 0 if name.isascii() else _UTF8_FLAG
+        self._dos_date, self._dos_time = _dos_date_time(date_time)
+        self.header = _LOCAL_HEADER.pack(
+            b"PK\x03\x04",
+            _VERSION,
+            0,
+            self._flags,
+            compress_type,
+            self._dos_time,
+            self._dos_date,
+            crc,
+            self.compress_size,
+            file_size,
+            len(self._encoded_name),
+            0,
+        ) + self._encoded_name
+
+    @classmethod
+    def compress(
+        cls, name, data, compression=ZIP_STORED, compresslevel=None, date_time=None
+    ):
+        """
+        Builds an entry from uncompressed data.
+        :param compression: ZIP_STORED or ZIP_DEFLATED
+        :param compresslevel: zlib level (0-9) for ZIP_DEFLATED, default 6
+        :param date_time: (year, month, day, hour, minute, second), defaults
+            to the current local time like zipfile does
+        """
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        if compression == ZIP_DEFLATED:
+            compressor = _compressor(compresslevel)
+            payload = compressor.compress(data) + compressor.flush()
+        elif compression == ZIP_STORED:
+            payload = data
+        else:
+            raise ValueError(f"Unsupported compression {compression!r}")
+        return cls(
+            name,
+            payload,
+            zlib.crc32(data),
+            len(data),
+            compression,
+            date_time or time.localtime(time.time())[:6],
+        )
+
+    def central_header(self, offset):
+        return _CENTRAL_HEADER.pack(
+            b"PK\x01\x02",
+            _VERSION,
+            _CREATE_SYSTEM,
+            _VERSION,
+            0,
+            self._flags,
+            self.compress_type,
+            self._dos_time,
+            self._dos_date,
+            self.crc,
+            self.compress_size,
+            self.file_size,
+            len(self._encoded_name),
+            0,
+            0,
+            0,
+            0,
+            _EXTERNAL_ATTR,
+            offset,
+        ) + self._encoded_name
+
+    def iter_payload(self):
+        """
+        Yields the compressed payload, in one or more chunks.
+        """
+        yield self.payload
+
+    def __len__(self):
+        # Bytes taken by the entry in the archive (local header and payload)
+        return len(self.header) + self.compress_size
+
+
+def iter_zip(entries):
+    """
+    Yields the bytes of a zip archive made of the given ZipEntry objects.
+    """
+    offset = 0
+    central_directory = []
+    for entry in entries:
+        yield entry.header
+        yield from entry.iter_payload()
+        central_directory.append(entry.central_header(offset))
+        offset += len(entry)
+
+    count = len(central_directory)
+    if count > 0xFFFF or offset > 0xFFFFFFFF:
+        raise ValueError("Archive too large, zip64 is not supported")
+    central_directory = b"".join(central_directory)
+    yield central_directory
+    yield _END_OF_CENTRAL_DIR.pack(
+        b"PK\x05\x06", 0, 0, count, count, len(central_directory), offset, 0
+    )
+
+
+def read_entries(zip_file):
+    """
+    Reads the members of an existing archive without decompressing them.
+    :param zip_file: path, bytes or seekable binary file object
+    :returns list of ZipEntry, in archive order, that can be spliced raw
+        into a new archive
+    :raises zipfile.BadZipFile: for corrupted or truncated archives
+    """
+    if isinstance(zip_file, (bytes, bytearray, memoryview)):
+        zip_file = BytesIO(zip_file)
+    if isinstance(zip_file, str) or hasattr(zip_file, "__fspath__"):
+        with open(zip_file, "rb") as fd:
+            return read_entries(fd)
+
+    entries = []
+    with zipfile.ZipFile(zip_file) as archive:
+        for info in archive.infolist():
+            # The payload starts after the local header and its variable fields
+            zip_file.seek(info.header_offset)
+            header = zip_file.read(_LOCAL_HEADER.size)
+            if len(header) < _LOCAL_HEADER.size or header[:4] != b"PK\x03\x04":
+                raise zipfile.BadZipFile(f"Bad local header for {info.filename}")
+            name_length, extra_length = _LOCAL_HEADER.unpack(header)[-2:]
+            zip_file.seek(name_length + extra_length, 1)
+            payload = zip_file.read(info.compress_size)
+            if len(payload) < info.compress_size:
+                raise zipfile.BadZipFile(f"Truncated data for {info.filename}")
+            entries.append(
+                ZipEntry(
+                    info.filename,
+                    payload,
+                    info.CRC,
+                    info.file_size,
+                    info.compress_type,
+                    info.date_time,
+                )
+            )
+    return entries
+
+
+def decompress(entry):
+    """
+    :returns the uncompressed data of a ZipEntry
+    """
+    if entry.compress_type == ZIP_STORED:
+        return entry.payload
+    if entry.compress_type == ZIP_DEFLATED:
+        return zlib.decompress(entry.payload, -15)
+    raise ValueError(f"Unsupported compression {entry.compress_type!r}")
+
+
+def _get_write(sink):
+    # Files and file-like objects have write(), sockets sendall()
+    if hasattr(sink, "write"):
+        return sink.write
+    if hasattr(sink, "sendall"):
+        return sink.sendall
+    if callable(sink):
+        return sink
+    raise TypeError(f"Can't write an archive to {sink!r}")
+
+
+def write_zip(zip_file, entries):
+    """
+    Writes a zip archive made of the given ZipEntry objects, entry by entry.
+    :param zip_file: path, writable binary file object, socket or callable
+        taking bytes
+    :returns the size of the archive in bytes
+    """
+    if isinstance(zip_file, (str, bytes)) or hasattr(zip_file, "__fspath__"):
+        with open(zip_file, "wb") as fd:
+            return write_zip(fd, entries)
+    write = _get_write(zip_file)
+    size = 0
+    for chunk in iter_zip(entries):
+        write(chunk)
+        size += len(chunk)
+    return size
+
+
+def write_zip_bytes(zip_file, data):
+    """
+    Writes an already built archive to the same targets as write_zip().
+    """
+    if isinstance(zip_file, (str, bytes)) or hasattr(zip_file, "__fspath__"):
+        with open(zip_file, "wb") as fd:
+            fd.write(data)
+    else:
+        _get_write(zip_file)(data)
+
+
+async def write_zip_async(sink, entries):
+    """
+    Writes a zip archive to an asynchronous sink, entry by entry.
+    :param sink: object with a write() method or a callable taking bytes,
+        either of them may return an awaitable. A drain() coroutine (like
+        asyncio.StreamWriter has) is awaited after each chunk.
+    :returns the size of the archive in bytes
+    """
+    return await _write_chunks_async(sink, iter_zip(entries))
+
+
+async def write_zip_bytes_async(sink, data):
+    """
+    Writes an already built archive to the same sinks as write_zip_async().
+    """
+    await _write_chunks_async(sink, [data])
+
+
+async def _write_chunks_async(sink, chunks):
+    write = _get_write(sink)
+    drain = getattr(sink, "drain", None)
+    size = 0
+    for chunk in chunks:
+        result = write(chunk)
+        if inspect.isawaitable(result):
+            await result
+        if drain is not None:
+            await drain()
+        size += len(chunk)
+    return size
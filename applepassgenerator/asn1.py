@@ -0,0 +1,115 @@
+"""
+Minimal DER reader and writer for the CMS/PKCS7 structures used by pass
+signatures.
+"""
+
+# Universal tags
+INTEGER = 0x02
+OCTET_STRING = 0x04
+OBJECT_IDENTIFIER = 0x06
+UTC_TIME = 0x17
+GENERALIZED_TIME = 0x18
+SEQUENCE = 0x30
+SET = 0x31
+# [0] IMPLICIT, constructed
+CONTEXT_0 = 0xA0
+
+
+class Element(object):
+    """A DER element: tag, and offsets of its header and content in data."""
+
+    __slots__ = ("data", "tag", "start", "content_start", "end")
+
+    def __init__(self, data, tag, start, content_start, end):
+        self.data = data
+        self.tag = tag
+        self.start = start
+        self.content_start = content_start
+        self.end = end
+
+    @property
+    def der(self):
+        # Whole element, header included
+        return bytes(self.data[self.start : self.end])
+
+    @property
+    def content(self):
+        return bytes(self.data[self.content_start : self.end])
+
+    def children(self):
+        """
+        :returns the elements of a constructed element (SEQUENCE, SET, ...)
+        """
+        children = []
+        offset = self.content_start
+        while offset < self.end:
+            child = parse(self.data, offset)
+            children.append(child)
+            offset = child.end
+        return children
+
+
+def parse(data, offset=0):
+    """
+    Reads the DER element starting at offset.
+    :returns Element
+    """
+    try:
+        tag = data[offset]
+        length = data[offset + 1]
+        content_start = offset + 2
+        if length & 0x80:
+            size = length & 0x7F
+            if not 0 < size <= 4:
+                raise ValueError("Unsupported DER length")
+            length = int.from_bytes(data[content_start : content_start + size], "big")
+            content_start += size
+    except IndexError:
+        raise ValueError("Truncated DER data")
+    end = content_start + length
+    if end > len(data):
+        raise ValueError("Truncated DER data")
+    return Element(data, tag, offset, content_start, end)
+
+
+def decode_oid(content):
+    """
+    :returns the dotted string of an OBJECT IDENTIFIER content
+    """
+    values = []
+    value = 0
+    for byte in content:
+        value = value << 7 | byte & 0x7F
+        if not byte & 0x80:
+            values.append(value)
+            value = 0
+    first = min(values[0] // 40, 2)
+    return ".".join(str(v) for v in [first, values[0] - first * 40] + values[1:])
+
+
+def decode_integer(content):
+    return int.from_bytes(content, "big", signed=True)
+
+
+def encode_length(length):
+    if length < 0x80:
+        return bytes((length,))
+    size = (length.bit_length() + 7) // 8
+    return bytes((0x80 | size,)) + length.to_bytes(size, "big")
+
+
+def encode(tag, content):
+    """
+    :returns the DER element of tag with content (bytes)
+    """
+    return bytes((tag,)) + encode_length(len(content)) + content
+
+
+def encode_time(value):
+    """
+    Encodes a UTC datetime as UTCTime, or GeneralizedTime outside of
+    1950-2049 (RFC 5280).
+    """
+    if 1950 <= value.year < 2050:
+        return encode(UTC_TIME, value.strftime("%y%m%d%H%M%SZ").encode("ascii"))
+    return encode(GENERALIZED_TIME, value.strftime("%Y%m%d%H%M%SZ").encode("ascii"))
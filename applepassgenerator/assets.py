@@ -0,0 +1,268 @@
+# Standard Library
+import hashlib
+import mmap
+import os
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from functools import partial
+
+from applepassgenerator.archive import ZIP_STORED, ZipEntry, iter_compressed
+
+# Files of at least MMAP_THRESHOLD bytes are mapped in memory rather than read
+MMAP_THRESHOLD = 1024 * 1024
+CHUNK_SIZE = 64 * 1024
+
+
+class Asset(object):
+    """ File content shared by many passes, with its SHA1 computed once.
+
+    Add it to passes with ApplePass.add_asset(). Passes only keep a reference
+    to the asset, the bytes are never copied per pass.
+    """
+
+    def __init__(self, data, sha1=None):
+        self.data = data
+        self.sha1 = sha1 or hashlib.sha1(data).hexdigest()
+        # Compressed ZipEntry per (name, compression, level), built on first use
+        self._zip_entries = {}
+
+    @property
+    def size(self):
+        return len(self.data)
+
+    def zip_entry(self, name, compression, compresslevel=None, date_time=None):
+        """
+        Returns the cached compressed entry of the asset stored under name.
+        """
+        key = (name, compression, compresslevel, date_time)
+        entry = self._zip_entries.get(key)
+        if entry is None:
+            entry = ZipEntry.compress(
+                name, self.data, compression, compresslevel, date_time
+            )
+            self._zip_entries[key] = entry
+        return entry
+
+
+class FileAsset(Asset):
+    """Asset only read when it is hashed or zipped.
+
+    The source is a file path or a buffer (bytes, memoryview, mmap, ...).
+    Passes only keep the path or a view of the buffer, so the memory of a
+    pending pass doesn't depend on the size of its files. Content is hashed
+    and written in chunks of CHUNK_SIZE bytes, large files through mmap.
+    Compressed payloads aren't kept: ZIP_DEFLATED members are compressed
+    again, chunk by chunk, each time they are written.
+    """
+
+    def __init__(self, source, sha1=None):
+        if isinstance(source, (str, os.PathLike)):
+            self.path = os.fspath(source)
+            self.buffer = None
+        else:
+            self.path = None
+            self.buffer = memoryview(source).cast("B")
+        self._sha1 = sha1
+        self._crc = None
+        self._size = None
+        # (mtime, size) of the file when it was first read
+        self._stat = None
+        self._compress_sizes = {}
+        self._zip_entries = {}
+
+    @property
+    def sha1(self):
+        if self._sha1 is None:
+            self._scan()
+        return self._sha1
+
+    @property
+    def size(self):
+        if self._size is None:
+            self._scan()
+        return self._size
+
+    @property
+    def data(self):
+        # Whole content, prefer iter_chunks()
+        return b"".join(self.iter_chunks())
+
+    def iter_chunks(self):
+        """
+        Yields the content in chunks of at most CHUNK_SIZE bytes.
+        """
+        if self.buffer is not None:
+            for offset in range(0, len(self.buffer), CHUNK_SIZE):
+                yield self.buffer[offset : offset + CHUNK_SIZE]
+            return
+
+        with open(self.path, "rb") as fd:
+            stat = os.fstat(fd.fileno())
+            if self._stat is None:
+                self._stat = (stat.st_mtime_ns, stat.st_size)
+            elif self._stat != (stat.st_mtime_ns, stat.st_size):
+                raise ValueError(f"{self.path} changed since it was hashed")
+            if stat.st_size >= MMAP_THRESHOLD:
+                with mmap.mmap(fd.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    for offset in range(0, len(mapped), CHUNK_SIZE):
+                        yield mapped[offset : offset + CHUNK_SIZE]
+            else:
+                yield from iter(partial(fd.read, CHUNK_SIZE), b"")
+
+    def scan(self):
+        """
+        Hashes the content now rather than when the first pass is created.
+        :returns self
+        """
+        if self._size is None:
+            self._scan()
+        return self
+
+    def _scan(self):
+        # SHA1, CRC32 and size in a single pass over the content
+        sha1 = hashlib.sha1()
+        crc = 0
+        size = 0
+        for chunk in self.iter_chunks():
+            sha1.update(chunk)
+            crc = zlib.crc32(chunk, crc)
+            size += len(chunk)
+        self._sha1 = self._sha1 or sha1.hexdigest()
+        self._crc = crc
+        self._size = size
+
+    def _compress_size(self, compression, compresslevel):
+        if compression == ZIP_STORED:
+            return self.size
+        key = (compression, compresslevel)
+        if key not in self._compress_sizes:
+            chunks = iter_compressed(self.iter_chunks(), compression, compresslevel)
+            self._compress_sizes[key] = sum(len(chunk) for chunk in chunks)
+        return self._compress_sizes[key]
+
+    def zip_entry(self, name, compression, compresslevel=None, date_time=None):
+        """
+        Returns the cached entry of the asset stored under name, its payload
+        is read (and compressed) from the source when the archive is written.
+        """
+        key = (name, compression, compresslevel, date_time)
+        entry = self._zip_entries.get(key)
+        if entry is None:
+            if self._crc is None:
+                self._scan()
+            entry = _FileZipEntry(self, name, compression, compresslevel, date_time)
+            self._zip_entries[key] = entry
+        return entry
+
+    # Views can't be pickled, worker processes get a copy of buffers
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        if self.buffer is not None:
+            state["buffer"] = self.buffer.tobytes()
+        state["_zip_entries"] = {}
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if self.buffer is not None:
+            self.buffer = memoryview(self.buffer)
+
+
+class _FileZipEntry(ZipEntry):
+    """Archive member streaming the content of a FileAsset."""
+
+    def __init__(self, asset, name, compression, compresslevel, date_time):
+        self.asset = asset
+        self.compresslevel = compresslevel
+        ZipEntry.__init__(
+            self,
+            name,
+            None,
+            asset._crc,
+            asset._size,
+            compression,
+            date_time or time.localtime(time.time())[:6],
+            asset._compress_size(compression, compresslevel),
+        )
+
+    def iter_payload(self):
+        return iter_compressed(
+            self.asset.iter_chunks(), self.compress_type, self.compresslevel
+        )
+
+
+class AssetStore(object):
+    """ Content-addressed registry of Assets with size-bounded LRU eviction.
+
+    Identical content is only stored (and hashed) once, whatever the number
+    of passes or file names referencing it. When the stored bytes exceed
+    max_bytes the least recently used assets are dropped from the store;
+    passes already referencing them keep working.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._assets = OrderedDict()  # SHA1 -> Asset, least recently used first
+        self._paths = {}  # path -> (mtime, file size, SHA1) of loaded files
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._assets)
+
+    def __contains__(self, sha1):
+        return sha1 in self._assets
+
+    def get(self, sha1):
+        with self._lock:
+            asset = self._assets.get(sha1)
+            if asset is not None:
+                self._assets.move_to_end(sha1)
+            return asset
+
+    def add(self, data):
+        """
+        Registers content and returns its shared Asset.
+        :param data: bytes or a file object opened in binary mode
+        :returns Asset
+        """
+        if hasattr(data, "read"):
+            data = data.read()
+        return self._add(Asset(data))
+
+    def load(self, path):
+        """
+        Returns the Asset for a file, only reading it again when it changed.
+        """
+        stat = os.stat(path)
+        with self._lock:
+            known = self._paths.get(path)
+        if known and known[:2] == (stat.st_mtime_ns, stat.st_size):
+            asset = self.get(known[2])
+            if asset is not None:
+                return asset
+
+        with open(path, "rb") as fd:
+            asset = self._add(Asset(fd.read()))
+        with self._lock:
+            self._paths[path] = (stat.st_mtime_ns, stat.st_size, asset.sha1)
+        return asset
+
+    def _add(self, asset):
+        with self._lock:
+            existing = self._assets.get(asset.sha1)
+            if existing is not None:
+                self._assets.move_to_end(asset.sha1)
+                return existing
+            self._assets[asset.sha1] = asset
+            self.size += asset.size
+            self._evict()
+            return asset
+
+    def _evict(self):
+        # Always keep the most recent asset, even if it alone exceeds max_bytes
+        while self.size > self.max_bytes and len(self._assets) > 1:
+            _, asset = self._assets.popitem(last=False)
+            self.size -= asset.size
@@ -0,0 +1,161 @@
+# Standard Library
+import os
+import pickle
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# Signer of the current worker process, loaded once by _init_worker
+_worker_signer = None
+
+# Failures to run passes in worker processes at all: workers that can't
+# start, passes or signers that can't be pickled. Errors of the passes
+# themselves, raised by the workers, are not among them.
+_PROCESS_ERRORS = (BrokenProcessPool, pickle.PicklingError)
+# What pickling an object that can't be pickled raises besides PicklingError
+# (e.g. "cannot pickle '_thread.lock' object", local classes)
+_PICKLE_ERRORS = (pickle.PicklingError, TypeError, AttributeError)
+
+
+def _init_worker(signer):
+    global _worker_signer
+    _worker_signer = signer
+
+
+def worker_signer():
+    """
+    :returns the signer a worker process of create_executor() received,
+        None outside of them
+    """
+    return _worker_signer
+
+
+def _create_pass(apple_pass, output_dir=None, signer=None):
+    """
+    Creates a single pass inside a worker.
+    :returns (serial_number, pkpass bytes) or (serial_number, path) when
+        output_dir is given
+    """
+    signer = signer or _worker_signer
+    if hasattr(signer, "get_signer"):
+        # A Keyring, sign with the signer of the pass' own pass type
+        signer = signer.get_signer(apple_pass.pass_type_identifier)
+    data = apple_pass.create(signer=signer).getvalue()
+    if not output_dir:
+        return apple_pass.serial_number, data
+
+    path = os.path.join(output_dir, f"{apple_pass.serial_number}.pkpass")
+    # Write to a temporary name first so a crash never leaves a partial pass
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as fd:
+        fd.write(data)
+    os.replace(tmp_path, path)
+    return apple_pass.serial_number, path
+
+
+def create_executor(executor, max_workers, signer):
+    """
+    Creates the pool running signing tasks, for generate_many() and other
+    batch signers such as the signing daemon.
+    :param executor: "process" or "thread"
+    :param signer: sent once to each worker process, see worker_signer()
+    :returns (pool, signer to pass to the tasks): the signer is None for
+        worker processes, which use their own copy
+    """
+    if executor == "process":
+        try:
+            return ProcessPoolExecutor(
+                max_workers=max_workers, initializer=_init_worker, initargs=(signer,)
+            ), None
+        except (ImportError, NotImplementedError, OSError):
+            # No working multiprocessing on this platform, use threads instead
+            pass
+    elif executor != "thread":
+        raise ValueError(f"Unknown executor {executor!r}, use 'process' or 'thread'")
+    # Threads share the already loaded signer
+    return ThreadPoolExecutor(max_workers=max_workers), signer
+
+
+def generate_many(
+    passes,
+    signer,
+    output_dir=None,
+    executor="process",
+    max_workers=None,
+    max_in_flight=None,
+):
+    """
+    Creates many passes in parallel and yields the results in input order.
+
+    :param passes: iterable of ApplePass objects, consumed lazily
+    :param signer: Signer used for every pass, loaded once per worker, or a
+        Keyring whose signers are loaded by each worker on first use
+    :param output_dir: if given, passes are written there as
+        <serial_number>.pkpass and (serial_number, path) is yielded instead of
+        (serial_number, pkpass bytes)
+    :param executor: "process" (falls back to threads when process pools are
+        unavailable, or when the first passes can't run in worker processes,
+        e.g. because they can't be pickled) or "thread"
+    :param max_workers: pool size, defaults to the number of CPUs
+    :param max_in_flight: maximum number of passes submitted but not yet
+        yielded, bounds memory use. Defaults to twice the pool size.
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    max_in_flight = max_in_flight or 2 * max_workers
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+
+    pool, task_signer = create_executor(executor, max_workers, signer)
+    # Until a pass succeeded in the process pool, failing to run passes there
+    # moves the remaining work to threads
+    can_fall_back = task_signer is None
+    in_flight = deque()  # (apple_pass, future)
+    passes = iter(passes)
+    try:
+        while True:
+            if len(in_flight) < max_in_flight:
+                apple_pass = next(passes, None)
+                if apple_pass is not None:
+                    try:
+                        if can_fall_back:
+                            # Process pools pickle in the background, check
+                            # here that the pass can be sent to the workers
+                            pickle.dumps(apple_pass)
+                        future = pool.submit(
+                            _create_pass, apple_pass, output_dir, task_signer
+                        )
+                    except _PICKLE_ERRORS + _PROCESS_ERRORS:
+                        if not can_fall_back:
+                            raise
+                        future = None
+                    in_flight.append((apple_pass, future))
+                    if future is not None:
+                        continue
+            if not in_flight:
+                break
+
+            future = in_flight[0][1]
+            try:
+                if future is None:
+                    raise BrokenProcessPool()
+                result = future.result()
+            except _PROCESS_ERRORS:
+                if not can_fall_back:
+                    raise
+                can_fall_back = False
+                pool.shutdown(cancel_futures=True)
+                pool, task_signer = ThreadPoolExecutor(max_workers=max_workers), signer
+                in_flight = deque(
+                    (p, pool.submit(_create_pass, p, output_dir, task_signer))
+                    for p, _ in in_flight
+                )
+                continue
+            in_flight.popleft()
+            can_fall_back = False
+            yield result
+    finally:
+        # Stop pending work when the consumer stops early or a pass fails
+        for _, future in in_flight:
+            if future is not None:
+                future.cancel()
+        pool.shutdown()
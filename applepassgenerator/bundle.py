@@ -0,0 +1,102 @@
+"""
+.pkpasses bundles: one download adding several passes to Wallet, e.g. all
+the tickets of an order. A bundle is a zip archive of .pkpass archives,
+served with the MIME_TYPE content type.
+"""
+
+# Standard Library
+import hashlib
+from io import BytesIO
+
+from applepassgenerator.archive import (
+    FIXED_DATE_TIME,
+    ZIP_STORED,
+    ZipEntry,
+    iter_zip,
+    write_zip,
+)
+from applepassgenerator.assets import Asset
+from applepassgenerator.signer import Signer
+
+MIME_TYPE = "application/vnd.apple.pkpasses"
+
+
+def share_files(passes):
+    """
+    Returns copies of passes whose files are shared Assets, one per distinct
+    content, so each of them is hashed and compressed once for all the
+    passes. The passes themselves are left unchanged.
+    """
+    assets = {}  # SHA1 -> Asset
+    shared = []
+    for apple_pass in passes:
+        files = {}
+        for name, data in apple_pass._files.items():
+            if isinstance(data, Asset):
+                files[name] = assets.setdefault(data.sha1, data)
+            else:
+                sha1 = hashlib.sha1(data).hexdigest()
+                files[name] = assets.setdefault(sha1, Asset(data, sha1))
+        # A shallow copy keeping the signer, unlike copy.copy() (__getstate__)
+        shared_pass = object.__new__(type(apple_pass))
+        shared_pass.__dict__.update(apple_pass.__dict__)
+        shared_pass._files = files
+        shared.append(shared_pass)
+    return shared
+
+
+def bundle_entries(
+    passes,
+    signer=None,
+    certificate=None,
+    key=None,
+    wwdr_certificate=None,
+    password=None,
+):
+    """
+    Yields a ZipEntry per pass, named after its serial number. Passes are
+    created one at a time, only one of them is held in memory.
+    :param signer: Signer of every pass, defaults to the passes' own signer
+        or to one loaded once from the certificate paths
+    """
+    passes = share_files(passes)
+    if signer is None and any(p.signer is None for p in passes):
+        signer = Signer(certificate, key, wwdr_certificate, password)
+
+    names = set()
+    for index, apple_pass in enumerate(passes):
+        stem = apple_pass.serial_number or index
+        name = f"{stem}.pkpass"
+        # Another pass can already use the suffixed name as its serial number
+        suffix = index
+        while name in names:
+            name = f"{stem}-{suffix}.pkpass"
+            suffix += 1
+        names.add(name)
+        archive = apple_pass.create(
+            signer=signer or apple_pass.signer, zip_file=BytesIO()
+        )
+        # Members are already compressed archives, store them as is
+        yield ZipEntry.compress(
+            name,
+            archive.getvalue(),
+            ZIP_STORED,
+            date_time=FIXED_DATE_TIME if apple_pass.deterministic else None,
+        )
+
+
+def iter_bundle(passes, signer=None, **kwargs):
+    """
+    Yields the .pkpasses bundle of passes in chunks, usable as a WSGI
+    response body. See bundle_entries() for the arguments.
+    """
+    return iter_zip(bundle_entries(passes, signer, **kwargs))
+
+
+def write_bundle(zip_file, passes, signer=None, **kwargs):
+    """
+    Streams the .pkpasses bundle of passes to a path, file object, socket or
+    callable taking bytes. See bundle_entries() for the arguments.
+    :returns the size of the bundle in bytes
+    """
+    return write_zip(zip_file, bundle_entries(passes, signer, **kwargs))
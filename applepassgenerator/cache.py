@@ -0,0 +1,111 @@
+# Standard Library
+import os
+import threading
+from collections import OrderedDict
+
+
+class MemoryPassCache(object):
+    """In-memory cache of created .pkpass archives with LRU eviction.
+
+    Keys are the content hashes computed by ApplePass.create() (also exposed
+    as ApplePass.etag), values the archive bytes.
+    """
+
+    def __init__(self, max_bytes=256 * 1024 * 1024, max_entries=None):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.size = 0
+        self._archives = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._archives)
+
+    def __contains__(self, key):
+        return key in self._archives
+
+    def get(self, key):
+        with self._lock:
+            data = self._archives.get(key)
+            if data is not None:
+                self._archives.move_to_end(key)
+            return data
+
+    def set(self, key, data):
+        with self._lock:
+            previous = self._archives.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous)
+            self._archives[key] = data
+            self.size += len(data)
+            while len(self._archives) > 1 and (
+                self.size > self.max_bytes
+                or (self.max_entries and len(self._archives) > self.max_entries)
+            ):
+                _, evicted = self._archives.popitem(last=False)
+                self.size -= len(evicted)
+
+
+class DiskPassCache(object):
+    """On-disk cache of created .pkpass archives, limited to max_bytes.
+
+    Archives are stored as <key>.pkpass in directory. Reads refresh the file
+    modification time and the least recently used files are deleted first,
+    so the cache survives restarts and can be shared by several processes.
+    """
+
+    def __init__(self, directory, max_bytes=1024 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self.size = sum(size for _, _, size in self._scan())
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.pkpass")
+
+    def _scan(self):
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".pkpass"):
+                stat = entry.stat()
+                yield stat.st_mtime_ns, entry.path, stat.st_size
+
+    def __contains__(self, key):
+        return os.path.exists(self._path(key))
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "rb") as fd:
+                data = fd.read()
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return data
+
+    def set(self, key, data):
+        path = self._path(key)
+        # Write then rename so readers never see a partial archive
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as fd:
+            fd.write(data)
+        with self._lock:
+            if os.path.exists(path):
+                self.size -= os.path.getsize(path)
+            os.replace(tmp_path, path)
+            self.size += len(data)
+            if self.size > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        files = sorted(self._scan())
+        self.size = sum(size for _, _, size in files)
+        # Keep the most recent archive, even if it alone exceeds max_bytes
+        for _, path, size in files[:-1]:
+            if self.size <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            self.size -= size
@@ -0,0 +1,276 @@
+"""
+Bulk pass issuing from the command line.
+
+    python -m applepassgenerator template.json rows.csv --output-dir passes/
+    python -m applepassgenerator template.json rows.jsonl --output-zip passes.zip
+
+The template is a JSON file describing the passes, string values may use
+{column} references to the input rows (other braces are kept as they are):
+
+    {
+        "style": "eventTicket",
+        "team_identifier": "65QNR2XSA2",
+        "pass_type_identifier": "pass.com.example.event",
+        "organization_name": "Example",
+        "description": "Example Event",
+        "serial_number": "{ticket_id}",
+        "barcode": {"message": "{ticket_id}", "format": "PKBarcodeFormatQR"},
+        "fields": {"primary": [{"key": "seat", "value": "{seat}", "label": "SEAT"}]},
+        "assets": {"icon.png": "icon.png", "logo.png": "logo.png"},
+        "certificates": {
+            "certificate": "certs/signerCert.pem",
+            "key": "certs/signerKey.pem",
+            "wwdr_certificate": "certs/wwdr.pem",
+            "password_env": "PASS_KEY_PASSWORD"
+        }
+    }
+
+Progress is checkpointed in the output directory, rerun the same command
+with --resume to continue a job that was interrupted. Passes written after
+the last checkpoint are issued again, take serial_number from a column so
+they overwrite the same files.
+"""
+
+# Standard Library
+import argparse
+import csv
+import json
+import os
+import re
+import shutil
+import sys
+import time
+import zipfile
+
+from applepassgenerator.archive import ZIP_DEFLATED, ZIP_STORED
+from applepassgenerator.assets import AssetStore
+from applepassgenerator.batch import generate_many
+from applepassgenerator.client import ApplePassGeneratorClient
+from applepassgenerator.models import (
+    BoardingPass,
+    Coupon,
+    EventTicket,
+    Generic,
+    StoreCard,
+)
+from applepassgenerator.signer import Signer
+from applepassgenerator.utils import Barcode
+
+STYLES = {
+    "boardingPass": BoardingPass,
+    "coupon": Coupon,
+    "eventTicket": EventTicket,
+    "generic": Generic,
+    "storeCard": StoreCard,
+}
+COMPRESSIONS = {"stored": ZIP_STORED, "deflate": ZIP_DEFLATED}
+
+# Top level template keys copied (formatted) to ApplePass attributes
+PASS_ATTRIBUTES = (
+    "description",
+    "logo_text",
+    "background_color",
+    "foreground_color",
+    "label_color",
+    "relevant_date",
+    "expiration_date",
+    "web_service_url",
+    "authentication_token",
+)
+CHECKPOINT = ".checkpoint.json"
+COLUMN = re.compile(r"\{(\w+)\}")
+
+
+def _format(value, row):
+    if not isinstance(value, str):
+        return value
+
+    def column(match):
+        try:
+            return str(row[match.group(1)])
+        except KeyError:
+            name = match.group(1)
+            raise ValueError(f"no {name!r} column for {{{name}}}") from None
+
+    return COLUMN.sub(column, value)
+
+
+class PassFactory(object):
+    """Builds the ApplePass of each input row from a template definition."""
+
+    def __init__(self, template, base_path):
+        self.template = template
+        self.style = STYLES[template.get("style", "generic")]
+        self.client = ApplePassGeneratorClient(
+            template["team_identifier"],
+            template["pass_type_identifier"],
+            template["organization_name"],
+            compression=COMPRESSIONS[template.get("compression", "stored")],
+        )
+        # Images are loaded and hashed once for the whole job
+        store = AssetStore()
+        self.assets = {
+            name: store.load(os.path.join(base_path, path))
+            for name, path in template.get("assets", {}).items()
+        }
+
+    def __call__(self, row):
+        template = self.template
+        if self.style is BoardingPass:
+            card_info = BoardingPass(template.get("transit_type", "PKTransitTypeAir"))
+        else:
+            card_info = self.style()
+        for section, fields in template.get("fields", {}).items():
+            add_field = getattr(card_info, f"add_{section}_field")
+            for field in fields:
+                add_field(
+                    field["key"],
+                    _format(field["value"], row),
+                    _format(field.get("label", ""), row),
+                )
+
+        apple_pass = self.client.get_pass(card_info)
+        if "serial_number" in template:
+            apple_pass.serial_number = _format(template["serial_number"], row)
+        for attribute in PASS_ATTRIBUTES:
+            if attribute in template:
+                setattr(apple_pass, attribute, _format(template[attribute], row))
+        barcode = template.get("barcode")
+        if barcode:
+            apple_pass.barcode = Barcode(
+                _format(barcode["message"], row),
+                barcode.get("format", "PKBarcodeFormatQR"),
+                _format(barcode.get("alt_text", ""), row),
+            )
+        for name, asset in self.assets.items():
+            apple_pass.add_asset(name, asset)
+        return apple_pass
+
+
+def load_signer(certificates, base_path):
+    password = certificates.get("password")
+    if "password_env" in certificates:
+        password = os.environ[certificates["password_env"]]
+    return Signer(
+        os.path.join(base_path, certificates["certificate"]),
+        os.path.join(base_path, certificates["key"]),
+        os.path.join(base_path, certificates["wwdr_certificate"]),
+        password,
+    )
+
+
+def read_rows(path):
+    """
+    Streams the input rows as dicts, from a CSV or JSON lines file ("-" reads
+    CSV from stdin).
+    """
+    if path == "-":
+        yield from csv.DictReader(sys.stdin)
+        return
+    with open(path, newline="", encoding="utf-8") as fd:
+        if path.endswith((".jsonl", ".ndjson")):
+            for line in fd:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from csv.DictReader(fd)
+
+
+def read_checkpoint(directory):
+    try:
+        with open(os.path.join(directory, CHECKPOINT)) as fd:
+            return json.load(fd)["rows"]
+    except FileNotFoundError:
+        return 0
+
+
+def write_checkpoint(directory, rows):
+    path = os.path.join(directory, CHECKPOINT)
+    with open(path + ".tmp", "w") as fd:
+        json.dump({"rows": rows}, fd)
+    os.replace(path + ".tmp", path)
+
+
+def skip(iterable, count):
+    for index, item in enumerate(iterable):
+        if index >= count:
+            yield item
+
+
+def build_zip(directory, zip_path):
+    # Passes are already compressed archives, store them as they are
+    tmp_path = zip_path + ".tmp"
+    with zipfile.ZipFile(tmp_path, "w", zipfile.ZIP_STORED) as archive:
+        for name in sorted(os.listdir(directory)):
+            if name.endswith(".pkpass"):
+                archive.write(os.path.join(directory, name), name)
+    os.replace(tmp_path, zip_path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m applepassgenerator",
+        description="Issue signed passes in bulk from a template and CSV/JSONL rows.",
+    )
+    parser.add_argument("template", help="JSON template definition")
+    parser.add_argument("input", help="CSV or JSON lines (.jsonl) file, - for stdin")
+    output = parser.add_mutually_exclusive_group(required=True)
+    output.add_argument("--output-dir", help="write one .pkpass per row here")
+    output.add_argument("--output-zip", help="write every pass into this zip")
+    parser.add_argument("--workers", type=int, help="parallel workers, default CPUs")
+    parser.add_argument("--executor", choices=("process", "thread"), default="process")
+    parser.add_argument(
+        "--checkpoint-every",
+        type=int,
+        default=1000,
+        help="rows between two progress checkpoints",
+    )
+    parser.add_argument(
+        "--resume", action="store_true", help="continue from the last checkpoint"
+    )
+    args = parser.parse_args(argv)
+
+    with open(args.template) as fd:
+        template = json.load(fd)
+    base_path = os.path.dirname(os.path.abspath(args.template))
+    factory = PassFactory(template, base_path)
+    signer = load_signer(template["certificates"], base_path)
+
+    # Zip output is staged in a directory so an interrupted job can resume
+    directory = args.output_dir or args.output_zip + ".parts"
+    os.makedirs(directory, exist_ok=True)
+    done = read_checkpoint(directory) if args.resume else 0
+
+    def build_passes():
+        # Rows the template can't be applied to are reported as usage errors
+        for number, row in enumerate(skip(read_rows(args.input), done), done + 1):
+            try:
+                yield factory(row)
+            except ValueError as error:
+                parser.error(f"row {number}: {error}")
+
+    rows = 0
+    start = time.perf_counter()
+    try:
+        for _ in generate_many(
+            build_passes(),
+            signer,
+            output_dir=directory,
+            executor=args.executor,
+            max_workers=args.workers,
+        ):
+            rows += 1
+            if rows % args.checkpoint_every == 0:
+                write_checkpoint(directory, done + rows)
+    finally:
+        write_checkpoint(directory, done + rows)
+    elapsed = time.perf_counter() - start
+
+    if args.output_zip:
+        build_zip(directory, args.output_zip)
+        shutil.rmtree(directory)
+    print(
+        f"Issued {rows} passes in {elapsed:.1f}s ({rows / elapsed if elapsed else 0:.1f}"
+        f" passes/sec), {done} rows skipped from a previous run",
+        file=sys.stderr,
+    )
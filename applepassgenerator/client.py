@@ -1,17 +1,135 @@
+# Standard Library
+import asyncio
+import weakref
+
 from applepassgenerator.apple_pass import ApplePass
+from applepassgenerator.archive import ZIP_STORED
+from applepassgenerator.batch import generate_many
+from applepassgenerator.update import update_pass
 
 
 class ApplePassGeneratorClient(object):
-    def __init__(self, team_identifier, pass_type_identifier, organization_name):
+    def __init__(
+        self,
+        team_identifier,
+        pass_type_identifier,
+        organization_name,
+        signer=None,
+        compression=ZIP_STORED,
+        compresslevel=None,
+        executor=None,
+        max_concurrency=None,
+        instrumentation=None,
+        deterministic=False,
+        cache=None,
+        keyring=None,
+    ):
         self.team_identifier = team_identifier
         self.pass_type_identifier = pass_type_identifier
         self.organization_name = organization_name
+        # Optional. Signer shared by every pass created through this client
+        self.signer = signer
+        # Archive compression of the passes, see ApplePass
+        self.compression = compression
+        self.compresslevel = compresslevel
+        # Executor running the CPU heavy stages of create_pass_async(), the
+        # loop's default thread pool when None
+        self.executor = executor
+        # Optional. Maximum number of create_pass_async() running at once
+        self.max_concurrency = max_concurrency
+        # Semaphores are bound to an event loop, one per loop using the client
+        self._semaphores = weakref.WeakKeyDictionary()
+        # Optional. Instrumentation receiving the create() stage timings
+        self.instrumentation = instrumentation
+        # Deterministic archives and optional archive cache, see ApplePass
+        self.deterministic = deterministic
+        self.cache = cache
+        # Optional. Keyring of the signing credentials per pass type
+        # identifier, used when no signer is set
+        self.keyring = keyring
+
+    def signer_for(self, pass_type_identifier=None):
+        """
+        :returns the signer to use for a pass type identifier (the client's
+            one by default): the client's signer if set, else a KeyringSigner
+            loading the keyring credentials on first use
+        """
+        if self.signer is not None or self.keyring is None:
+            return self.signer
+        return self.keyring.signer(pass_type_identifier or self.pass_type_identifier)
 
-    def get_pass(self, card_info):
+    def get_pass(self, card_info, pass_type_identifier=None):
+        team_identifier = self.team_identifier
+        if pass_type_identifier and self.keyring is not None:
+            credentials = self.keyring.credentials(pass_type_identifier)
+            team_identifier = credentials.team_identifier or team_identifier
         apple_pass = ApplePass(
             card_info,
-            pass_type_identifier=self.pass_type_identifier,
+            pass_type_identifier=pass_type_identifier or self.pass_type_identifier,
             organization_name=self.organization_name,
-            team_identifier=self.team_identifier,
+            team_identifier=team_identifier,
+            signer=self.signer_for(pass_type_identifier),
+            compression=self.compression,
+            compresslevel=self.compresslevel,
+            instrumentation=self.instrumentation,
+            deterministic=self.deterministic,
+            cache=self.cache,
         )
         return apple_pass
+
+    def generate_many(self, passes, signer=None, **kwargs):
+        """
+        Creates many passes in parallel, see applepassgenerator.batch.generate_many
+        for the available options.
+        :param passes: iterable of ApplePass objects or pass information
+            (EventTicket, Coupon, ...) to wrap with get_pass()
+        :param signer: Signer, or Keyring to sign each pass with the signer
+            of its pass type identifier. Defaults to the client's signer,
+            then keyring.
+        :returns iterator of (serial_number, pkpass bytes or path)
+        """
+        signer = signer or self.signer or self.keyring
+        if signer is None:
+            raise ValueError("generate_many() needs a Signer or Keyring")
+        apple_passes = (
+            p if isinstance(p, ApplePass) else self.get_pass(p) for p in passes
+        )
+        return generate_many(apple_passes, signer, **kwargs)
+
+    def update_pass(
+        self,
+        source,
+        changes=None,
+        fields=None,
+        zip_file=None,
+        pass_type_identifier=None,
+    ):
+        """
+        Updates an existing .pkpass, signing it with signer_for() the pass
+        type identifier. See applepassgenerator.update.update_pass.
+        """
+        signer = self.signer_for(pass_type_identifier)
+        if signer is None:
+            raise ValueError("update_pass() needs a Signer")
+        return update_pass(source, signer, changes, fields, zip_file, self.compresslevel)
+
+    async def create_pass_async(self, apple_pass, signer=None, zip_file=None):
+        """
+        Creates the .pkpass of apple_pass without blocking the event loop, at
+        most max_concurrency at a time.
+        :returns zip_file or a BytesIO
+        """
+        signer = signer or self.signer
+        if not self.max_concurrency:
+            return await apple_pass.create_async(
+                zip_file=zip_file, signer=signer, executor=self.executor
+            )
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._semaphores[loop] = semaphore
+        async with semaphore:
+            return await apple_pass.create_async(
+                zip_file=zip_file, signer=signer, executor=self.executor
+            )
@@ -0,0 +1,211 @@
+"""
+Derivation of the pass images Wallet expects from one master image per role.
+
+    pipeline = ImagePipeline(cache_dir=".pkpass-images")
+    pipeline.add_to(apple_pass, "logo", "brand/logo-master.png")
+
+adds logo.png, logo@2x.png and logo@3x.png, resized to fit the limits of
+the pass style and recompressed. Variants are cached by content hash, in
+memory and optionally on disk, so the same master is only resized once per
+campaign even across runs.
+
+Requires Pillow (pip install applepassgenerator[images]).
+"""
+
+# Standard Library
+import hashlib
+import os
+import tempfile
+import threading
+import warnings
+from contextlib import ExitStack
+from io import BytesIO
+
+from applepassgenerator.assets import Asset
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+# Bump when the encoding settings change, to invalidate cached variants
+VERSION = 2
+SCALES = (1, 2, 3)
+
+# Largest @1x size (points) of each image role, per style when it differs
+LIMITS = {
+    "icon": {None: (29, 29)},
+    "logo": {None: (160, 50)},
+    "thumbnail": {None: (90, 90)},
+    "background": {None: (180, 220)},
+    "footer": {None: (286, 15)},
+    "strip": {
+        None: (375, 123),
+        "eventTicket": (375, 98),
+        "coupon": (375, 144),
+        "storeCard": (375, 144),
+    },
+}
+
+# Image roles each pass style displays
+ROLES = {
+    "boardingPass": ("icon", "logo", "footer"),
+    "coupon": ("icon", "logo", "strip"),
+    "eventTicket": ("icon", "logo", "strip", "background", "thumbnail"),
+    "generic": ("icon", "logo", "thumbnail"),
+    "storeCard": ("icon", "logo", "strip"),
+}
+
+
+def max_size(role, style=None, scale=1):
+    """
+    :returns the largest (width, height) in pixels of an image role
+    :raises ValueError: for roles the style doesn't display
+    """
+    if role not in LIMITS:
+        raise ValueError(f"Unknown image role {role!r}")
+    if style is not None and role not in ROLES.get(style, LIMITS):
+        raise ValueError(f"{style} passes have no {role} image")
+    width, height = LIMITS[role].get(style, LIMITS[role][None])
+    return width * scale, height * scale
+
+
+def fit(size, box):
+    """
+    :returns size scaled down, keeping its aspect ratio, to fit in box
+    """
+    width, height = size
+    ratio = min(box[0] / width, box[1] / height, 1)
+    return max(1, round(width * ratio)), max(1, round(height * ratio))
+
+
+def validate(name, data, style=None):
+    """
+    Checks that an image file, e.g. "strip@2x.png", fits the limits of its
+    role and resolution.
+    :raises ValueError: when it is too large, or the style has no such image
+    """
+    role, _, scale = os.path.splitext(name)[0].partition("@")
+    scale = int(scale.rstrip("x") or 1)
+    box = max_size(role, style, scale)
+    if Image is None:
+        raise ImportError("validate() requires Pillow")
+    with Image.open(BytesIO(data)) as image:
+        if image.width > box[0] or image.height > box[1]:
+            raise ValueError(
+                f"{name} is {image.width}x{image.height}, at most "
+                f"{box[0]}x{box[1]} allowed"
+            )
+
+
+class ImagePipeline(object):
+    """Derives and caches the @1x/@2x/@3x variants of master images.
+
+    :param cache_dir: Optional. Directory keeping the variants across runs,
+        named after the hash of their master and target size
+    :param scales: resolutions to produce
+    """
+
+    def __init__(self, cache_dir=None, scales=SCALES):
+        if Image is None:
+            raise ImportError(
+                "ImagePipeline requires Pillow: pip install applepassgenerator[images]"
+            )
+        self.cache_dir = cache_dir
+        self.scales = scales
+        self._assets = {}  # cache key -> Asset
+        self._lock = threading.Lock()
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def variants(self, role, master, style=None):
+        """
+        Returns the variants of a master image for a role.
+        :param master: path, bytes or binary file object of the master image
+        :param style: Optional. Pass style ("eventTicket", ...) whose limits
+            apply
+        :returns dict of file name ("logo.png", "logo@2x.png", ...) -> Asset
+
+        Masters smaller than the largest variant are used at their size for
+        the larger scales, with a warning.
+        """
+        if hasattr(master, "read"):
+            master = master.read()
+        elif isinstance(master, (str, os.PathLike)):
+            with open(master, "rb") as fd:
+                master = fd.read()
+        master_hash = hashlib.sha1(master).hexdigest()
+        image = None
+
+        # Each variant fits its own limits, masters are never upscaled. The
+        # master is only decoded if a variant isn't cached, and closed after.
+        variants = {}
+        with ExitStack() as stack:
+            for scale in self.scales:
+                box = max_size(role, style, scale)
+                suffix = f"@{scale}x" if scale > 1 else ""
+                key = f"{master_hash}-{box[0]}x{box[1]}-v{VERSION}"
+                asset = self._get(key)
+                if asset is None:
+                    if image is None:
+                        image = stack.enter_context(Image.open(BytesIO(master)))
+                        image.load()
+                        _check_resolution(role, image.size, style, max(self.scales))
+                    asset = self._set(key, _encode(image, fit(image.size, box)))
+                variants[f"{role}{suffix}.png"] = asset
+        return variants
+
+    def add_to(self, apple_pass, role, master):
+        """
+        Adds the variants of a master image to a pass, within the limits of
+        its style.
+        """
+        style = apple_pass.pass_information.jsonname
+        for name, asset in self.variants(role, master, style).items():
+            apple_pass.add_asset(name, asset)
+
+    def _get(self, key):
+        with self._lock:
+            asset = self._assets.get(key)
+        if asset is not None or not self.cache_dir:
+            return asset
+        try:
+            with open(os.path.join(self.cache_dir, f"{key}.png"), "rb") as fd:
+                data = fd.read()
+        except FileNotFoundError:
+            return None
+        with self._lock:
+            return self._assets.setdefault(key, Asset(data))
+
+    def _set(self, key, data):
+        if self.cache_dir:
+            # Written to a temporary name first so readers never see partial files
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            with os.fdopen(fd, "wb") as tmp:
+                tmp.write(data)
+            os.replace(tmp_path, os.path.join(self.cache_dir, f"{key}.png"))
+        with self._lock:
+            return self._assets.setdefault(key, Asset(data))
+
+
+def _check_resolution(role, size, style, scale):
+    box = max_size(role, style, scale)
+    if size[0] < box[0] and size[1] < box[1]:
+        warnings.warn(
+            f"{role} master is {size[0]}x{size[1]}, smaller than its @{scale}x "
+            f"size {box[0]}x{box[1]}: the larger variants won't be sharper",
+            stacklevel=3,
+        )
+
+
+def _encode(image, size):
+    """
+    :returns the PNG bytes of image resized to size, at maximum compression
+    """
+    has_alpha = image.mode in ("RGBA", "LA") or "transparency" in image.info
+    image = image.convert("RGBA" if has_alpha else "RGB")
+    if image.size != size:
+        image = image.resize(size, Image.LANCZOS)
+    output = BytesIO()
+    image.save(output, "PNG", optimize=True)
+    return output.getvalue()
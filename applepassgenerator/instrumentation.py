@@ -0,0 +1,98 @@
+# Standard Library
+import time
+from collections import defaultdict
+
+# Stages of ApplePass.create()
+PASS_JSON = "create_pass_json"
+MANIFEST = "create_manifest"
+SIGNATURE = "create_signature"
+ZIP = "create_zip"
+STAGES = (PASS_JSON, MANIFEST, SIGNATURE, ZIP)
+
+
+class Instrumentation(object):
+    """Receives the duration and output size of each create() stage.
+
+    Pass a callback taking (stage, seconds, size) or subclass and override
+    record(). Stages are PASS_JSON, MANIFEST, SIGNATURE and ZIP, size is the
+    number of bytes the stage produced. For instance with prometheus_client:
+
+        seconds = Histogram("pkpass_stage_seconds", "Stage time", ["stage"])
+        Instrumentation(lambda stage, s, size: seconds.labels(stage).observe(s))
+
+    When no instrumentation is configured create() doesn't time anything.
+    Passes created in worker processes (generate_many() with the "process"
+    executor) aren't measured, the instrumentation stays in the parent
+    process; use the "thread" executor to measure batches.
+    """
+
+    def __init__(self, callback=None):
+        self.callback = callback
+
+    def record(self, stage, seconds, size):
+        if self.callback is not None:
+            self.callback(stage, seconds, size)
+
+    def measure(self, stage, func, *args):
+        start = time.perf_counter()
+        result = func(*args)
+        seconds = time.perf_counter() - start
+        # Stages return their output, or its size in bytes (ZIP)
+        self.record(stage, seconds, result if isinstance(result, int) else len(result))
+        return result
+
+    def measure_chunks(self, stage, chunks):
+        """
+        Yields chunks, recording the time spent producing them and their
+        total size once they are exhausted.
+        """
+        seconds = 0
+        size = 0
+        chunks = iter(chunks)
+        while True:
+            start = time.perf_counter()
+            chunk = next(chunks, None)
+            seconds += time.perf_counter() - start
+            if chunk is None:
+                break
+            size += len(chunk)
+            yield chunk
+        self.record(stage, seconds, size)
+
+
+class StageStats(Instrumentation):
+    """Keeps every measurement in memory, for benchmarks and debugging."""
+
+    def __init__(self, callback=None):
+        super(StageStats, self).__init__(callback)
+        self.durations = defaultdict(list)
+        self.sizes = defaultdict(int)
+
+    def record(self, stage, seconds, size):
+        self.durations[stage].append(seconds)
+        self.sizes[stage] += size
+        super(StageStats, self).record(stage, seconds, size)
+
+    def summary(self, percentiles=(50, 95, 99)):
+        """
+        :returns dict of stage -> count, total seconds, bytes and the
+            requested latency percentiles (in seconds, as "p50", "p95", ...)
+        """
+        summary = {}
+        for stage, durations in self.durations.items():
+            ordered = sorted(durations)
+            stats = {
+                "count": len(ordered),
+                "total": sum(ordered),
+                "bytes": self.sizes[stage],
+            }
+            for percentile in percentiles:
+                index = max(0, -(-len(ordered) * percentile // 100) - 1)
+                stats[f"p{percentile}"] = ordered[index]
+            summary[stage] = stats
+        return summary
+
+
+def _call(stage, func, *args):
+    # Used in place of Instrumentation.measure() when instrumentation is off
+    return func(*args)
@@ -0,0 +1,161 @@
+# Standard Library
+import threading
+import time
+from collections import OrderedDict
+
+from applepassgenerator.signer import BaseSigner, Signer
+
+
+class Credentials(object):
+    """Signing material of one pass type identifier, loaded only when used.
+
+    certificate, key and wwdr_certificate can be paths, bytes or loaded
+    objects, like for Signer. team_identifier optionally overrides the
+    client's team identifier for this pass type.
+    """
+
+    def __init__(
+        self, certificate, key, wwdr_certificate, password=None, team_identifier=None
+    ):
+        self.certificate = certificate
+        self.key = key
+        self.wwdr_certificate = wwdr_certificate
+        self.password = password
+        self.team_identifier = team_identifier
+
+    def load(self):
+        return Signer(self.certificate, self.key, self.wwdr_certificate, self.password)
+
+
+class Keyring(object):
+    """Maps pass type identifiers to their signing credentials.
+
+    Credentials are registered with add() or returned by loader, a callable
+    taking a pass type identifier and returning Credentials (or None), e.g.
+    reading them from a database or a secret store. Signers are only built
+    (and keys decrypted) on first use and kept in an LRU cache bounded by
+    max_signers, each for at most ttl seconds (None keeps them until they
+    are evicted or invalidated). It is safe to use from many threads, a
+    signer is only loaded once however many threads ask for it.
+    """
+
+    def __init__(self, loader=None, max_signers=128, ttl=3600):
+        self.loader = loader
+        self.max_signers = max_signers
+        self.ttl = ttl
+        self._credentials = {}
+        self._init_cache()
+
+    def _init_cache(self):
+        self._signers = OrderedDict()  # pass type identifier -> (signer, expiry)
+        self._loading = {}  # pass type identifier -> lock of the thread loading it
+        self._lock = threading.Lock()
+
+    # Only the credentials are pickled, workers load their own signers
+    def __getstate__(self):
+        return {
+            "loader": self.loader,
+            "max_signers": self.max_signers,
+            "ttl": self.ttl,
+            "_credentials": self._credentials,
+        }
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._init_cache()
+
+    def add(self, pass_type_identifier, credentials):
+        """
+        Registers (or replaces) the credentials of a pass type identifier.
+        """
+        with self._lock:
+            self._credentials[pass_type_identifier] = credentials
+            self._signers.pop(pass_type_identifier, None)
+
+    def credentials(self, pass_type_identifier):
+        """
+        :returns Credentials
+        :raises KeyError for unknown pass type identifiers
+        """
+        credentials = self._credentials.get(pass_type_identifier)
+        if credentials is None and self.loader is not None:
+            credentials = self.loader(pass_type_identifier)
+            if credentials is not None:
+                with self._lock:
+                    self._credentials[pass_type_identifier] = credentials
+        if credentials is None:
+            raise KeyError(f"No credentials for {pass_type_identifier}")
+        return credentials
+
+    def invalidate(self, pass_type_identifier):
+        """
+        Drops the cached signer (and loader credentials), e.g. after a
+        certificate renewal.
+        """
+        with self._lock:
+            self._signers.pop(pass_type_identifier, None)
+            if self.loader is not None:
+                self._credentials.pop(pass_type_identifier, None)
+
+    def get_signer(self, pass_type_identifier):
+        """
+        :returns the Signer of a pass type identifier, loading it if needed
+        """
+        signer = self._cached(pass_type_identifier)
+        if signer is not None:
+            return signer
+
+        with self._lock:
+            loading = self._loading.setdefault(pass_type_identifier, threading.Lock())
+        # Keys are decrypted outside of the keyring lock, other pass types
+        # are served meanwhile. Threads asking for this one wait for it.
+        with loading:
+            signer = self._cached(pass_type_identifier)
+            if signer is None:
+                signer = self.credentials(pass_type_identifier).load()
+                expiry = None if self.ttl is None else time.monotonic() + self.ttl
+                with self._lock:
+                    self._signers[pass_type_identifier] = (signer, expiry)
+                    while len(self._signers) > self.max_signers:
+                        self._signers.popitem(last=False)
+        with self._lock:
+            self._loading.pop(pass_type_identifier, None)
+        return signer
+
+    def _cached(self, pass_type_identifier):
+        with self._lock:
+            cached = self._signers.get(pass_type_identifier)
+            if cached is None:
+                return None
+            signer, expiry = cached
+            if expiry is not None and expiry < time.monotonic():
+                del self._signers[pass_type_identifier]
+                return None
+            self._signers.move_to_end(pass_type_identifier)
+            return signer
+
+    def signer(self, pass_type_identifier):
+        """
+        :returns a KeyringSigner, usable as ApplePass.signer, that resolves
+            the signer of the pass type identifier when signing
+        """
+        return KeyringSigner(self, pass_type_identifier)
+
+
+class KeyringSigner(BaseSigner):
+    """Signs with the keyring's current signer of a pass type identifier.
+
+    Nothing is loaded until the first signature, and expired or evicted
+    signers are transparently loaded again.
+    """
+
+    def __init__(self, keyring, pass_type_identifier):
+        self.keyring = keyring
+        self.pass_type_identifier = pass_type_identifier
+
+    @property
+    def fingerprint(self):
+        return self.keyring.get_signer(self.pass_type_identifier).fingerprint
+
+    def sign(self, manifest):
+        return self.keyring.get_signer(self.pass_type_identifier).sign(manifest)
@@ -0,0 +1,63 @@
+# Standard Library
+import codecs
+import os
+
+from applepassgenerator.assets import Asset, FileAsset
+
+
+def compile_strings(strings):
+    """
+    Encodes a string table in the .strings format Wallet reads: UTF-16 with
+    a byte order mark, one "key" = "value"; line per entry.
+    :param strings: dict of key (the text used in pass.json) -> translation
+    :returns bytes
+    """
+    lines = []
+    for key, value in sorted(strings.items()):
+        lines.append(f'"{_escape(key)}" = "{_escape(value)}";\n')
+    return codecs.BOM_UTF16_LE + "".join(lines).encode("utf-16-le")
+
+
+def _escape(text):
+    return (
+        str(text)
+        .replace("\\", "\\\\")
+        .replace('"', '\\"')
+        .replace("\n", "\\n")
+        .replace("\t", "\\t")
+    )
+
+
+class Localization(object):
+    """Files of one language: its pass.strings table and localized images.
+
+    Everything is compiled and hashed when the localization is built, build
+    one per language and campaign and add it to every pass with
+    ApplePass.add_localization(): passes only reference the shared Assets.
+    :param language: language code, e.g. "en" or "zh-Hans"
+    :param strings: Optional. dict of key -> translation
+    :param images: Optional. dict of file name ("logo.png", "strip@2x.png",
+        ...) -> bytes, path, binary file object or Asset
+    """
+
+    def __init__(self, language, strings=None, images=None):
+        if not language or "/" in language:
+            raise ValueError(f"Invalid language {language!r}")
+        self.language = language
+        directory = f"{language}.lproj/"
+        # File name inside the .pkpass -> Asset
+        self.files = {}
+        if strings:
+            self.files[directory + "pass.strings"] = Asset(compile_strings(strings))
+        for name, image in (images or {}).items():
+            self.files[directory + name] = _to_asset(image)
+
+
+def _to_asset(data):
+    if isinstance(data, Asset):
+        return data
+    if hasattr(data, "read"):
+        return Asset(data.read())
+    if isinstance(data, (str, os.PathLike)):
+        return FileAsset(data).scan()
+    return Asset(bytes(data))
@@ -1,4 +1,5 @@
 from applepassgenerator.models.boarding_pass import BoardingPass
+from applepassgenerator.models.coupon import Coupon
 from applepassgenerator.models.event_ticket import EventTicket
 from applepassgenerator.models.generic import Generic
 from applepassgenerator.models.store_card import StoreCard
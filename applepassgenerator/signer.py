@@ -0,0 +1,239 @@
+# Standard Library
+import abc
+import hashlib
+import os
+from datetime import datetime, timezone
+
+# Third Party Stuff
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec, padding, rsa
+from cryptography.hazmat.primitives.serialization import pkcs7
+
+from applepassgenerator import asn1
+
+SIGNING_TIME = "1.2.840.113549.1.9.5"
+MESSAGE_DIGEST = "1.2.840.113549.1.9.4"
+
+
+class BaseSigner(abc.ABC):
+    """Interface of the objects ApplePass accepts as signer.
+
+    Implementations only need sign(), returning the detached PKCS7 signature
+    (DER) of a manifest, and a fingerprint identifying the signing
+    certificate (used in cache keys). Signer signs in-process, RemoteSigner
+    (see applepassgenerator.signing_daemon) asks a daemon holding the keys.
+    """
+
+    fingerprint = None
+
+    @abc.abstractmethod
+    def sign(self, manifest):
+        """
+        :param manifest: manifest.json content as str or bytes
+        :returns the detached PKCS7 signature, DER encoded
+        """
+
+
+class Signer(BaseSigner):
+    """ Long-lived holder of the signing material for a pass type.
+
+    The signer certificate, private key and WWDR certificate are parsed (and
+    the key decrypted) once, when the signer is built. Each of them can be
+    given as a file path, as PEM/DER bytes or as an already loaded
+    `cryptography` object. Reuse one instance for every pass signed with the
+    same certificate so the per-pass cost is only the signature itself.
+    """
+
+    def __init__(self, certificate, key, wwdr_certificate, password=None):
+        self.certificate = load_certificate(certificate)
+        self.key = load_private_key(key, password)
+        self.wwdr_certificate = load_certificate(wwdr_certificate)
+        # Identifies the signing certificate, e.g. in cache keys
+        self.fingerprint = self.certificate.fingerprint(hashes.SHA256()).hex()
+
+    def sign(self, manifest):
+        """
+        Creates a detached PKCS7 signature (DER encoded) of the manifest.
+        :param manifest: manifest.json content as str or bytes
+        :returns bytes
+        """
+        if isinstance(manifest, str):
+            manifest = manifest.encode("UTF-8")
+        options = [pkcs7.PKCS7Options.DetachedSignature]
+        return (
+            pkcs7.PKCS7SignatureBuilder()
+            .set_data(manifest)
+            .add_signer(self.certificate, self.key, hashes.SHA256())
+            .add_certificate(self.wwdr_certificate)
+            .sign(serialization.Encoding.DER, options)
+        )
+
+    # Loaded keys can't be pickled, send them as DER so signers can be handed
+    # to worker processes (which then load them once).
+    def __getstate__(self):
+        return {
+            "certificate": self.certificate.public_bytes(serialization.Encoding.DER),
+            "key": self.key.private_bytes(
+                serialization.Encoding.DER,
+                serialization.PrivateFormat.PKCS8,
+                serialization.NoEncryption(),
+            ),
+            "wwdr_certificate": self.wwdr_certificate.public_bytes(
+                serialization.Encoding.DER
+            ),
+        }
+
+    def __setstate__(self, state):
+        Signer.__init__(
+            self, state["certificate"], state["key"], state["wwdr_certificate"]
+        )
+
+
+class FastSigner(Signer):
+    """Signer producing the same signatures as Signer with less work per pass.
+
+    PKCS7SignatureBuilder re-encodes the certificates and the SignerInfo for
+    every manifest although only the message digest and signing time
+    attributes change. FastSigner signs once with the builder when it is
+    built and keeps that signature as a template: each sign() then only
+    encodes the two attributes, signs them with the key and splices the
+    result in the precomputed DER.
+    """
+
+    def __init__(self, certificate, key, wwdr_certificate, password=None):
+        Signer.__init__(self, certificate, key, wwdr_certificate, password)
+        self._compile()
+
+    def _compile(self):
+        content_info = asn1.parse(Signer.sign(self, b"{}"))
+        content_type, explicit_content = content_info.children()
+        signed_data = explicit_content.children()[0]
+        fields = signed_data.children()
+        signer_infos = fields[-1].children()
+        if len(signer_infos) != 1:
+            raise ValueError("Unexpected PKCS7 template")
+        # version, sid, digestAlgorithm, signedAttrs, signatureAlgorithm,
+        # signature and the optional unsignedAttrs
+        parts = signer_infos[0].children()
+        if parts[3].tag != asn1.CONTEXT_0:
+            raise ValueError("Unexpected PKCS7 template")
+
+        self._content_type = content_type.der
+        self._signed_data_head = b"".join(field.der for field in fields[:-1])
+        self._signer_info_head = b"".join(part.der for part in parts[:3])
+        self._signer_info_tail = parts[4].der
+        self._unsigned_attributes = b"".join(part.der for part in parts[6:])
+        # Signed attributes other than the signing time and message digest
+        # are the same for every pass (content type, S/MIME capabilities)
+        self._attributes = []
+        self._attribute_types = {}
+        for attribute in parts[3].children():
+            attribute_type = attribute.children()[0]
+            oid = asn1.decode_oid(attribute_type.content)
+            if oid in (SIGNING_TIME, MESSAGE_DIGEST):
+                self._attribute_types[oid] = attribute_type.der
+            else:
+                self._attributes.append(attribute.der)
+        if len(self._attribute_types) != 2:
+            raise ValueError("Unexpected PKCS7 template")
+
+    def sign(self, manifest, signing_time=None):
+        """
+        Creates a detached PKCS7 signature (DER encoded) of the manifest.
+        :param manifest: manifest.json content as str or bytes
+        :param signing_time: Optional. UTC datetime of the signature, now by
+            default
+        :returns bytes
+        """
+        if isinstance(manifest, str):
+            manifest = manifest.encode("UTF-8")
+        if signing_time is None:
+            signing_time = datetime.now(timezone.utc)
+        digest = hashlib.sha256(manifest).digest()
+        attributes = self._attributes + [
+            asn1.encode(
+                asn1.SEQUENCE,
+                self._attribute_types[SIGNING_TIME]
+                + asn1.encode(asn1.SET, asn1.encode_time(signing_time)),
+            ),
+            asn1.encode(
+                asn1.SEQUENCE,
+                self._attribute_types[MESSAGE_DIGEST]
+                + asn1.encode(asn1.SET, asn1.encode(asn1.OCTET_STRING, digest)),
+            ),
+        ]
+        # DER orders SET OF by encoding
+        attributes = b"".join(sorted(attributes))
+        signature = self._sign_attributes(asn1.encode(asn1.SET, attributes))
+
+        signer_info = asn1.encode(
+            asn1.SEQUENCE,
+            self._signer_info_head
+            + asn1.encode(asn1.CONTEXT_0, attributes)
+            + self._signer_info_tail
+            + asn1.encode(asn1.OCTET_STRING, signature)
+            + self._unsigned_attributes,
+        )
+        signed_data = asn1.encode(
+            asn1.SEQUENCE,
+            self._signed_data_head + asn1.encode(asn1.SET, signer_info),
+        )
+        return asn1.encode(
+            asn1.SEQUENCE,
+            self._content_type + asn1.encode(asn1.CONTEXT_0, signed_data),
+        )
+
+    def _sign_attributes(self, data):
+        # Same schemes as PKCS7SignatureBuilder for SHA256 signers
+        if isinstance(self.key, rsa.RSAPrivateKey):
+            return self.key.sign(data, padding.PKCS1v15(), hashes.SHA256())
+        if isinstance(self.key, ec.EllipticCurvePrivateKey):
+            return self.key.sign(data, ec.ECDSA(hashes.SHA256()))
+        raise TypeError("Unsupported signing key type")
+
+    def __setstate__(self, state):
+        Signer.__setstate__(self, state)
+        self._compile()
+
+
+def _read_file_bytes(path):
+    """
+    Utility function to read files as byte data
+    :param path: file path
+    :returns bytes
+    """
+    with open(path, "rb") as fd:
+        return fd.read()
+
+
+def _is_path(value):
+    return isinstance(value, (str, os.PathLike))
+
+
+def load_certificate(certificate):
+    """
+    Loads a x509 certificate from a path, PEM/DER bytes or a loaded certificate.
+    """
+    if isinstance(certificate, x509.Certificate):
+        return certificate
+    if _is_path(certificate):
+        certificate = _read_file_bytes(certificate)
+    certificate = bytes(certificate)
+    if b"-----BEGIN" in certificate:
+        return x509.load_pem_x509_certificate(certificate)
+    return x509.load_der_x509_certificate(certificate)
+
+
+def load_private_key(key, password=None):
+    """
+    Loads (and decrypts) a private key from a path, PEM/DER bytes or a loaded key.
+    """
+    if not isinstance(key, (bytes, bytearray, memoryview)) and not _is_path(key):
+        return key
+    key = _read_file_bytes(key) if _is_path(key) else bytes(key)
+    if isinstance(password, str):
+        password = password.encode("UTF-8")
+    if b"-----BEGIN" in key:
+        return serialization.load_pem_private_key(key, password=password)
+    return serialization.load_der_private_key(key, password=password)
@@ -0,0 +1,432 @@
+"""
+Local signing daemon, so that the processes building passes never hold the
+private key.
+
+    PASS_KEY_PASSWORD=... python -m applepassgenerator.signing_daemon \\
+        --socket /run/pkpass/sign.sock --certificate certs/signerCert.pem \\
+        --key certs/signerKey.pem --wwdr-certificate certs/wwdr.pem \\
+        --password-env PASS_KEY_PASSWORD
+
+The daemon signs manifests received over a UNIX socket in a pool of worker
+processes. Manifests arriving together, from one or several connections,
+are signed as a batch: one round-trip to the pool per worker instead of
+one per manifest. Web processes use a RemoteSigner as their signer:
+
+    signer = RemoteSigner("/run/pkpass/sign.sock")
+    apple_pass.create(signer=signer)
+
+Protocol: every message is a frame, a 4 bytes big-endian length followed
+by the body. Request bodies start with an operation byte, FINGERPRINT
+(answered with the certificate fingerprint) or SIGN followed by the
+manifests, each one as a 4 bytes length and its bytes. The answer to SIGN
+holds, for each manifest in order, a status byte (OK or ERROR), a 4 bytes
+length and the signature or the error message. Malformed requests close
+the connection.
+"""
+
+# Standard Library
+import argparse
+import asyncio
+import os
+import queue
+import signal
+import socket
+import stat
+import struct
+import sys
+import threading
+
+from applepassgenerator.batch import create_executor, worker_signer
+from applepassgenerator.signer import BaseSigner, FastSigner, Signer
+
+FINGERPRINT = b"F"
+SIGN = b"S"
+OK = b"\x00"
+ERROR = b"\x01"
+
+_LENGTH = struct.Struct(">I")
+# Largest request accepted, manifests are a few KB each
+MAX_FRAME = 16 * 1024 * 1024
+
+
+def _pack(items):
+    return b"".join(_LENGTH.pack(len(item)) + item for item in items)
+
+
+def _unpack(data, offset=0):
+    """
+    :raises ValueError: if an item runs past the end of data
+    """
+    items = []
+    while offset < len(data):
+        if offset + _LENGTH.size > len(data):
+            raise ValueError("Truncated item length")
+        (length,) = _LENGTH.unpack_from(data, offset)
+        offset += _LENGTH.size
+        if offset + length > len(data):
+            raise ValueError("Truncated item")
+        items.append(data[offset : offset + length])
+        offset += length
+    return items
+
+
+def _sign_many(manifests, signer=None):
+    """
+    Signs a batch of manifests inside a worker.
+    :returns list of (ok, signature or error message)
+    """
+    signer = signer or worker_signer()
+    results = []
+    for manifest in manifests:
+        try:
+            results.append((True, signer.sign(manifest)))
+        except Exception as error:
+            results.append((False, str(error).encode("utf-8")))
+    return results
+
+
+class SigningDaemon(object):
+    """Serves signatures of manifests over a UNIX socket.
+
+    :param signer: Signer (or FastSigner) holding the keys, sent once to
+        each worker
+    :param path: path of the UNIX socket, created readable by the current
+        user only
+    :param workers: number of worker processes, default CPUs
+    :param executor: "process" or "thread" (same process, for tests)
+    :param max_batch: maximum number of manifests signed per batch
+    :param batch_delay: seconds to wait for more manifests before signing a
+        batch, 0 only batches the ones already received
+    :param max_frame: largest request in bytes, larger ones close the
+        connection
+    """
+
+    def __init__(
+        self,
+        signer,
+        path,
+        workers=None,
+        executor="process",
+        max_batch=256,
+        batch_delay=0,
+        max_frame=MAX_FRAME,
+    ):
+        self.signer = signer
+        self.path = path
+        self.workers = workers or os.cpu_count() or 1
+        self.executor = executor
+        self.max_batch = max_batch
+        self.batch_delay = batch_delay
+        self.max_frame = max_frame
+        # Set once the socket accepts connections
+        self.ready = threading.Event()
+        # Number of manifests signed and of batches they were signed in
+        self.signatures = 0
+        self.batches = 0
+        self._loop = None
+        self._stopped = None
+
+    async def serve(self):
+        """
+        Serves until stop() is called.
+        :raises RuntimeError: if path is in use by another daemon or isn't a
+            socket
+        """
+        self._loop = asyncio.get_running_loop()
+        self._stopped = asyncio.Event()
+        self._queue = asyncio.Queue()
+        self._chunks = set()
+        sock = self._bind()
+        bound = os.stat(self.path)
+        self._pool, self._pool_signer = create_executor(
+            self.executor, self.workers, self.signer
+        )
+        batcher = self._loop.create_task(self._batcher())
+        server = await asyncio.start_unix_server(self._handle, sock=sock)
+        try:
+            self.ready.set()
+            await self._stopped.wait()
+        finally:
+            server.close()
+            await server.wait_closed()
+            batcher.cancel()
+            self._pool.shutdown(cancel_futures=True)
+            try:
+                # Unless another daemon took the path over meanwhile
+                if os.path.samestat(os.stat(self.path), bound):
+                    os.unlink(self.path)
+            except FileNotFoundError:
+                pass
+            self.ready.clear()
+
+    def _bind(self):
+        try:
+            mode = os.lstat(self.path).st_mode
+        except FileNotFoundError:
+            pass
+        else:
+            if not stat.S_ISSOCK(mode):
+                raise RuntimeError(f"{self.path} exists and isn't a socket")
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(self.path)
+            except ConnectionRefusedError:
+                # Left over by a daemon that didn't shut down cleanly
+                os.unlink(self.path)
+            else:
+                raise RuntimeError(f"{self.path} is served by another daemon")
+            finally:
+                probe.close()
+
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        # Created readable by the current user only, never more widely
+        umask = os.umask(0o177)
+        try:
+            sock.bind(self.path)
+        except OSError:
+            sock.close()
+            raise
+        finally:
+            os.umask(umask)
+        return sock
+
+    def stop(self):
+        # Callable from any thread or a signal handler
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._stopped.set)
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                header = await reader.readexactly(_LENGTH.size)
+                (length,) = _LENGTH.unpack(header)
+                if length > self.max_frame:
+                    break
+                body = await reader.readexactly(length)
+                if body[:1] == FINGERPRINT:
+                    response = self.signer.fingerprint.encode("ascii")
+                elif body[:1] == SIGN:
+                    response = await self._sign(_unpack(body, 1))
+                else:
+                    break
+                writer.write(_LENGTH.pack(len(response)) + response)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            # Closed by the client, or a malformed request
+            pass
+        finally:
+            writer.close()
+
+    async def _sign(self, manifests):
+        futures = []
+        for manifest in manifests:
+            future = self._loop.create_future()
+            self._queue.put_nowait((manifest, future))
+            futures.append(future)
+        response = []
+        for ok, data in await asyncio.gather(*futures):
+            response.append((OK if ok else ERROR) + _LENGTH.pack(len(data)) + data)
+        return b"".join(response)
+
+    async def _batcher(self):
+        while True:
+            requests = [await self._queue.get()]
+            if self.batch_delay:
+                await asyncio.sleep(self.batch_delay)
+            while len(requests) < self.max_batch and not self._queue.empty():
+                requests.append(self._queue.get_nowait())
+            self.batches += 1
+            self.signatures += len(requests)
+            # One chunk per worker, results are handed out as chunks finish
+            size = -(-len(requests) // self.workers)
+            for start in range(0, len(requests), size):
+                task = self._loop.create_task(
+                    self._sign_chunk(requests[start : start + size])
+                )
+                # The loop only keeps weak references to tasks
+                self._chunks.add(task)
+                task.add_done_callback(self._chunks.discard)
+
+    async def _sign_chunk(self, requests):
+        try:
+            results = await self._loop.run_in_executor(
+                self._pool,
+                _sign_many,
+                [manifest for manifest, _ in requests],
+                self._pool_signer,
+            )
+        except Exception as error:
+            results = [(False, str(error).encode("utf-8"))] * len(requests)
+        for (_, future), result in zip(requests, results):
+            if not future.done():
+                future.set_result(result)
+
+
+def _recv_exact(sock, size):
+    data = bytearray()
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("Signing daemon closed the connection")
+        data += chunk
+    return bytes(data)
+
+
+class RemoteSigner(BaseSigner):
+    """Signer asking a SigningDaemon for the signatures.
+
+    Thread-safe, up to pool_size connections are opened and reused. A
+    pooled connection found closed (e.g. the daemon restarted) is replaced
+    once. Batch several manifests with sign_many() to save round-trips.
+    """
+
+    def __init__(self, path, pool_size=4, timeout=30.0):
+        self.path = path
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self._fingerprint = None
+        self._init_pool()
+
+    def _init_pool(self):
+        self._connections = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(self.pool_size)
+
+    @property
+    def fingerprint(self):
+        if self._fingerprint is None:
+            self._fingerprint = self._request(FINGERPRINT).decode("ascii")
+        return self._fingerprint
+
+    def sign(self, manifest):
+        """
+        Creates a detached PKCS7 signature (DER encoded) of the manifest.
+        :param manifest: manifest.json content as str or bytes
+        :returns bytes
+        """
+        return self.sign_many([manifest])[0]
+
+    def sign_many(self, manifests):
+        """
+        Signs several manifests in a single request.
+        :returns list of signatures, in the order of manifests
+        """
+        manifests = [
+            m.encode("UTF-8") if isinstance(m, str) else bytes(m) for m in manifests
+        ]
+        response = self._request(SIGN + _pack(manifests))
+        signatures = []
+        offset = 0
+        for _ in manifests:
+            status = response[offset : offset + 1]
+            (length,) = _LENGTH.unpack_from(response, offset + 1)
+            offset += 1 + _LENGTH.size
+            data = response[offset : offset + length]
+            offset += length
+            if status != OK:
+                raise RuntimeError(f"Signing failed: {data.decode('utf-8')}")
+            signatures.append(data)
+        return signatures
+
+    def _connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.path)
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+    def _request(self, body):
+        with self._slots:
+            try:
+                sock = self._connections.get_nowait()
+            except queue.Empty:
+                sock = None
+            while True:
+                fresh = sock is None
+                if fresh:
+                    sock = self._connect()
+                try:
+                    sock.sendall(_LENGTH.pack(len(body)) + body)
+                    header = _recv_exact(sock, _LENGTH.size)
+                    response = _recv_exact(sock, _LENGTH.unpack(header)[0])
+                except OSError:
+                    sock.close()
+                    sock = None
+                    if fresh:
+                        raise
+                    continue
+                self._connections.put(sock)
+                return response
+
+    def close(self):
+        while True:
+            try:
+                self._connections.get_nowait().close()
+            except queue.Empty:
+                return
+
+    # Sockets can't be pickled, batch workers open their own connections
+    def __getstate__(self):
+        return {
+            "path": self.path,
+            "pool_size": self.pool_size,
+            "timeout": self.timeout,
+            "_fingerprint": self._fingerprint,
+        }
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._init_pool()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m applepassgenerator.signing_daemon",
+        description="Sign pass manifests received over a UNIX socket.",
+    )
+    parser.add_argument("--socket", required=True, help="UNIX socket path")
+    parser.add_argument("--certificate", required=True, help="signer certificate")
+    parser.add_argument("--key", required=True, help="signer private key")
+    parser.add_argument("--wwdr-certificate", required=True, help="WWDR certificate")
+    parser.add_argument(
+        "--password-env", help="environment variable holding the key password"
+    )
+    parser.add_argument("--workers", type=int, help="worker processes, default CPUs")
+    parser.add_argument("--max-batch", type=int, default=256)
+    parser.add_argument(
+        "--batch-delay",
+        type=float,
+        default=0,
+        help="seconds to wait for more manifests before signing a batch",
+    )
+    parser.add_argument(
+        "--fast", action="store_true", help="sign with a FastSigner template"
+    )
+    args = parser.parse_args(argv)
+
+    password = os.environ[args.password_env] if args.password_env else None
+    signer_class = FastSigner if args.fast else Signer
+    signer = signer_class(args.certificate, args.key, args.wwdr_certificate, password)
+    daemon = SigningDaemon(
+        signer,
+        args.socket,
+        workers=args.workers,
+        max_batch=args.max_batch,
+        batch_delay=args.batch_delay,
+    )
+
+    async def serve():
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, daemon.stop)
+        await daemon.serve()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,162 @@
+# Standard Library
+import asyncio
+import threading
+
+
+class _Call(object):
+    """A call in progress, waited on by the threads requesting the same key."""
+
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight(object):
+    """Runs at most one call per key at a time.
+
+    Callers asking for a key while a call for it is in progress wait for
+    that call and get its result (or exception) instead of running their
+    own. Works across threads with do() and within an event loop with
+    do_async(); the two don't share calls.
+
+    requests counts every do()/do_async(), executions the calls actually
+    run and coalesced the requests served by another caller's call. An
+    optional callback receives (key, coalesced) for each request, e.g. to
+    feed a metrics counter.
+    """
+
+    def __init__(self, callback=None):
+        self.callback = callback
+        self.requests = 0
+        self.executions = 0
+        self.coalesced = 0
+        self._calls = {}  # key -> _Call
+        self._tasks = {}  # (loop, key) -> asyncio.Task
+        self._lock = threading.Lock()
+
+    @property
+    def in_flight(self):
+        return len(self._calls) + len(self._tasks)
+
+    def stats(self):
+        return {
+            "requests": self.requests,
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "in_flight": self.in_flight,
+        }
+
+    def _count(self, coalesced):
+        # Called with the lock held
+        self.requests += 1
+        if coalesced:
+            self.coalesced += 1
+        else:
+            self.executions += 1
+
+    def do(self, key, func, *args):
+        """
+        Returns func(*args), sharing the result with the other threads
+        calling do() with the same key meanwhile.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            coalesced = call is not None
+            if not coalesced:
+                call = self._calls[key] = _Call()
+            self._count(coalesced)
+        if self.callback is not None:
+            self.callback(key, coalesced)
+
+        if coalesced:
+            call.done.wait()
+        else:
+            try:
+                call.result = func(*args)
+            except BaseException as error:
+                call.error = error
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    async def do_async(self, key, func, *args):
+        """
+        Awaits func(*args) (a coroutine function), sharing the result with
+        the other tasks of the loop calling do_async() with the same key
+        meanwhile. Cancelling a caller doesn't cancel the shared call.
+        """
+        loop = asyncio.get_running_loop()
+        task_key = (loop, key)
+        with self._lock:
+            task = self._tasks.get(task_key)
+            coalesced = task is not None
+            if not coalesced:
+                task = self._tasks[task_key] = loop.create_task(func(*args))
+                task.add_done_callback(lambda _: self._forget(task_key))
+            self._count(coalesced)
+        if self.callback is not None:
+            self.callback(key, coalesced)
+        return await asyncio.shield(task)
+
+    def _forget(self, task_key):
+        with self._lock:
+            del self._tasks[task_key]
+
+
+class CoalescingClient(object):
+    """Wraps an ApplePassGeneratorClient so that concurrent requests for the
+    same pass share one generation.
+
+    Requests are identified by (pass type identifier, serial number, content
+    version). The version defaults to the pass manifest, i.e. the SHA1 of
+    pass.json and of every file, so passes whose content differs are never
+    merged. Pass one (e.g. the row's update timestamp) to skip computing it.
+    """
+
+    def __init__(self, client, single_flight=None):
+        self.client = client
+        self.single_flight = single_flight or SingleFlight()
+
+    def get_pass(self, card_info, pass_type_identifier=None):
+        return self.client.get_pass(card_info, pass_type_identifier)
+
+    def key(self, apple_pass, version=None):
+        if version is None:
+            version = apple_pass._create_manifest(apple_pass._create_pass_json())
+        return (apple_pass.pass_type_identifier, apple_pass.serial_number, version)
+
+    def create_pass(self, apple_pass, version=None, signer=None):
+        """
+        Creates the .pkpass of apple_pass, or waits for the identical one
+        being created by another thread.
+        :returns the archive bytes
+        """
+        return self.single_flight.do(
+            self.key(apple_pass, version), _create, apple_pass, signer
+        )
+
+    async def create_pass_async(self, apple_pass, version=None, signer=None):
+        """
+        Like create_pass() for asyncio, the generation runs through
+        ApplePassGeneratorClient.create_pass_async().
+        :returns the archive bytes
+        """
+        return await self.single_flight.do_async(
+            self.key(apple_pass, version), self._create_async, apple_pass, signer
+        )
+
+    async def _create_async(self, apple_pass, signer):
+        zip_file = await self.client.create_pass_async(apple_pass, signer)
+        return zip_file.getvalue()
+
+
+def _create(apple_pass, signer):
+    # Bytes rather than the BytesIO, the result is shared by every caller
+    return apple_pass.create(signer=signer).getvalue()
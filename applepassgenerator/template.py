@@ -0,0 +1,115 @@
+# Standard Library
+import json
+import re
+from uuid import uuid4
+
+from applepassgenerator.apple_pass import pass_handler
+from applepassgenerator.instrumentation import PASS_JSON, _call
+
+
+class Placeholder(object):
+    """ Marks a pass value that is filled in when a PassTemplate is rendered.
+
+    Use it in place of any value that ends up in pass.json, e.g. the serial
+    number, a barcode message or a field value. The same name can be used in
+    several places. Keys that are only written when their value is set (like
+    relevant_date) are always written when they hold a placeholder.
+    """
+
+    def __init__(self, name):
+        self.name = name
+
+    def __repr__(self):
+        return f"Placeholder({self.name!r})"
+
+
+class PassTemplate(object):
+    """ An ApplePass compiled into a pre-serialized pass.json skeleton.
+
+    The object graph is serialized once, at compile time. Rendering a pass
+    only encodes the placeholder values and splices them in, the result is
+    byte-identical to what ApplePass.create() writes for the same values.
+    """
+
+    def __init__(self, apple_pass):
+        self.apple_pass = apple_pass
+        self._segments, self.placeholders = self._compile()
+
+    def _compile(self):
+        # Every placeholder is serialized as a unique marker string, the
+        # skeleton is then split around those markers.
+        prefix = f"__placeholder_{uuid4().hex}_"
+        markers = {}
+
+        def default(obj):
+            if isinstance(obj, Placeholder):
+                markers[prefix + obj.name] = obj.name
+                return prefix + obj.name
+            return pass_handler(obj)
+
+        skeleton = json.dumps(
+            self.apple_pass, default=default, sort_keys=self.apple_pass.deterministic
+        )
+        pattern = re.compile(
+            "|".join(re.escape(json.dumps(marker)) for marker in markers) or "(?!)"
+        )
+        segments = []
+        position = 0
+        for match in pattern.finditer(skeleton):
+            segments.append(skeleton[position : match.start()])
+            segments.append(markers[json.loads(match.group())])
+            position = match.end()
+        segments.append(skeleton[position:])
+        # Literal text at even indexes, placeholder names at odd indexes
+        return segments, frozenset(markers.values())
+
+    def render(self, values):
+        """
+        Builds pass.json for the given placeholder values.
+        :param values: dict of placeholder name -> value
+        :returns str
+        """
+        missing = self.placeholders.difference(values)
+        if missing:
+            raise KeyError(f"Missing placeholder values: {', '.join(sorted(missing))}")
+        segments = self._segments
+        sort_keys = self.apple_pass.deterministic
+        parts = [segments[0]]
+        for i in range(1, len(segments), 2):
+            parts.append(
+                json.dumps(
+                    values[segments[i]], default=pass_handler, sort_keys=sort_keys
+                )
+            )
+            parts.append(segments[i + 1])
+        return "".join(parts)
+
+    def create(
+        self,
+        values,
+        signer=None,
+        zip_file=None,
+        instrumentation=None,
+        cache=None,
+        return_etag=False,
+    ):
+        """
+        Creates the .pkpass for the given placeholder values. Safe to call
+        from several threads, nothing is stored on the template pass.
+        :param signer: Signer to use, defaults to the template pass' signer
+        :param instrumentation: Instrumentation receiving the stage timings,
+            defaults to the template pass' instrumentation
+        :param cache: archive cache, defaults to the template pass' cache
+        :param return_etag: return (zip_file, etag), see ApplePass.create()
+        :returns zip_file or a BytesIO
+        """
+        signer = signer or self.apple_pass.signer
+        if signer is None:
+            raise ValueError("PassTemplate.create() needs a Signer")
+        instrumentation = instrumentation or self.apple_pass.instrumentation
+        measure = instrumentation.measure if instrumentation else _call
+        pass_json = measure(PASS_JSON, self.render, values)
+        zip_file, etag = self.apple_pass._create_from_pass_json(
+            pass_json, signer, zip_file, instrumentation, cache
+        )
+        return (zip_file, etag) if return_etag else zip_file
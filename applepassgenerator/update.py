@@ -0,0 +1,107 @@
+# Standard Library
+import hashlib
+import json
+from io import BytesIO
+
+from applepassgenerator.archive import (
+    FIXED_DATE_TIME,
+    ZipEntry,
+    decompress,
+    read_entries,
+    write_zip,
+)
+
+# Top level keys of pass.json holding lists of fields
+FIELD_LISTS = (
+    "headerFields",
+    "primaryFields",
+    "secondaryFields",
+    "auxiliaryFields",
+    "backFields",
+)
+
+
+def update_pass(
+    source, signer, changes=None, fields=None, zip_file=None, compresslevel=None
+):
+    """
+    Updates an existing .pkpass, rewriting only pass.json, manifest.json and
+    the signature. The other members (images, localizations) are copied raw,
+    without being decompressed, recompressed or hashed again.
+
+    :param source: path, bytes or seekable file object of the .pkpass
+    :param signer: Signer used for the new signature
+    :param changes: dict of top level pass.json keys to set, e.g.
+        {"voided": True}. A None value removes the key.
+    :param fields: dict of field key -> new value, or -> dict of field
+        attributes to set (e.g. {"value": "B12", "changeMessage": "Gate %@"})
+    :param zip_file: where to write the updated pass, a BytesIO by default
+    :param compresslevel: zlib level of the regenerated members, the one the
+        pass was created with (zip archives don't record it)
+    :returns zip_file or a BytesIO
+
+    Regenerated members keep the compression and, for deterministic passes,
+    the fixed timestamp of the members they replace and sorted JSON keys, so
+    an updated pass is identical to a freshly created one apart from the
+    signature.
+    """
+    entries = read_entries(source)
+    by_name = {entry.name: entry for entry in entries}
+    # Deterministic passes are written with FIXED_DATE_TIME
+    deterministic = by_name["pass.json"].date_time == FIXED_DATE_TIME
+
+    pass_data = json.loads(decompress(by_name["pass.json"]))
+    _apply_changes(pass_data, changes or {}, fields or {})
+    pass_json = json.dumps(pass_data, sort_keys=deterministic)
+
+    # Unchanged files keep their hash, only pass.json needs a new one
+    manifest_data = json.loads(decompress(by_name["manifest.json"]))
+    manifest_data["pass.json"] = hashlib.sha1(pass_json.encode("utf-8")).hexdigest()
+    manifest = json.dumps(manifest_data, sort_keys=deterministic)
+    signature = signer.sign(manifest)
+
+    regenerated = {
+        "signature": signature,
+        "manifest.json": manifest,
+        "pass.json": pass_json,
+    }
+    if not zip_file:
+        zip_file = BytesIO()
+    write_zip(zip_file, _updated_entries(entries, regenerated, compresslevel))
+    return zip_file
+
+
+def _updated_entries(entries, regenerated, compresslevel=None):
+    for entry in entries:
+        data = regenerated.get(entry.name)
+        if data is None:
+            yield entry
+        else:
+            date_time = FIXED_DATE_TIME if entry.date_time == FIXED_DATE_TIME else None
+            yield ZipEntry.compress(
+                entry.name, data, entry.compress_type, compresslevel, date_time
+            )
+
+
+def _apply_changes(pass_data, changes, fields):
+    for key, value in changes.items():
+        if value is None:
+            pass_data.pop(key, None)
+        else:
+            pass_data[key] = value
+
+    if not fields:
+        return
+    remaining = set(fields)
+    for style in ("boardingPass", "coupon", "eventTicket", "generic", "storeCard"):
+        for field_list in FIELD_LISTS:
+            for field in pass_data.get(style, {}).get(field_list, []):
+                if field.get("key") in fields:
+                    update = fields[field["key"]]
+                    if isinstance(update, dict):
+                        field.update(update)
+                    else:
+                        field["value"] = update
+                    remaining.discard(field["key"])
+    if remaining:
+        raise KeyError(f"Unknown fields: {', '.join(sorted(remaining))}")
@@ -1,3 +1,7 @@
+# Marks optional pass.json keys that were never set
+_UNSET = object()
+
+
 class Alignment:
     LEFT = "PKTextAlignmentLeft"
     CENTER = "PKTextAlignmentCenter"
@@ -28,7 +32,44 @@ class NumberStyle:
     SPELLOUT = "PKNumberStyleSpellOut"
 
 
-class Field(object):
+class JsonSlots(object):
+    """Base class of the compact (slotted) models written to pass.json.
+
+    Subclasses declare their slots and the pass.json keys, in output order,
+    in _json_keys. Keys listed in _optional_json_keys are only written once
+    they have been set. Attributes outside the slots can't be set, so nothing
+    unexpected can leak into pass.json.
+    """
+
+    __slots__ = ()
+    _json_keys = ()
+    _optional_json_keys = ()
+
+    def json_dict(self):
+        d = {key: getattr(self, key) for key in self._json_keys}
+        for key in self._optional_json_keys:
+            value = getattr(self, key, _UNSET)
+            if value is not _UNSET:
+                d[key] = value
+        return d
+
+
+class Field(JsonSlots):
+    __slots__ = (
+        "key",
+        "value",
+        "label",
+        "changeMessage",
+        "textAlignment",
+        "attributedValue",
+        "dataDetectorTypes",
+        "semantics",
+        "row",
+    )
+    _json_keys = ("key", "value", "label", "changeMessage", "textAlignment")
+    # Optional keys of the pass.json field dictionary, set them as attributes
+    _optional_json_keys = ("attributedValue", "dataDetectorTypes", "semantics", "row")
+
     def __init__(self, key, value, label=""):
         self.key = key  # Required. The key must be unique within the scope
         self.value = value  # Required. Value of the field. For example, 42
@@ -36,11 +77,12 @@ class Field(object):
         self.changeMessage = ""  # Optional. Format string for the alert text that is displayed when the pass is updated
         self.textAlignment = Alignment.LEFT
 
-    def json_dict(self):
-        return self.__dict__
-
 
 class DateField(Field):
+    __slots__ = ("dateStyle", "timeStyle", "isRelative", "ignoresTimeZone")
+    _json_keys = Field._json_keys + ("dateStyle", "timeStyle", "isRelative")
+    _optional_json_keys = Field._optional_json_keys + ("ignoresTimeZone",)
+
     def __init__(
         self,
         key,
@@ -59,29 +101,30 @@ class DateField(Field):
         if ignores_time_zone:
             self.ignoresTimeZone = ignores_time_zone
 
-    def json_dict(self):
-        return self.__dict__
-
 
 class NumberField(Field):
+    __slots__ = ("numberStyle",)
+    _json_keys = Field._json_keys + __slots__
+
     def __init__(self, key, value, label=""):
         super(NumberField, self).__init__(key, value, label)
         self.numberStyle = NumberStyle.DECIMAL  # Style of date to display
 
-    def json_dict(self):
-        return self.__dict__
-
 
 class CurrencyField(NumberField):
+    __slots__ = ("currencyCode",)
+    _json_keys = NumberField._json_keys + __slots__
+
     def __init__(self, key, value, label="", currency_code=""):
         super(CurrencyField, self).__init__(key, value, label)
         self.currencyCode = currency_code  # ISO 4217 currency code
 
-    def json_dict(self):
-        return self.__dict__
 
+class Barcode(JsonSlots):
+    __slots__ = ("format", "message", "messageEncoding", "altText")
+    _json_keys = ("format", "message", "messageEncoding")
+    _optional_json_keys = ("altText",)
 
-class Barcode(object):
     def __init__(
         self,
         message,
@@ -97,11 +140,11 @@ class Barcode(object):
         if alt_text:
             self.altText = alt_text  # Optional. Text displayed near the barcode
 
-    def json_dict(self):
-        return self.__dict__
 
+class Location(JsonSlots):
+    __slots__ = ("latitude", "longitude", "altitude", "distance", "relevantText")
+    _json_keys = __slots__
 
-class Location(object):
     def __init__(self, latitude, longitude, altitude=0.0):
         # Required. Latitude, in degrees, of the location.
         try:
@@ -124,6 +167,3 @@ class Location(object):
         # the pass is currently near the location
         self.relevantText = ""
 
-    def json_dict(self):
-        return self.__dict__
-
@@ -0,0 +1,446 @@
+"""
+Verification of issued .pkpass archives.
+
+    python -m applepassgenerator.verify passes/ --trusted certs/wwdr.pem
+
+checks every .pkpass under a directory in parallel and prints one JSON line
+per failing archive.
+"""
+
+# Standard Library
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import sys
+import zipfile
+import zlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timezone
+
+# Third Party Stuff
+from cryptography import x509
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.asymmetric import ec, padding, rsa
+from cryptography.x509.oid import NameOID
+
+from applepassgenerator import asn1
+from applepassgenerator.archive import decompress, read_entries
+from applepassgenerator.signer import load_certificate
+
+SIGNED_DATA = "1.2.840.113549.1.7.2"
+MESSAGE_DIGEST = "1.2.840.113549.1.9.4"
+DIGESTS = {
+    "1.3.14.3.2.26": hashes.SHA1,
+    "2.16.840.1.101.3.4.2.1": hashes.SHA256,
+    "2.16.840.1.101.3.4.2.2": hashes.SHA384,
+    "2.16.840.1.101.3.4.2.3": hashes.SHA512,
+}
+# Archive members not listed in the manifest
+UNSIGNED_FILES = ("manifest.json", "signature")
+
+
+class VerificationResult(object):
+    def __init__(self, path, errors):
+        self.path = path
+        self.errors = errors
+
+    @property
+    def ok(self):
+        return not self.errors
+
+    def json_dict(self):
+        return {"path": self.path, "ok": self.ok, "errors": self.errors}
+
+
+class PassVerifier(object):
+    """Checks .pkpass archives: file hashes, signature and certificate chain.
+
+    :param trusted_certificates: certificates (paths, bytes or loaded) the
+        signer certificate must chain to, typically the WWDR certificate.
+        Embedded intermediates are only accepted when they are CAs allowed
+        to sign certificates, within their path length.
+    :param check_validity: also reject certificates of the chain that are
+        expired or not yet valid
+    :param pass_type_identifier: Optional. Pass type the passes must have in
+        pass.json and their signer certificate in its UID
+    :raises ValueError: without trusted certificates
+
+    Certificate chains are verified once per signer and cached.
+    """
+
+    def __init__(
+        self, trusted_certificates, check_validity=False, pass_type_identifier=None
+    ):
+        self.trusted_certificates = [load_certificate(c) for c in trusted_certificates]
+        if not self.trusted_certificates:
+            raise ValueError("PassVerifier requires a trusted (WWDR) certificate")
+        self.check_validity = check_validity
+        self.pass_type_identifier = pass_type_identifier
+        # embedded certificates DER -> {(issuer DER, serial): (cert, error)}
+        self._signers = {}
+
+    def verify_file(self, path):
+        """
+        :returns VerificationResult
+        """
+        try:
+            with open(path, "rb") as fd, mmap.mmap(
+                fd.fileno(), 0, access=mmap.ACCESS_READ
+            ) as data:
+                errors = self.verify(data)
+        except (OSError, ValueError, zipfile.BadZipFile) as e:
+            errors = [f"unreadable archive: {e}"]
+        except Exception as e:
+            # One broken archive must not abort the verification of a tree
+            errors = [f"verification failed: {e!r}"]
+        return VerificationResult(path, errors)
+
+    def verify(self, source):
+        """
+        :param source: path, bytes, mmap or seekable file object of a .pkpass
+        :returns list of error messages, empty if the pass is valid
+        """
+        errors = []
+        files = {}
+        for entry in read_entries(source):
+            try:
+                data = decompress(entry)
+            except zlib.error as e:
+                errors.append(f"{entry.name}: corrupt data ({e})")
+                continue
+            if zlib.crc32(data) != entry.crc:
+                errors.append(f"{entry.name}: CRC mismatch")
+            files[entry.name] = data
+
+        if "manifest.json" not in files:
+            return errors + ["manifest.json missing"]
+        try:
+            manifest = json.loads(files["manifest.json"])
+        except ValueError as e:
+            return errors + [f"manifest.json: invalid JSON ({e})"]
+
+        for name, data in files.items():
+            if name in UNSIGNED_FILES:
+                continue
+            expected = manifest.get(name)
+            if expected is None:
+                errors.append(f"{name}: not in manifest")
+            elif hashlib.sha1(data).hexdigest() != expected:
+                errors.append(f"{name}: SHA1 mismatch")
+        for name in manifest:
+            if name not in files:
+                errors.append(f"{name}: in manifest but missing")
+
+        if "pass.json" in files:
+            try:
+                pass_json = json.loads(files["pass.json"])
+            except ValueError as e:
+                errors.append(f"pass.json: invalid JSON ({e})")
+            else:
+                pass_type_identifier = pass_json.get("passTypeIdentifier")
+                if self.pass_type_identifier not in (None, pass_type_identifier):
+                    errors.append(
+                        f"pass.json: unexpected pass type {pass_type_identifier!r}"
+                    )
+
+        if "signature" not in files:
+            errors.append("signature missing")
+        else:
+            errors.extend(
+                self.verify_signature(files["signature"], files["manifest.json"])
+            )
+        return errors
+
+    def verify_signature(self, signature, manifest):
+        """
+        Verifies a detached PKCS7 signature of the manifest.
+        :returns list of error messages
+        """
+        try:
+            signed_data = _signed_data(signature)
+        except (ValueError, IndexError) as e:
+            return [f"signature: malformed ({e})"]
+
+        certificates, signer_infos = signed_data
+        if not signer_infos:
+            return ["signature: no signer"]
+        errors = []
+        for signer_info in signer_infos:
+            issuer_and_serial, digest_oid, signed_attributes, signature_value = (
+                signer_info
+            )
+            certificate, chain_error = self._signer(certificates, issuer_and_serial)
+            if chain_error:
+                errors.append(f"signature: {chain_error}")
+                continue
+            if self.pass_type_identifier is not None:
+                uids = certificate.subject.get_attributes_for_oid(NameOID.USER_ID)
+                if [uid.value for uid in uids] != [self.pass_type_identifier]:
+                    errors.append("signature: signer of another pass type")
+                    continue
+
+            digest = DIGESTS.get(digest_oid)
+            if digest is None:
+                errors.append(f"signature: unsupported digest {digest_oid}")
+                continue
+            message_digest = _message_digest(signed_attributes)
+            expected = hashes.Hash(digest())
+            expected.update(manifest)
+            if message_digest != expected.finalize():
+                errors.append("signature: manifest digest mismatch")
+                continue
+            # Signed attributes are signed as a SET, not with their [0] tag
+            signed_bytes = b"\x31" + signed_attributes.der[1:]
+            try:
+                _verify(certificate.public_key(), signature_value, signed_bytes, digest)
+            except InvalidSignature:
+                errors.append("signature: invalid")
+        return errors
+
+    def _signer(self, certificates, issuer_and_serial):
+        # Parsing and verifying the chain only happens once per signer
+        key = b"".join(certificates)
+        signers = self._signers.get(key)
+        if signers is None:
+            signers = self._signers[key] = self._verify_chains(certificates)
+        return signers.get(issuer_and_serial, (None, "signer certificate not found"))
+
+    def _verify_chains(self, certificates):
+        loaded = [x509.load_der_x509_certificate(c) for c in certificates]
+        signers = {}
+        for certificate in loaded:
+            signers[(certificate.issuer.public_bytes(), certificate.serial_number)] = (
+                certificate,
+                self._chain_error(certificate, loaded),
+            )
+        return signers
+
+    def _chain_error(self, certificate, embedded):
+        if self.check_validity and not _valid_now(certificate):
+            return "signer certificate expired or not yet valid"
+        intermediates = [c for c in embedded if c is not certificate]
+        if self._chains(certificate, intermediates, 0):
+            return None
+        return "untrusted signer certificate"
+
+    def _chains(self, certificate, intermediates, depth):
+        """
+        :returns whether certificate chains to a trusted certificate, through
+            the intermediates not used yet
+        :param depth: number of intermediates between certificate and the
+            signer, limited by the path length of the CAs above
+        """
+        for anchor in self.trusted_certificates:
+            if self._can_issue(anchor, depth) and _issued_by(certificate, anchor):
+                return True
+        for intermediate in intermediates:
+            if (
+                self._can_issue(intermediate, depth)
+                and _issued_by(certificate, intermediate)
+                and self._chains(
+                    intermediate,
+                    [c for c in intermediates if c is not intermediate],
+                    depth + 1,
+                )
+            ):
+                return True
+        return False
+
+    def _can_issue(self, issuer, depth):
+        """
+        :returns whether issuer is a CA allowed to sign certificates with
+            depth intermediates below it
+        """
+        try:
+            constraints = issuer.extensions.get_extension_for_class(
+                x509.BasicConstraints
+            ).value
+        except x509.ExtensionNotFound:
+            return False
+        if not constraints.ca:
+            return False
+        if constraints.path_length is not None and depth > constraints.path_length:
+            return False
+        try:
+            key_usage = issuer.extensions.get_extension_for_class(x509.KeyUsage).value
+        except x509.ExtensionNotFound:
+            key_usage = None
+        if key_usage is not None and not key_usage.key_cert_sign:
+            return False
+        return not self.check_validity or _valid_now(issuer)
+
+
+def _valid_now(certificate):
+    now = datetime.now(timezone.utc)
+    return certificate.not_valid_before_utc <= now <= certificate.not_valid_after_utc
+
+
+def _issued_by(certificate, issuer):
+    try:
+        certificate.verify_directly_issued_by(issuer)
+    except (ValueError, TypeError, InvalidSignature):
+        return False
+    return True
+
+
+def _verify(public_key, signature, data, digest):
+    if isinstance(public_key, rsa.RSAPublicKey):
+        public_key.verify(signature, data, padding.PKCS1v15(), digest())
+    elif isinstance(public_key, ec.EllipticCurvePublicKey):
+        public_key.verify(signature, data, ec.ECDSA(digest()))
+    else:
+        raise InvalidSignature()
+
+
+def _signed_data(signature):
+    """
+    :returns (embedded certificates DER, signer infos) of a PKCS7
+        ContentInfo, each signer info as ((certificate issuer DER, serial
+        number), digest algorithm OID, signed attributes element, signature
+        bytes)
+    """
+    content_type, content = asn1.parse(signature).children()
+    if asn1.decode_oid(content_type.content) != SIGNED_DATA:
+        raise ValueError("not a SignedData")
+    fields = content.children()[0].children()
+    certificates = []
+    for field in fields[3:-1]:
+        if field.tag == 0xA0:
+            certificates = [c.der for c in field.children()]
+
+    signer_infos = []
+    for signer_info in fields[-1].children():
+        parts = signer_info.children()
+        issuer_and_serial = parts[1].children()
+        digest_algorithm = parts[2].children()[0]
+        signed_attributes = parts[3]
+        if signed_attributes.tag != 0xA0:
+            raise ValueError("no signed attributes")
+        signer_infos.append(
+            (
+                (
+                    issuer_and_serial[0].der,
+                    asn1.decode_integer(issuer_and_serial[1].content),
+                ),
+                asn1.decode_oid(digest_algorithm.content),
+                signed_attributes,
+                parts[5].content,
+            )
+        )
+    return certificates, signer_infos
+
+
+def _message_digest(signed_attributes):
+    for attribute in signed_attributes.children():
+        oid, values = attribute.children()
+        if asn1.decode_oid(oid.content) == MESSAGE_DIGEST:
+            return values.children()[0].content
+    return None
+
+
+# Verifier of the current worker process, built once by _init_worker
+_worker_verifier = None
+
+
+def _init_worker(verifier):
+    global _worker_verifier
+    _worker_verifier = verifier
+
+
+def _verify_paths(paths, verifier=None):
+    verifier = verifier or _worker_verifier
+    return [verifier.verify_file(path) for path in paths]
+
+
+def find_passes(root):
+    """
+    Yields the paths of the .pkpass files under root, lazily.
+    """
+    for directory, _, filenames in os.walk(root):
+        for filename in filenames:
+            if filename.endswith(".pkpass"):
+                yield os.path.join(directory, filename)
+
+
+def verify_tree(
+    root,
+    verifier,
+    failures_only=True,
+    executor="process",
+    max_workers=None,
+    chunk_size=64,
+):
+    """
+    Verifies every .pkpass under root in parallel.
+    :param verifier: PassVerifier, copied once to every worker
+    :param failures_only: only yield the results of invalid passes
+    :param executor: "process" or "thread"
+    :param chunk_size: archives verified per task
+    :returns iterator of VerificationResult, streamed in directory walk order
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    if executor == "process":
+        pool = ProcessPoolExecutor(
+            max_workers, initializer=_init_worker, initargs=(verifier,)
+        )
+        task_verifier = None
+    else:
+        pool = ThreadPoolExecutor(max_workers)
+        task_verifier = verifier
+
+    in_flight = deque()
+    paths = find_passes(root)
+    with pool:
+        while True:
+            chunk = [path for _, path in zip(range(chunk_size), paths)]
+            if chunk:
+                in_flight.append(pool.submit(_verify_paths, chunk, task_verifier))
+            if not in_flight:
+                break
+            if chunk and len(in_flight) < 2 * max_workers:
+                continue
+            for result in in_flight.popleft().result():
+                if not (failures_only and result.ok):
+                    yield result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m applepassgenerator.verify",
+        description="Verify every .pkpass under a directory.",
+    )
+    parser.add_argument("root", help="directory to scan")
+    parser.add_argument(
+        "--trusted",
+        action="append",
+        required=True,
+        help="certificate the signers must chain to, e.g. WWDR (repeatable)",
+    )
+    parser.add_argument(
+        "--pass-type-identifier", help="pass type every pass must be signed for"
+    )
+    parser.add_argument(
+        "--check-validity", action="store_true", help="reject expired signers"
+    )
+    parser.add_argument("--all", action="store_true", help="report valid passes too")
+    parser.add_argument("--workers", type=int, help="parallel workers, default CPUs")
+    args = parser.parse_args(argv)
+
+    verifier = PassVerifier(
+        args.trusted, args.check_validity, args.pass_type_identifier
+    )
+    failures = 0
+    for result in verify_tree(
+        args.root, verifier, failures_only=not args.all, max_workers=args.workers
+    ):
+        failures += not result.ok
+        print(json.dumps(result.json_dict()), flush=True)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,372 @@
+# Standard Library
+import hashlib
+import hmac
+import json
+import logging
+import sqlite3
+import threading
+import time
+from email.utils import formatdate, parsedate_to_datetime
+
+from applepassgenerator.cache import MemoryPassCache
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS passes (
+    pass_type_identifier TEXT NOT NULL,
+    serial_number TEXT NOT NULL,
+    authentication_token TEXT NOT NULL,
+    etag TEXT NOT NULL,
+    updated_at INTEGER NOT NULL,
+    PRIMARY KEY (pass_type_identifier, serial_number)
+);
+CREATE TABLE IF NOT EXISTS registrations (
+    device_library_identifier TEXT NOT NULL,
+    pass_type_identifier TEXT NOT NULL,
+    serial_number TEXT NOT NULL,
+    push_token TEXT NOT NULL,
+    PRIMARY KEY (device_library_identifier, pass_type_identifier, serial_number)
+);
+CREATE INDEX IF NOT EXISTS registrations_by_pass
+    ON registrations (pass_type_identifier, serial_number);
+CREATE INDEX IF NOT EXISTS passes_by_update
+    ON passes (pass_type_identifier, updated_at);
+"""
+
+_STATUS = {
+    200: "200 OK",
+    201: "201 Created",
+    204: "204 No Content",
+    304: "304 Not Modified",
+    400: "400 Bad Request",
+    401: "401 Unauthorized",
+    404: "404 Not Found",
+    405: "405 Method Not Allowed",
+}
+
+
+class PassRegistry(object):
+    """SQLite store of the published passes and device registrations.
+
+    updated_at is a millisecond timestamp, strictly increasing across
+    publications, and doubles as the "lastUpdated" tag given to devices.
+    """
+
+    def __init__(self, path=":memory:"):
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._db:
+            self._db.executescript(_SCHEMA)
+            row = self._db.execute("SELECT MAX(updated_at) FROM passes").fetchone()
+        self._last_update = row[0] or 0
+
+    def _next_update(self, previous=None):
+        update = max(int(time.time() * 1000), self._last_update + 1)
+        if previous is not None:
+            # Last-Modified has a 1 second precision, a pass republished
+            # within the same second moves to the next one
+            update = max(update, (previous // 1000 + 1) * 1000)
+        self._last_update = update
+        return update
+
+    def publish(self, pass_type_identifier, serial_number, authentication_token, etag):
+        """
+        Records the current archive of a pass.
+        :returns True if the pass changed (or is new), False if it already
+            had this etag, in which case devices aren't told about it
+        :raises ValueError: without authentication token or etag
+        """
+        if not authentication_token:
+            raise ValueError(f"Pass {serial_number} has no authentication token")
+        if not etag:
+            raise ValueError(f"Pass {serial_number} has no etag")
+        with self._lock, self._db:
+            row = self._db.execute(
+                "SELECT etag, authentication_token, updated_at FROM passes"
+                " WHERE pass_type_identifier = ? AND serial_number = ?",
+                (pass_type_identifier, serial_number),
+            ).fetchone()
+            if row is not None and row[:2] == (etag, authentication_token):
+                return False
+            self._db.execute(
+                "INSERT OR REPLACE INTO passes VALUES (?, ?, ?, ?, ?)",
+                (
+                    pass_type_identifier,
+                    serial_number,
+                    authentication_token,
+                    etag,
+                    self._next_update(row[2] if row is not None else None),
+                ),
+            )
+            return True
+
+    def get_pass(self, pass_type_identifier, serial_number):
+        """
+        :returns (authentication_token, etag, updated_at) or None
+        """
+        with self._lock:
+            return self._db.execute(
+                "SELECT authentication_token, etag, updated_at FROM passes"
+                " WHERE pass_type_identifier = ? AND serial_number = ?",
+                (pass_type_identifier, serial_number),
+            ).fetchone()
+
+    def register(self, device, pass_type_identifier, serial_number, push_token):
+        """
+        :returns True for a new registration, False if it already existed
+        """
+        with self._lock, self._db:
+            cursor = self._db.execute(
+                "INSERT OR IGNORE INTO registrations VALUES (?, ?, ?, ?)",
+                (device, pass_type_identifier, serial_number, push_token),
+            )
+            if cursor.rowcount:
+                return True
+            self._db.execute(
+                "UPDATE registrations SET push_token = ?"
+                " WHERE device_library_identifier = ? AND pass_type_identifier = ?"
+                " AND serial_number = ?",
+                (push_token, device, pass_type_identifier, serial_number),
+            )
+            return False
+
+    def unregister(self, device, pass_type_identifier, serial_number):
+        with self._lock, self._db:
+            self._db.execute(
+                "DELETE FROM registrations WHERE device_library_identifier = ?"
+                " AND pass_type_identifier = ? AND serial_number = ?",
+                (device, pass_type_identifier, serial_number),
+            )
+
+    def updated_serials(self, device, pass_type_identifier, since=None):
+        """
+        :returns (serial numbers updated after the since tag, newest tag)
+        """
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT p.serial_number, p.updated_at FROM registrations r"
+                " JOIN passes p ON p.pass_type_identifier = r.pass_type_identifier"
+                " AND p.serial_number = r.serial_number"
+                " WHERE r.device_library_identifier = ?"
+                " AND r.pass_type_identifier = ? AND p.updated_at > ?",
+                (device, pass_type_identifier, since or 0),
+            ).fetchall()
+        return [serial for serial, _ in rows], max(
+            (updated_at for _, updated_at in rows), default=None
+        )
+
+    def push_tokens(self, pass_type_identifier, serial_number):
+        """
+        :returns the push tokens of the devices to notify after an update
+        """
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT push_token FROM registrations"
+                " WHERE pass_type_identifier = ? AND serial_number = ?",
+                (pass_type_identifier, serial_number),
+            ).fetchall()
+        return [token for (token,) in rows]
+
+
+class PassWebService(object):
+    """WSGI application implementing the Wallet web service protocol.
+
+    Mount it at the URL used as the passes' web_service_url. Passes are
+    rendered once, when published, and served from the archive cache; an
+    unchanged pass is answered with 304 from If-None-Match/If-Modified-Since
+    so device polling never triggers a regeneration.
+
+    :param registry: PassRegistry, in memory by default
+    :param cache: archive cache (MemoryPassCache or DiskPassCache)
+    :param renderer: optional callable (pass_type_identifier, serial_number)
+        returning the ApplePass to publish again when its archive was evicted
+        from the cache
+    :param signer: Signer used for publish() and the renderer's passes
+    """
+
+    def __init__(self, registry=None, cache=None, renderer=None, signer=None):
+        self.registry = registry or PassRegistry()
+        self.cache = cache if cache is not None else MemoryPassCache()
+        self.renderer = renderer
+        self.signer = signer
+
+    def publish(self, apple_pass, signer=None):
+        """
+        Renders a pass into the cache and records it in the registry.
+        :returns True if the pass changed and registered devices should be
+            notified (see PassRegistry.push_tokens)
+        """
+        _, etag = self._render(apple_pass, signer or self.signer)
+        return self.registry.publish(
+            apple_pass.pass_type_identifier,
+            apple_pass.serial_number,
+            apple_pass.authentication_token,
+            etag,
+        )
+
+    def _render(self, apple_pass, signer):
+        """
+        Renders a pass into the cache.
+        :returns (archive bytes, etag)
+        """
+        archive, etag = apple_pass.create(
+            signer=signer, cache=self.cache, return_etag=True
+        )
+        data = archive.getvalue()
+        if etag is None:
+            # Not cached by create() (signer without fingerprint), key the
+            # archive by its own hash
+            etag = hashlib.sha1(data).hexdigest()
+            self.cache.set(etag, data)
+        return data, etag
+
+    def __call__(self, environ, start_response):
+        method = environ["REQUEST_METHOD"]
+        parts = environ.get("PATH_INFO", "").strip("/").split("/")
+        if parts[:1] != ["v1"]:
+            return self._respond(start_response, 404)
+        parts = parts[1:]
+
+        if len(parts) == 5 and parts[0] == "devices" and parts[2] == "registrations":
+            _, device, _, pass_type_identifier, serial_number = parts
+            if method == "POST":
+                return self._register(
+                    environ, start_response, device, pass_type_identifier, serial_number
+                )
+            if method == "DELETE":
+                return self._unregister(
+                    environ, start_response, device, pass_type_identifier, serial_number
+                )
+        elif len(parts) == 4 and parts[0] == "devices" and parts[2] == "registrations":
+            if method == "GET":
+                return self._updated_serials(
+                    environ, start_response, parts[1], parts[3]
+                )
+        elif len(parts) == 3 and parts[0] == "passes":
+            if method == "GET":
+                return self._get_pass(environ, start_response, parts[1], parts[2])
+        elif parts == ["log"]:
+            if method == "POST":
+                return self._log(environ, start_response)
+        else:
+            return self._respond(start_response, 404)
+        return self._respond(start_response, 405)
+
+    def _respond(self, start_response, status, body=b"", headers=()):
+        headers = list(headers)
+        headers.append(("Content-Length", str(len(body))))
+        start_response(_STATUS[status], headers)
+        return [body]
+
+    def _json(self, start_response, data):
+        body = json.dumps(data).encode("utf-8")
+        return self._respond(
+            start_response, 200, body, [("Content-Type", "application/json")]
+        )
+
+    def _read_json(self, environ):
+        length = int(environ.get("CONTENT_LENGTH") or 0)
+        body = environ["wsgi.input"].read(length) if length else b""
+        try:
+            return json.loads(body) if body else {}
+        except ValueError:
+            return None
+
+    def _authorized(self, environ, pass_type_identifier, serial_number):
+        """
+        :returns the registry row of the pass if the request carries its
+            authentication token, None otherwise
+        """
+        row = self.registry.get_pass(pass_type_identifier, serial_number)
+        authorization = environ.get("HTTP_AUTHORIZATION", "")
+        if row is None or not hmac.compare_digest(
+            authorization.encode("utf-8"), f"ApplePass {row[0]}".encode("utf-8")
+        ):
+            return None
+        return row
+
+    def _register(self, environ, start_response, device, pass_type_identifier, serial):
+        if self._authorized(environ, pass_type_identifier, serial) is None:
+            return self._respond(start_response, 401)
+        data = self._read_json(environ)
+        if not data or "pushToken" not in data:
+            return self._respond(start_response, 400)
+        created = self.registry.register(
+            device, pass_type_identifier, serial, data["pushToken"]
+        )
+        return self._respond(start_response, 201 if created else 200)
+
+    def _unregister(
+        self, environ, start_response, device, pass_type_identifier, serial
+    ):
+        if self._authorized(environ, pass_type_identifier, serial) is None:
+            return self._respond(start_response, 401)
+        self.registry.unregister(device, pass_type_identifier, serial)
+        return self._respond(start_response, 200)
+
+    def _updated_serials(self, environ, start_response, device, pass_type_identifier):
+        since = None
+        for parameter in environ.get("QUERY_STRING", "").split("&"):
+            name, _, value = parameter.partition("=")
+            if name == "passesUpdatedSince" and value.isdigit():
+                since = int(value)
+        serials, last_updated = self.registry.updated_serials(
+            device, pass_type_identifier, since
+        )
+        if not serials:
+            return self._respond(start_response, 204)
+        return self._json(
+            start_response,
+            {"serialNumbers": serials, "lastUpdated": str(last_updated)},
+        )
+
+    def _get_pass(self, environ, start_response, pass_type_identifier, serial):
+        row = self._authorized(environ, pass_type_identifier, serial)
+        if row is None:
+            return self._respond(start_response, 401)
+        _, etag, updated_at = row
+        if self._not_modified(environ, etag, updated_at // 1000):
+            return self._respond(
+                start_response, 304, headers=self._cache_headers(etag, updated_at)
+            )
+
+        data = self.cache.get(etag)
+        if data is None and self.renderer is not None:
+            # Evicted from the cache, render it again
+            apple_pass = self.renderer(pass_type_identifier, serial)
+            data, etag = self._render(apple_pass, self.signer)
+            # The pass keeps the token the device was authorized with
+            token = apple_pass.authentication_token or row[0]
+            self.registry.publish(pass_type_identifier, serial, token, etag)
+            _, etag, updated_at = self.registry.get_pass(pass_type_identifier, serial)
+        if data is None:
+            return self._respond(start_response, 404)
+        headers = self._cache_headers(etag, updated_at)
+        headers.append(("Content-Type", "application/vnd.apple.pkpass"))
+        return self._respond(start_response, 200, data, headers)
+
+    def _cache_headers(self, etag, updated_at):
+        return [
+            ("ETag", f'"{etag}"'),
+            ("Last-Modified", formatdate(updated_at // 1000, usegmt=True)),
+        ]
+
+    def _not_modified(self, environ, etag, last_modified):
+        if_none_match = environ.get("HTTP_IF_NONE_MATCH")
+        if if_none_match is not None:
+            return etag in [tag.strip().strip('"') for tag in if_none_match.split(",")]
+        if_modified_since = environ.get("HTTP_IF_MODIFIED_SINCE")
+        if if_modified_since:
+            try:
+                since = parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+            return last_modified <= since
+        return False
+
+    def _log(self, environ, start_response):
+        data = self._read_json(environ) or {}
+        for message in data.get("logs", []):
+            logger.info("Wallet: %s", message)
+        return self._respond(start_response, 200)
@@ -0,0 +1,68 @@
+"""
+Compares passes/sec when the signing material is loaded for every pass
+(certificate paths handed to create()) against a reused Signer and a reused
+FastSigner (precomputed PKCS7 template).
+
+Run from the repository root:
+    PYTHONPATH=. python benchmarks/bench_signer.py [count]
+"""
+# Standard Library
+import io
+import sys
+import time
+
+from applepassgenerator.client import ApplePassGeneratorClient
+from applepassgenerator.models import EventTicket
+from applepassgenerator.signer import FastSigner, Signer
+
+BASE_PATH = "tests"
+CERTIFICATE_PATH = f"{BASE_PATH}/certs/out/signerCert.pem"
+KEY_PATH = f"{BASE_PATH}/certs/out/signerKey.pem"
+WWDR_CERTIFICATE_PATH = f"{BASE_PATH}/certs/out/wwdr.pem"
+CERTIFICATE_PASSWORD = "test"
+
+
+def build_pass(client, icon, logo):
+    card_info = EventTicket()
+    card_info.add_primary_field("event-name", "Benchmark Event", "EVENT")
+    card_info.add_secondary_field("guest-group", "VIP", "GROUP")
+    apple_pass = client.get_pass(card_info)
+    apple_pass.description = "Benchmark"
+    apple_pass.add_file("icon.png", io.BytesIO(icon))
+    apple_pass.add_file("logo.png", io.BytesIO(logo))
+    return apple_pass
+
+
+def run(count, **create_kwargs):
+    client = ApplePassGeneratorClient("65QNR2XSA2", "pass.com.opassity.app", "Opassity")
+    with open(f"{BASE_PATH}/icon.png", "rb") as fd:
+        icon = fd.read()
+    with open(f"{BASE_PATH}/logo.png", "rb") as fd:
+        logo = fd.read()
+
+    start = time.perf_counter()
+    for _ in range(count):
+        build_pass(client, icon, logo).create(**create_kwargs)
+    return count / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    before = run(
+        count,
+        certificate=CERTIFICATE_PATH,
+        key=KEY_PATH,
+        wwdr_certificate=WWDR_CERTIFICATE_PATH,
+        password=CERTIFICATE_PASSWORD,
+    )
+    signer = Signer(
+        CERTIFICATE_PATH, KEY_PATH, WWDR_CERTIFICATE_PATH, CERTIFICATE_PASSWORD
+    )
+    after = run(count, signer=signer)
+    fast_signer = FastSigner(
+        CERTIFICATE_PATH, KEY_PATH, WWDR_CERTIFICATE_PATH, CERTIFICATE_PASSWORD
+    )
+    fast = run(count, signer=fast_signer)
+    print(f"paths per create(): {before:8.1f} passes/sec")
+    print(f"reused Signer:      {after:8.1f} passes/sec ({after / before:.1f}x)")
+    print(f"reused FastSigner:  {fast:8.1f} passes/sec ({fast / before:.1f}x)")
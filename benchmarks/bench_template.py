@@ -0,0 +1,67 @@
+"""
+Compares building pass.json through the normal serializer against rendering
+a compiled PassTemplate.
+
+Run from the repository root:
+    PYTHONPATH=. python benchmarks/bench_template.py [count]
+"""
+# Standard Library
+import sys
+import time
+
+from applepassgenerator.apple_pass import ApplePass
+from applepassgenerator.models import EventTicket
+from applepassgenerator.template import PassTemplate, Placeholder
+from applepassgenerator.utils import Barcode, BarcodeFormat
+
+
+def build_pass(serial, seat, message):
+    card_info = EventTicket()
+    card_info.add_header_field("event-start", "2024-05-11T13:30:00", "START TIME")
+    card_info.add_primary_field("event-name", "Benchmark Event", "EVENT")
+    card_info.add_secondary_field("seat", seat, "SEAT")
+    for i in range(8):
+        card_info.add_back_field(f"terms-{i}", "Lorem ipsum dolor sit amet " * 4, "TERMS")
+    apple_pass = ApplePass(
+        card_info,
+        pass_type_identifier="pass.com.opassity.app",
+        organization_name="Opassity",
+        team_identifier="65QNR2XSA2",
+    )
+    apple_pass.serial_number = serial
+    apple_pass.description = "Benchmark"
+    apple_pass.background_color = "#F1F1F1"
+    apple_pass.barcode = Barcode(message, BarcodeFormat.QR)
+    return apple_pass
+
+
+def timed(count, render):
+    start = time.perf_counter()
+    for i in range(count):
+        render(i)
+    return count / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+
+    # Normal path: the pass is built and the object graph walked per pass
+    serializer = timed(
+        count, lambda i: build_pass(f"serial-{i}", f"A{i}", f"ticket-{i}")._create_pass_json()
+    )
+    # Serialization only, on an already built pass
+    apple_pass = build_pass("serial", "A1", "ticket")
+    serializer_only = timed(count, lambda i: apple_pass._create_pass_json())
+
+    template = PassTemplate(
+        build_pass(Placeholder("serial"), Placeholder("seat"), Placeholder("message"))
+    )
+    rendered = timed(
+        count,
+        lambda i: template.render(
+            {"serial": f"serial-{i}", "seat": f"A{i}", "message": f"ticket-{i}"}
+        ),
+    )
+    print(f"build + json.dumps:  {serializer:10.0f} pass.json/sec")
+    print(f"json.dumps only:     {serializer_only:10.0f} pass.json/sec")
+    print(f"PassTemplate.render: {rendered:10.0f} pass.json/sec ({rendered / serializer:.1f}x)")
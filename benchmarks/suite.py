@@ -0,0 +1,217 @@
+"""
+Benchmark suite generating passes of every style with the local test certs.
+
+Each scenario (pass style x field count x asset count x image size) runs in
+a fresh process and reports passes/sec, per-stage latency percentiles and
+the peak RSS of that process. Results are written as JSON so two runs can be
+compared.
+
+Run from the repository root:
+    PYTHONPATH=. python benchmarks/suite.py --output results.json
+    PYTHONPATH=. python benchmarks/suite.py --quick --compare results.json --tolerance 10
+"""
+
+# Standard Library
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import sys
+import time
+
+BASE_PATH = "tests"
+CERTIFICATE_PATH = f"{BASE_PATH}/certs/out/signerCert.pem"
+KEY_PATH = f"{BASE_PATH}/certs/out/signerKey.pem"
+WWDR_CERTIFICATE_PATH = f"{BASE_PATH}/certs/out/wwdr.pem"
+CERTIFICATE_PASSWORD = "test"
+
+STYLES = ("EventTicket", "BoardingPass", "Coupon", "StoreCard", "Generic")
+FIELD_COUNTS = (4, 24)
+ASSET_COUNTS = (2, 6)
+# 0 uses the real icon.png/logo.png, other sizes are random (incompressible) bytes
+IMAGE_SIZES = (0, 256 * 1024)
+QUICK = {"styles": ("EventTicket",), "field_counts": (4,), "asset_counts": (2,)}
+
+
+def _build_pass(style, field_count, assets, signer, stats, index):
+    # Imported here so the parent process stays small for RSS measurements
+    from applepassgenerator import models
+    from applepassgenerator.apple_pass import ApplePass
+    from applepassgenerator.utils import Barcode, BarcodeFormat
+
+    card_info = getattr(models, style)()
+    adders = (
+        card_info.add_header_field,
+        card_info.add_primary_field,
+        card_info.add_secondary_field,
+        card_info.add_auxiliary_field,
+        card_info.add_back_field,
+    )
+    for i in range(field_count):
+        adders[i % len(adders)](
+            f"field-{i}", f"Value {i} of pass {index}", f"LABEL {i}"
+        )
+
+    apple_pass = ApplePass(
+        card_info,
+        pass_type_identifier="pass.com.opassity.app",
+        organization_name="Opassity",
+        team_identifier="65QNR2XSA2",
+        signer=signer,
+        instrumentation=stats,
+    )
+    apple_pass.description = f"Benchmark {style}"
+    apple_pass.barcode = Barcode(f"ticket-{index}", BarcodeFormat.QR)
+    for name, asset in assets.items():
+        apple_pass.add_asset(name, asset)
+    return apple_pass
+
+
+def _load_assets(asset_count, image_size):
+    from applepassgenerator.assets import AssetStore
+
+    store = AssetStore(max_bytes=1 << 30)
+    names = [
+        "icon.png",
+        "logo.png",
+        "strip.png",
+        "thumbnail.png",
+        "background.png",
+        "footer.png",
+    ]
+    assets = {}
+    for i, name in enumerate(names[:asset_count]):
+        if image_size:
+            assets[name] = store.add(os.urandom(image_size))
+        else:
+            assets[name] = store.load(f"{BASE_PATH}/{('icon.png', 'logo.png')[i % 2]}")
+    return assets
+
+
+def run_scenario(scenario):
+    from applepassgenerator.instrumentation import StageStats
+    from applepassgenerator.signer import Signer
+
+    signer = Signer(
+        CERTIFICATE_PATH, KEY_PATH, WWDR_CERTIFICATE_PATH, CERTIFICATE_PASSWORD
+    )
+    assets = _load_assets(scenario["asset_count"], scenario["image_size"])
+    stats = StageStats()
+
+    # Warm up, then measure
+    for i in range(min(10, scenario["count"])):
+        _build_pass(
+            scenario["style"], scenario["field_count"], assets, signer, None, i
+        ).create()
+    start = time.perf_counter()
+    size = 0
+    for i in range(scenario["count"]):
+        apple_pass = _build_pass(
+            scenario["style"], scenario["field_count"], assets, signer, stats, i
+        )
+        size += len(apple_pass.create().getvalue())
+    elapsed = time.perf_counter() - start
+
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform != "darwin":
+        peak_rss *= 1024
+    return dict(
+        scenario,
+        passes_per_sec=scenario["count"] / elapsed,
+        mean_pass_bytes=size // scenario["count"],
+        peak_rss_bytes=peak_rss,
+        stages=stats.summary(),
+    )
+
+
+def scenarios(count, quick=False):
+    options = QUICK if quick else {}
+    for style, field_count, asset_count, image_size in itertools.product(
+        options.get("styles", STYLES),
+        options.get("field_counts", FIELD_COUNTS),
+        options.get("asset_counts", ASSET_COUNTS),
+        IMAGE_SIZES,
+    ):
+        yield {
+            "name": f"{style}-f{field_count}-a{asset_count}-i{image_size}",
+            "style": style,
+            "field_count": field_count,
+            "asset_count": asset_count,
+            "image_size": image_size,
+            "count": count,
+        }
+
+
+def compare(results, baseline, tolerance):
+    """
+    :returns names of the scenarios whose passes/sec dropped by more than
+        tolerance percent against the baseline
+    """
+    previous = {r["name"]: r for r in baseline["results"]}
+    regressions = []
+    for result in results:
+        before = previous.get(result["name"])
+        if before is None:
+            continue
+        change = (result["passes_per_sec"] / before["passes_per_sec"] - 1) * 100
+        print(f"{result['name']:40} {change:+7.1f}%")
+        if change < -tolerance:
+            regressions.append(result["name"])
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--count", type=int, default=200, help="passes per scenario")
+    parser.add_argument(
+        "--quick", action="store_true", help="only EventTicket scenarios"
+    )
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--compare", help="baseline JSON results to compare against")
+    parser.add_argument(
+        "--tolerance", type=float, default=10.0, help="allowed slowdown in percent"
+    )
+    args = parser.parse_args()
+
+    from cryptography import __version__ as cryptography_version
+
+    results = []
+    # A fresh process per scenario so the peak RSS belongs to that scenario
+    context = multiprocessing.get_context("spawn")
+    for scenario in scenarios(args.count, args.quick):
+        with context.Pool(1) as pool:
+            result = pool.apply(run_scenario, (scenario,))
+        results.append(result)
+        stages = result["stages"]
+        print(
+            f"{result['name']:40} {result['passes_per_sec']:8.1f} passes/sec  "
+            f"sign p95 {stages['create_signature']['p95'] * 1000:6.2f} ms  "
+            f"zip p95 {stages['create_zip']['p95'] * 1000:6.2f} ms  "
+            f"rss {result['peak_rss_bytes'] / 2 ** 20:6.1f} MiB"
+        )
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cryptography": cryptography_version,
+        "timestamp": time.time(),
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as fd:
+            json.dump(report, fd, indent=2)
+
+    if args.compare:
+        with open(args.compare) as fd:
+            regressions = compare(results, json.load(fd), args.tolerance)
+        if regressions:
+            print(f"Regressions: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
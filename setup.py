@@ -6,4 +6,5 @@ setup(
    version='0.0.3',
    packages=find_packages(),
    license='MIT',
+   extras_require={'images': ['Pillow']},
 )
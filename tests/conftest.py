@@ -0,0 +1,15 @@
+import pytest
+
+from applepassgenerator.signer import Signer
+
+BASE_PATH = 'tests'
+
+
+@pytest.fixture(scope="session")
+def signer():
+    return Signer(
+        f"{BASE_PATH}/certs/out/signerCert.pem",
+        f"{BASE_PATH}/certs/out/signerKey.pem",
+        f"{BASE_PATH}/certs/out/wwdr.pem",
+        "test",
+    )
@@ -0,0 +1,86 @@
+import hashlib
+import io
+import json
+import pickle
+import zipfile
+
+import pytest
+
+from applepassgenerator import assets
+from applepassgenerator.apple_pass import ApplePass
+from applepassgenerator.archive import ZIP_DEFLATED
+from applepassgenerator.assets import AssetStore
+from applepassgenerator.models import EventTicket
+
+BASE_PATH = 'tests'
+
+
+def test_asset_store_deduplicates_and_evicts():
+    store = AssetStore(max_bytes=10)
+    first = store.add(b"12345")
+    assert store.add(io.BytesIO(b"12345")) is first
+    assert first.sha1 == hashlib.sha1(b"12345").hexdigest()
+
+    store.add(b"abcdefgh")
+    assert first.sha1 not in store
+    assert len(store) == 1 and store.size == 8
+
+    icon = store.load(f"{BASE_PATH}/icon.png")
+    assert store.load(f"{BASE_PATH}/icon.png") is icon
+
+
+def test_pass_references_shared_assets(signer):
+    store = AssetStore()
+    icon = store.load(f"{BASE_PATH}/icon.png")
+    apple_pass = ApplePass(EventTicket(), pass_type_identifier="pass.com.opassity.app")
+    apple_pass.add_asset("icon.png", icon)
+
+    archive = zipfile.ZipFile(apple_pass.create(signer=signer))
+    assert archive.read("icon.png") == icon.data
+    assert json.loads(archive.read("manifest.json"))["icon.png"] == icon.sha1
+
+
+def test_deflated_archive_reuses_compressed_asset_entries(signer):
+    icon = AssetStore().load(f"{BASE_PATH}/icon.png")
+    for _ in range(2):
+        apple_pass = ApplePass(EventTicket(), compression=ZIP_DEFLATED, compresslevel=9)
+        apple_pass.add_asset("icon.png", icon)
+        apple_pass.add_file("logo.png", open(f"{BASE_PATH}/logo.png", "rb"))
+        archive = zipfile.ZipFile(apple_pass.create(signer=signer))
+        assert archive.testzip() is None
+        assert archive.getinfo("icon.png").compress_type == ZIP_DEFLATED
+        assert archive.read("icon.png") == icon.data
+
+    assert icon.zip_entry("icon.png", ZIP_DEFLATED, 9) is icon.zip_entry("icon.png", ZIP_DEFLATED, 9)
+
+
+def test_file_assets_are_read_lazily(signer, tmp_path, monkeypatch):
+    # Small chunks and threshold so both the read and mmap paths are used
+    monkeypatch.setattr(assets, "CHUNK_SIZE", 1000)
+    monkeypatch.setattr(assets, "MMAP_THRESHOLD", 4096)
+    large = bytes(range(256)) * 64
+    path = tmp_path / "background.png"
+    path.write_bytes(large)
+    with open(f"{BASE_PATH}/logo.png", "rb") as fd:
+        logo = fd.read()
+
+    for compression in (assets.ZIP_STORED, ZIP_DEFLATED):
+        apple_pass = ApplePass(EventTicket(), compression=compression)
+        apple_pass.add_file("icon.png", f"{BASE_PATH}/icon.png")
+        apple_pass.add_file("background.png", path)
+        apple_pass.add_file("logo.png", memoryview(logo))
+        assert apple_pass._files["background.png"]._sha1 is None
+
+        apple_pass = pickle.loads(pickle.dumps(apple_pass))
+        archive = zipfile.ZipFile(apple_pass.create(signer=signer))
+        assert archive.testzip() is None
+        assert archive.read("background.png") == large
+        assert archive.read("logo.png") == logo
+        manifest = json.loads(archive.read("manifest.json"))
+        assert manifest["background.png"] == hashlib.sha1(large).hexdigest()
+
+    asset = assets.FileAsset(path)
+    assert asset.size == len(large)
+    path.write_bytes(large + b"changed")
+    with pytest.raises(ValueError):
+        list(asset.iter_chunks())
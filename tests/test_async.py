@@ -0,0 +1,99 @@
+import asyncio
+import zipfile
+
+from applepassgenerator.client import ApplePassGeneratorClient
+from applepassgenerator.models import EventTicket
+
+BASE_PATH = 'tests'
+
+
+def test_create_pass_async_with_concurrency_limit(signer):
+    client = ApplePassGeneratorClient(
+        "65QNR2XSA2", "pass.com.opassity.app", "Opassity", signer=signer, max_concurrency=2
+    )
+
+    async def create(i):
+        card_info = EventTicket()
+        card_info.add_primary_field("seat", f"A{i}", "SEAT")
+        apple_pass = client.get_pass(card_info)
+        await apple_pass.add_file_async("icon.png", f"{BASE_PATH}/icon.png")
+        return await client.create_pass_async(apple_pass)
+
+    async def main():
+        return await asyncio.gather(*(create(i) for i in range(5)))
+
+    for zip_file in asyncio.run(main()):
+        assert zipfile.ZipFile(zip_file).testzip() is None
+
+
+def test_create_async_loads_certificates_off_the_loop():
+    apple_pass = ApplePassGeneratorClient("65QNR2XSA2", "pass.com.opassity.app", "Opassity").get_pass(
+        EventTicket()
+    )
+    zip_file = asyncio.run(
+        apple_pass.create_async(
+            f"{BASE_PATH}/certs/out/signerCert.pem",
+            f"{BASE_PATH}/certs/out/signerKey.pem",
+            f"{BASE_PATH}/certs/out/wwdr.pem",
+            "test",
+        )
+    )
+    assert "signature" in zipfile.ZipFile(zip_file).namelist()
+
+
+class SlowPass(object):
+    """Stands in for an ApplePass, counting the creations running at once."""
+
+    running = 0
+    max_running = 0
+
+    def __init__(self, release):
+        self.release = release
+
+    async def create_async(self, zip_file=None, signer=None, executor=None):
+        SlowPass.running += 1
+        SlowPass.max_running = max(SlowPass.max_running, SlowPass.running)
+        try:
+            await self.release.wait()
+        finally:
+            SlowPass.running -= 1
+        return zip_file
+
+
+def test_create_pass_async_limits_concurrency_per_loop():
+    client = ApplePassGeneratorClient(
+        "65QNR2XSA2", "pass.com.opassity.app", "Opassity", max_concurrency=2
+    )
+
+    async def main():
+        release = asyncio.Event()
+        tasks = [asyncio.ensure_future(client.create_pass_async(SlowPass(release))) for _ in range(6)]
+        await asyncio.sleep(0.01)
+        assert SlowPass.running == 2
+        release.set()
+        await asyncio.gather(*tasks)
+
+    # The same client is used from two event loops
+    for _ in range(2):
+        SlowPass.max_running = 0
+        asyncio.run(main())
+        assert SlowPass.max_running == 2
+
+
+def test_cancelled_create_pass_async_releases_its_slot():
+    client = ApplePassGeneratorClient(
+        "65QNR2XSA2", "pass.com.opassity.app", "Opassity", max_concurrency=1
+    )
+
+    async def main():
+        blocked = asyncio.ensure_future(client.create_pass_async(SlowPass(asyncio.Event())))
+        await asyncio.sleep(0.01)
+        release = asyncio.Event()
+        release.set()
+        waiting = asyncio.ensure_future(client.create_pass_async(SlowPass(release), zip_file="done"))
+        await asyncio.sleep(0.01)
+        assert not waiting.done()
+        blocked.cancel()
+        assert await asyncio.wait_for(waiting, 1) == "done"
+
+    asyncio.run(main())
@@ -0,0 +1,70 @@
+import io
+import os
+import threading
+import zipfile
+
+import pytest
+
+from applepassgenerator.client import ApplePassGeneratorClient
+from applepassgenerator.models import EventTicket
+
+BASE_PATH = 'tests'
+
+# Field values serialized in this process (not in a worker process)
+SERIALIZED_HERE = []
+
+
+class BrokenValue(object):
+    def json_dict(self):
+        SERIALIZED_HERE.append(os.getpid())
+        raise TypeError("not a valid field value")
+
+
+@pytest.fixture(scope="module")
+def client(signer):
+    return ApplePassGeneratorClient("65QNR2XSA2", "pass.com.opassity.app", "Opassity", signer=signer)
+
+
+def card_infos(count):
+    for i in range(count):
+        card_info = EventTicket()
+        card_info.add_primary_field("seat", f"A{i}", "SEAT")
+        yield card_info
+
+
+@pytest.mark.parametrize("executor", ["thread", "process"])
+def test_generate_many_yields_in_order(client, executor):
+    passes = [client.get_pass(c) for c in card_infos(5)]
+    results = list(client.generate_many(passes, executor=executor, max_workers=2, max_in_flight=2))
+
+    assert [serial for serial, _ in results] == [p.serial_number for p in passes]
+    for _, data in results:
+        assert "pass.json" in zipfile.ZipFile(io.BytesIO(data)).namelist()
+
+
+def test_generate_many_writes_output_dir(client, tmp_path):
+    results = list(client.generate_many(card_infos(3), executor="thread", output_dir=str(tmp_path)))
+
+    assert len(results) == 3
+    for serial, path in results:
+        assert path == os.path.join(str(tmp_path), f"{serial}.pkpass")
+        assert zipfile.is_zipfile(path)
+
+
+def test_generate_many_falls_back_to_threads(client):
+    passes = [client.get_pass(c) for c in card_infos(3)]
+    # Locks can't be pickled, the passes can't be sent to worker processes
+    passes[0].lock = threading.Lock()
+    results = list(client.generate_many(passes, executor="process", max_workers=2))
+
+    assert [serial for serial, _ in results] == [p.serial_number for p in passes]
+
+
+def test_generate_many_does_not_retry_failing_passes_in_threads(client):
+    card_info = EventTicket()
+    card_info.add_primary_field("seat", BrokenValue(), "SEAT")
+    passes = [client.get_pass(card_info)] + [client.get_pass(c) for c in card_infos(2)]
+
+    with pytest.raises(TypeError, match="not a valid field value"):
+        list(client.generate_many(passes, executor="process", max_workers=2))
+    assert SERIALIZED_HERE == []
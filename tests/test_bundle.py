@@ -0,0 +1,52 @@
+import io
+import json
+import zipfile
+
+from applepassgenerator.apple_pass import ApplePass
+from applepassgenerator.assets import Asset
+from applepassgenerator.bundle import iter_bundle, share_files, write_bundle
+from applepassgenerator.models import EventTicket
+
+BASE_PATH = 'tests'
+
+
+def test_bundle_shares_files_and_signer(signer, tmp_path):
+    passes = []
+    for seat in ("A1", "A2", "A3"):
+        card_info = EventTicket()
+        card_info.add_primary_field("seat", seat, "SEAT")
+        apple_pass = ApplePass(card_info, pass_type_identifier="pass.com.opassity.app")
+        apple_pass.serial_number = f"order-1-{seat}"
+        # Distinct bytes objects of the same content
+        apple_pass.add_file("icon.png", open(f"{BASE_PATH}/icon.png", "rb"))
+        passes.append(apple_pass)
+
+    shared = share_files(passes)
+    icons = {id(p._files["icon.png"]) for p in shared}
+    assert len(icons) == 1 and isinstance(shared[0]._files["icon.png"], Asset)
+    assert all(isinstance(p._files["icon.png"], bytes) for p in passes)
+
+    size = write_bundle(tmp_path / "order.pkpasses", passes, signer)
+    assert size == (tmp_path / "order.pkpasses").stat().st_size
+    assert all(isinstance(p._files["icon.png"], bytes) for p in passes)
+
+    bundle = zipfile.ZipFile(io.BytesIO(b"".join(iter_bundle(passes, signer))))
+    assert bundle.namelist() == ["order-1-A1.pkpass", "order-1-A2.pkpass", "order-1-A3.pkpass"]
+    for name, seat in zip(bundle.namelist(), ("A1", "A2", "A3")):
+        archive = zipfile.ZipFile(io.BytesIO(bundle.read(name)))
+        assert archive.testzip() is None
+        pass_json = json.loads(archive.read("pass.json"))
+        assert pass_json["eventTicket"]["primaryFields"][0]["value"] == seat
+
+
+def test_bundle_names_are_unique(signer):
+    passes = []
+    for serial_number in ("order-1", "order-1-2", "order-1"):
+        apple_pass = ApplePass(EventTicket(), pass_type_identifier="pass.com.opassity.app")
+        apple_pass.serial_number = serial_number
+        passes.append(apple_pass)
+
+    bundle = zipfile.ZipFile(io.BytesIO(b"".join(iter_bundle(passes, signer))))
+    assert bundle.namelist() == ["order-1.pkpass", "order-1-2.pkpass", "order-1-3.pkpass"]
+    serials = [json.loads(zipfile.ZipFile(bundle.open(name)).read("pass.json"))["serialNumber"] for name in bundle.namelist()]
+    assert serials == ["order-1", "order-1-2", "order-1"]
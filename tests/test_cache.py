@@ -0,0 +1,123 @@
+import asyncio
+import io
+import json
+import pickle
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from applepassgenerator.cache import DiskPassCache, MemoryPassCache
+from applepassgenerator.client import ApplePassGeneratorClient
+from applepassgenerator.models import EventTicket
+from applepassgenerator.signer import BaseSigner
+from applepassgenerator.template import PassTemplate, Placeholder
+
+BASE_PATH = 'tests'
+
+
+def build_pass(client, seat, files=("icon.png", "logo.png")):
+    card_info = EventTicket()
+    card_info.add_primary_field("seat", seat, "SEAT")
+    apple_pass = client.get_pass(card_info)
+    apple_pass.serial_number = "serial-1"
+    for name in files:
+        apple_pass.add_file(name, open(f"{BASE_PATH}/{name}", "rb"))
+    return apple_pass
+
+
+def test_deterministic_archives_only_differ_by_signature(signer):
+    client = ApplePassGeneratorClient("65QNR2XSA2", "pass.com.opassity.app", "Opassity", signer=signer, deterministic=True)
+    first = zipfile.ZipFile(build_pass(client, "A1").create())
+    second = zipfile.ZipFile(build_pass(client, "A1", files=("logo.png", "icon.png")).create())
+
+    assert first.namelist() == second.namelist() == ["signature", "manifest.json", "pass.json", "icon.png", "logo.png"]
+    for name in first.namelist()[1:]:
+        assert first.read(name) == second.read(name)
+        assert first.getinfo(name).date_time == (1980, 1, 1, 0, 0, 0)
+
+
+@pytest.mark.parametrize("cache_type", ["memory", "disk"])
+def test_cached_archive_is_returned_without_signing(signer, tmp_path, cache_type):
+    cache = MemoryPassCache() if cache_type == "memory" else DiskPassCache(str(tmp_path))
+    client = ApplePassGeneratorClient("65QNR2XSA2", "pass.com.opassity.app", "Opassity", signer=signer, cache=cache)
+
+    first_pass = build_pass(client, "A1")
+    first = first_pass.create().getvalue()
+    second_pass = build_pass(client, "A1")
+    second = second_pass.create().getvalue()
+    other_pass = build_pass(client, "A2")
+    other_pass.create()
+
+    assert first == second
+    assert first_pass.etag == second_pass.etag != other_pass.etag
+    assert cache.get(first_pass.etag) == first
+
+
+def test_caches_evict_least_recently_used(tmp_path):
+    memory = MemoryPassCache(max_bytes=10)
+    memory.set("a", b"12345")
+    memory.set("b", b"12345")
+    memory.get("a")
+    memory.set("c", b"12345")
+    assert "a" in memory and "b" not in memory and memory.size == 10
+
+    disk = DiskPassCache(str(tmp_path), max_bytes=10)
+    disk.set("a", b"12345")
+    disk.set("b", b"12345")
+    disk.set("c", b"12345")
+    assert "a" not in disk and disk.get("c") == b"12345"
+    assert DiskPassCache(str(tmp_path), max_bytes=10).size == 10
+
+
+def test_every_create_path_uses_the_cache(signer):
+    cache = MemoryPassCache()
+    client = ApplePassGeneratorClient("65QNR2XSA2", "pass.com.opassity.app", "Opassity", signer=signer, cache=cache)
+    first_pass = build_pass(client, "A1")
+    first = asyncio.run(first_pass.create_async()).getvalue()
+
+    assert cache.get(first_pass.etag) == first
+    assert asyncio.run(build_pass(client, "A1").create_async()).getvalue() == first
+    assert b"".join(build_pass(client, "A1").iter_chunks()) == first
+    chunks = []
+    build_pass(client, "A1").stream(chunks.append)
+    assert b"".join(chunks) == first
+
+
+def test_signer_without_fingerprint_is_not_cached(signer):
+    class HSMSigner(BaseSigner):
+        def sign(self, manifest):
+            return signer.sign(manifest)
+
+    cache = MemoryPassCache()
+    client = ApplePassGeneratorClient("65QNR2XSA2", "pass.com.opassity.app", "Opassity", signer=HSMSigner(), cache=cache)
+    apple_pass = build_pass(client, "A1")
+
+    assert zipfile.ZipFile(apple_pass.create()).read("signature")
+    assert apple_pass.etag is None and len(cache) == 0
+
+
+def test_cache_is_not_pickled(signer):
+    client = ApplePassGeneratorClient("65QNR2XSA2", "pass.com.opassity.app", "Opassity", signer=signer, cache=MemoryPassCache())
+    apple_pass = pickle.loads(pickle.dumps(build_pass(client, "A1")))
+    assert apple_pass.cache is None
+
+
+def test_concurrent_renders_cache_each_archive_under_its_own_key(signer):
+    cache = MemoryPassCache()
+    client = ApplePassGeneratorClient("65QNR2XSA2", "pass.com.opassity.app", "Opassity", signer=signer, cache=cache)
+    apple_pass = build_pass(client, "A1")
+    apple_pass.serial_number = Placeholder("serial")
+    template = PassTemplate(apple_pass)
+
+    def render(index):
+        serial = f"serial-{index % 50}"
+        archive, etag = template.create({"serial": serial}, return_etag=True)
+        return serial, archive.getvalue(), etag
+
+    for _ in range(2):  # The second round is served from the cache
+        with ThreadPoolExecutor(8) as executor:
+            for serial, data, etag in executor.map(render, range(400)):
+                pass_json = json.loads(zipfile.ZipFile(io.BytesIO(data)).read("pass.json"))
+                assert pass_json["serialNumber"] == serial
+                assert cache.get(etag) == data
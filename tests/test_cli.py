@@ -0,0 +1,71 @@
+import json
+import os
+import zipfile
+
+import pytest
+
+from applepassgenerator.cli import main
+
+BASE_PATH = os.path.abspath('tests')
+
+
+def test_bulk_issue_to_zip_and_resume(tmp_path, capsys):
+    template = {
+        "style": "eventTicket",
+        "team_identifier": "65QNR2XSA2",
+        "pass_type_identifier": "pass.com.opassity.app",
+        "organization_name": "Opassity",
+        "description": "{name}",
+        "serial_number": "ticket-{id}",
+        "barcode": {"message": "{id}"},
+        "fields": {"primary": [{"key": "seat", "value": "{seat}", "label": "SEAT"}]},
+        "assets": {"icon.png": f"{BASE_PATH}/icon.png"},
+        "certificates": {
+            "certificate": f"{BASE_PATH}/certs/out/signerCert.pem",
+            "key": f"{BASE_PATH}/certs/out/signerKey.pem",
+            "wwdr_certificate": f"{BASE_PATH}/certs/out/wwdr.pem",
+            "password": "test",
+        },
+    }
+    (tmp_path / "template.json").write_text(json.dumps(template))
+    (tmp_path / "rows.jsonl").write_text(
+        "\n".join(json.dumps({"id": i, "name": "Show", "seat": f"A{i}"}) for i in range(5))
+    )
+    args = [str(tmp_path / "template.json"), str(tmp_path / "rows.jsonl"), "--executor", "thread"]
+
+    main(args + ["--output-zip", str(tmp_path / "passes.zip")])
+    archive = zipfile.ZipFile(tmp_path / "passes.zip")
+    assert len(archive.namelist()) == 5
+    assert not os.path.exists(tmp_path / "passes.zip.parts")
+
+    output_dir = tmp_path / "passes"
+    main(args + ["--output-dir", str(output_dir)])
+    main(args + ["--output-dir", str(output_dir), "--resume"])
+    assert sorted(os.listdir(output_dir)) == [".checkpoint.json"] + [f"ticket-{i}.pkpass" for i in range(5)]
+    assert "Issued 0 passes" in capsys.readouterr().err
+
+
+def test_only_column_references_are_formatted(tmp_path, capsys):
+    template = {
+        "style": "generic",
+        "team_identifier": "65QNR2XSA2",
+        "pass_type_identifier": "pass.com.opassity.app",
+        "organization_name": "Opassity",
+        "description": "{name} {not a column} }",
+        "serial_number": "ticket-{id}",
+        "certificates": {
+            "certificate": f"{BASE_PATH}/certs/out/signerCert.pem",
+            "key": f"{BASE_PATH}/certs/out/signerKey.pem",
+            "wwdr_certificate": f"{BASE_PATH}/certs/out/wwdr.pem",
+            "password": "test",
+        },
+    }
+    (tmp_path / "template.json").write_text(json.dumps(template))
+    (tmp_path / "rows.jsonl").write_text(json.dumps({"id": 1, "name": "Show"}) + "\n" + json.dumps({"name": "Show"}))
+    output_dir = tmp_path / "passes"
+
+    with pytest.raises(SystemExit):
+        main([str(tmp_path / "template.json"), str(tmp_path / "rows.jsonl"), "--executor", "thread", "--output-dir", str(output_dir)])
+    assert "row 2: no 'id' column for {id}" in capsys.readouterr().err
+    pass_json = json.loads(zipfile.ZipFile(output_dir / "ticket-1.pkpass").read("pass.json"))
+    assert pass_json["description"] == "Show {not a column} }"
@@ -0,0 +1,43 @@
+import pickle
+from datetime import datetime, timezone
+
+from applepassgenerator import asn1
+from applepassgenerator.apple_pass import ApplePass
+from applepassgenerator.models import EventTicket
+from applepassgenerator.signer import SIGNING_TIME, FastSigner
+from applepassgenerator.verify import PassVerifier
+
+BASE_PATH = 'tests'
+CERTIFICATES = (
+    f"{BASE_PATH}/certs/out/signerCert.pem",
+    f"{BASE_PATH}/certs/out/signerKey.pem",
+    f"{BASE_PATH}/certs/out/wwdr.pem",
+    "test",
+)
+
+
+def signing_time(signature):
+    signer_info = asn1.parse(signature).children()[1].children()[0].children()[-1]
+    for attribute in signer_info.children()[0].children()[3].children():
+        oid, values = attribute.children()
+        if asn1.decode_oid(oid.content) == SIGNING_TIME:
+            value = values.children()[0].content.decode("ascii")
+            return datetime.strptime(value, "%y%m%d%H%M%SZ").replace(tzinfo=timezone.utc)
+
+
+def test_fast_signer_matches_builder(signer):
+    fast_signer = FastSigner(*CERTIFICATES)
+    manifest = '{"pass.json": "0123456789abcdef0123456789abcdef01234567"}'
+
+    expected = signer.sign(manifest)
+    # RSA PKCS1v15 is deterministic: same attributes, same bytes
+    assert fast_signer.sign(manifest, signing_time(expected)) == expected
+    assert fast_signer.sign(manifest.encode("UTF-8"), signing_time(expected)) == expected
+    assert pickle.loads(pickle.dumps(fast_signer)).sign(manifest, signing_time(expected)) == expected
+
+
+def test_fast_signer_passes_verify():
+    apple_pass = ApplePass(EventTicket(), signer=FastSigner(*CERTIFICATES))
+    apple_pass.add_file("icon.png", open(f"{BASE_PATH}/icon.png", "rb"))
+    verifier = PassVerifier([f"{BASE_PATH}/certs/out/wwdr.pem"])
+    assert verifier.verify(apple_pass.create().getvalue()) == []
@@ -0,0 +1,64 @@
+import io
+import zipfile
+
+import pytest
+
+from applepassgenerator.apple_pass import ApplePass
+from applepassgenerator.models import Coupon, EventTicket
+
+Image = pytest.importorskip("PIL.Image")
+from applepassgenerator.images import ImagePipeline, validate  # noqa: E402
+
+BASE_PATH = 'tests'
+
+
+def master(width, height):
+    output = io.BytesIO()
+    Image.new("RGBA", (width, height), (200, 30, 30, 255)).save(output, "PNG")
+    return output.getvalue()
+
+
+def test_variants_fit_the_style_limits(tmp_path):
+    pipeline = ImagePipeline(cache_dir=tmp_path)
+    strip = master(3000, 1000)
+
+    variants = pipeline.variants("strip", strip, "coupon")
+    sizes = {name: Image.open(io.BytesIO(asset.data)).size for name, asset in variants.items()}
+    assert sizes == {"strip.png": (375, 125), "strip@2x.png": (750, 250), "strip@3x.png": (1125, 375)}
+    sizes = {
+        name: Image.open(io.BytesIO(asset.data)).size
+        for name, asset in pipeline.variants("strip", strip, "eventTicket").items()
+    }
+    assert sizes["strip@3x.png"] == (882, 294)
+    for name, asset in variants.items():
+        validate(name, asset.data, "coupon")
+    with pytest.raises(ValueError):
+        validate("strip.png", strip, "coupon")
+    with pytest.raises(ValueError):
+        pipeline.variants("footer", strip, "coupon")
+
+    # Same master: served from the memory cache, then from disk in a new run
+    assert pipeline.variants("strip", strip, "coupon") == variants
+    assert len(list(tmp_path.iterdir())) == 6
+    reloaded = ImagePipeline(cache_dir=tmp_path).variants("strip", strip, "coupon")
+    assert {name: asset.sha1 for name, asset in reloaded.items()} == {
+        name: asset.sha1 for name, asset in variants.items()
+    }
+
+
+def test_add_to_pass(signer):
+    pipeline = ImagePipeline()
+    apple_pass = ApplePass(EventTicket())
+    # The test masters are smaller than the @3x sizes
+    with pytest.warns(UserWarning, match="icon master is 29x29"):
+        pipeline.add_to(apple_pass, "icon", f"{BASE_PATH}/icon.png")
+    with pytest.warns(UserWarning):
+        pipeline.add_to(apple_pass, "logo", open(f"{BASE_PATH}/logo.png", "rb"))
+
+    archive = zipfile.ZipFile(apple_pass.create(signer=signer))
+    assert Image.open(io.BytesIO(archive.read("icon@3x.png"))).size == (29, 29)
+    assert Image.open(io.BytesIO(archive.read("icon.png"))).size == (29, 29)
+    assert Image.open(io.BytesIO(archive.read("logo.png"))).size == (50, 50)
+    assert Image.open(io.BytesIO(archive.read("logo@2x.png"))).size == (50, 50)
+    with pytest.raises(ValueError):
+        pipeline.add_to(ApplePass(Coupon()), "thumbnail", f"{BASE_PATH}/logo.png")
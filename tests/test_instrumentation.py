@@ -0,0 +1,41 @@
+import io
+import pickle
+import zipfile
+
+from applepassgenerator.apple_pass import ApplePass
+from applepassgenerator.instrumentation import STAGES, Instrumentation, StageStats
+from applepassgenerator.models import EventTicket
+
+BASE_PATH = 'tests'
+
+
+def test_create_reports_every_stage(signer, capsys):
+    calls = []
+    stats = StageStats(callback=lambda *args: calls.append(args))
+    apple_pass = ApplePass(EventTicket(), signer=signer, instrumentation=stats)
+    apple_pass.add_file("icon.png", open(f"{BASE_PATH}/icon.png", "rb"))
+    zip_file = apple_pass.create()
+
+    assert [stage for stage, _, _ in calls] == list(STAGES)
+    summary = stats.summary()
+    assert summary["create_zip"]["bytes"] == len(zip_file.getvalue())
+    assert summary["create_signature"]["count"] == 1
+    # Nothing is printed on the hot path anymore
+    ApplePass(EventTicket(), signer=signer).create(instrumentation=Instrumentation())
+    assert capsys.readouterr().out == ""
+    assert zipfile.ZipFile(zip_file).testzip() is None
+
+
+def test_streaming_is_measured_and_not_pickled(signer):
+    calls = []
+    apple_pass = ApplePass(
+        EventTicket(), signer=signer, instrumentation=Instrumentation(lambda *args: calls.append(args))
+    )
+    sink = io.BytesIO()
+    apple_pass.stream(sink)
+    data = b"".join(apple_pass.iter_chunks())
+    assert [stage for stage, _, _ in calls] == list(STAGES) * 2
+    assert calls[3][2] == len(sink.getvalue()) and calls[7][2] == len(data)
+
+    # Lambdas can't be pickled, process workers get the pass without it
+    assert pickle.loads(pickle.dumps(apple_pass)).instrumentation is None
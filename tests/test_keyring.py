@@ -0,0 +1,65 @@
+import threading
+import time
+import zipfile
+
+from applepassgenerator.client import ApplePassGeneratorClient
+from applepassgenerator.keyring import Credentials, Keyring
+from applepassgenerator.models import EventTicket
+
+BASE_PATH = 'tests'
+
+
+def credentials(pass_type_identifier):
+    return Credentials(
+        f"{BASE_PATH}/certs/out/signerCert.pem",
+        f"{BASE_PATH}/certs/out/signerKey.pem",
+        f"{BASE_PATH}/certs/out/wwdr.pem",
+        "test",
+        team_identifier=f"TEAM-{pass_type_identifier[-1]}",
+    )
+
+
+def test_keyring_loads_lazily_once_and_evicts():
+    loaded = []
+
+    def loader(pass_type_identifier):
+        loaded.append(pass_type_identifier)
+        return credentials(pass_type_identifier)
+
+    keyring = Keyring(loader, max_signers=1)
+    signers = []
+    threads = [threading.Thread(target=lambda: signers.append(keyring.get_signer("pass.a"))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len({id(signer) for signer in signers}) == 1
+    assert loaded == ["pass.a"]
+
+    keyring.get_signer("pass.b")
+    assert keyring.get_signer("pass.a") is not signers[0]
+
+    keyring.ttl = 0
+    first = keyring.get_signer("pass.c")
+    time.sleep(0.01)
+    assert keyring.get_signer("pass.c") is not first
+
+    keyring.ttl = None
+    first = keyring.get_signer("pass.d")
+    time.sleep(0.01)
+    assert keyring.get_signer("pass.d") is first
+
+
+def test_client_signs_each_tenant_with_its_keyring_signer():
+    keyring = Keyring()
+    keyring.add("pass.com.tenant.1", credentials("pass.com.tenant.1"))
+    keyring.add("pass.com.tenant.2", credentials("pass.com.tenant.2"))
+    client = ApplePassGeneratorClient("65QNR2XSA2", "pass.com.tenant.1", "Platform", keyring=keyring)
+
+    apple_pass = client.get_pass(EventTicket(), pass_type_identifier="pass.com.tenant.2")
+    assert apple_pass.team_identifier == "TEAM-2"
+    assert zipfile.ZipFile(apple_pass.create()).testzip() is None
+
+    passes = [client.get_pass(EventTicket(), pass_type_identifier=f"pass.com.tenant.{i % 2 + 1}") for i in range(4)]
+    for executor in ("thread", "process"):
+        assert len(list(client.generate_many(passes, executor=executor, max_workers=2))) == 4
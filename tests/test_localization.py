@@ -0,0 +1,40 @@
+import io
+import json
+import zipfile
+
+from applepassgenerator.apple_pass import ApplePass
+from applepassgenerator.localization import Localization, compile_strings
+from applepassgenerator.models import EventTicket
+
+BASE_PATH = 'tests'
+
+
+def test_compile_strings():
+    data = compile_strings({"SEAT": "Siège", "NOTE": 'Say "hi"\nto us'})
+    assert data.startswith(b"\xff\xfe")
+    assert data.decode("utf-16") == '"NOTE" = "Say \\"hi\\"\\nto us";\n"SEAT" = "Siège";\n'
+
+
+def test_localizations_are_shared_by_passes(signer):
+    localizations = [
+        Localization("en", {"SEAT": "Seat"}),
+        Localization("fr", {"SEAT": "Siège"}, {"logo.png": f"{BASE_PATH}/logo.png"}),
+    ]
+    # Image files are hashed once, when the localization is built
+    assert localizations[1].files["fr.lproj/logo.png"]._sha1 is not None
+
+    passes = []
+    for seat in ("A1", "A2"):
+        card_info = EventTicket()
+        card_info.add_primary_field("seat", seat, "SEAT")
+        apple_pass = ApplePass(card_info, pass_type_identifier="pass.com.opassity.app")
+        for localization in localizations:
+            apple_pass.add_localization(localization)
+        passes.append(apple_pass)
+    assert passes[0]._files["fr.lproj/pass.strings"] is passes[1]._files["fr.lproj/pass.strings"]
+
+    archive = zipfile.ZipFile(io.BytesIO(passes[0].create(signer=signer).getvalue()))
+    assert archive.read("fr.lproj/pass.strings").decode("utf-16") == '"SEAT" = "Siège";\n'
+    assert archive.read("fr.lproj/logo.png") == open(f"{BASE_PATH}/logo.png", "rb").read()
+    manifest = json.loads(archive.read("manifest.json"))
+    assert set(manifest) == {"pass.json", "en.lproj/pass.strings", "fr.lproj/pass.strings", "fr.lproj/logo.png"}
@@ -0,0 +1,51 @@
+import io
+import zipfile
+
+import pytest
+
+from applepassgenerator.client import ApplePassGeneratorClient
+from applepassgenerator.models import EventTicket
+from applepassgenerator.signer import BaseSigner, Signer, load_certificate, load_private_key
+
+BASE_PATH = 'tests'
+CERTIFICATE_PATH = f"{BASE_PATH}/certs/out/signerCert.pem"
+KEY_PATH = f"{BASE_PATH}/certs/out/signerKey.pem"
+WWDR_CERTIFICATE_PATH = f"{BASE_PATH}/certs/out/wwdr.pem"
+CERTIFICATE_PASSWORD = "test"
+
+
+def test_signer_accepts_paths_bytes_and_objects():
+    from_paths = Signer(CERTIFICATE_PATH, KEY_PATH, WWDR_CERTIFICATE_PATH, CERTIFICATE_PASSWORD)
+    with open(CERTIFICATE_PATH, "rb") as fd:
+        cert_bytes = fd.read()
+    with open(KEY_PATH, "rb") as fd:
+        key_bytes = fd.read()
+    from_bytes = Signer(cert_bytes, key_bytes, WWDR_CERTIFICATE_PATH, b"test")
+    from_objects = Signer(
+        load_certificate(CERTIFICATE_PATH),
+        load_private_key(KEY_PATH, CERTIFICATE_PASSWORD),
+        from_paths.wwdr_certificate,
+    )
+    assert from_paths.certificate == from_bytes.certificate == from_objects.certificate
+    assert from_objects.key is not None
+    assert from_paths.sign('{"pass.json": "abc"}')
+
+
+def test_client_signer_is_used_by_create():
+    signer = Signer(CERTIFICATE_PATH, KEY_PATH, WWDR_CERTIFICATE_PATH, CERTIFICATE_PASSWORD)
+    client = ApplePassGeneratorClient("65QNR2XSA2", "pass.com.opassity.app", "Opassity", signer=signer)
+    card_info = EventTicket()
+    card_info.add_primary_field("event-name", "Test Event", "EVENT")
+    apple_pass = client.get_pass(card_info)
+    apple_pass.add_file("icon.png", open(f"{BASE_PATH}/icon.png", "rb"))
+
+    archive = zipfile.ZipFile(io.BytesIO(apple_pass.create().getvalue()))
+    assert set(archive.namelist()) == {"signature", "manifest.json", "pass.json", "icon.png"}
+
+
+def test_signers_must_implement_sign():
+    class IncompleteSigner(BaseSigner):
+        pass
+
+    with pytest.raises(TypeError):
+        IncompleteSigner()
@@ -0,0 +1,81 @@
+import asyncio
+import os
+import pickle
+import socket
+import stat
+import struct
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from applepassgenerator.apple_pass import ApplePass
+from applepassgenerator.models import EventTicket
+from applepassgenerator.signing_daemon import RemoteSigner, SigningDaemon
+from applepassgenerator.verify import PassVerifier
+
+BASE_PATH = 'tests'
+
+
+@pytest.fixture(params=["thread", "process"])
+def daemon(signer, request, tmp_path):
+    daemon = SigningDaemon(signer, str(tmp_path / "sign.sock"), workers=2, executor=request.param)
+    thread = threading.Thread(target=asyncio.run, args=(daemon.serve(),))
+    thread.start()
+    assert daemon.ready.wait(10)
+    yield daemon
+    daemon.stop()
+    thread.join(10)
+
+
+def test_remote_signer(daemon):
+    remote_signer = RemoteSigner(daemon.path, pool_size=3)
+    assert remote_signer.fingerprint == daemon.signer.fingerprint
+
+    apple_pass = ApplePass(EventTicket(), signer=remote_signer)
+    apple_pass.add_file("icon.png", open(f"{BASE_PATH}/icon.png", "rb"))
+    verifier = PassVerifier([f"{BASE_PATH}/certs/out/wwdr.pem"])
+    assert verifier.verify(apple_pass.create().getvalue()) == []
+
+    manifests = [f'{{"pass.json": "{i}"}}' for i in range(20)]
+    assert len(remote_signer.sign_many(manifests)) == 20
+    with ThreadPoolExecutor(8) as executor:
+        assert all(executor.map(remote_signer.sign, manifests))
+    # Manifests sent together are signed in fewer batches
+    assert daemon.batches < daemon.signatures
+
+    # Pickled signers (batch workers) open their own connections
+    assert pickle.loads(pickle.dumps(remote_signer)).sign(manifests[0])
+    remote_signer.close()
+
+
+def test_daemon_socket_is_private_and_never_taken_over(daemon, tmp_path):
+    assert stat.S_IMODE(os.stat(daemon.path).st_mode) == 0o600
+    with pytest.raises(RuntimeError):
+        asyncio.run(SigningDaemon(daemon.signer, daemon.path, executor="thread").serve())
+    assert RemoteSigner(daemon.path).fingerprint == daemon.signer.fingerprint
+
+    not_a_socket = tmp_path / "file"
+    not_a_socket.write_bytes(b"data")
+    with pytest.raises(RuntimeError):
+        asyncio.run(SigningDaemon(daemon.signer, str(not_a_socket), executor="thread").serve())
+    assert not_a_socket.read_bytes() == b"data"
+
+
+def test_oversized_requests_close_the_connection(daemon):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(10)
+        sock.connect(daemon.path)
+        sock.sendall(struct.pack(">I", daemon.max_frame + 1))
+        assert sock.recv(1) == b""
+
+
+@pytest.mark.parametrize("body", [b"S\x00\x00", b"S" + struct.pack(">I", 100) + b"manifest"])
+def test_malformed_requests_close_the_connection(daemon, body):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(10)
+        sock.connect(daemon.path)
+        sock.sendall(struct.pack(">I", len(body)) + body)
+        assert sock.recv(1) == b""
+    assert daemon.signatures == 0
+    assert RemoteSigner(daemon.path).sign("{}")
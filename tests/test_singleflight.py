@@ -0,0 +1,92 @@
+import asyncio
+import threading
+import zipfile
+from io import BytesIO
+
+import pytest
+
+from applepassgenerator.client import ApplePassGeneratorClient
+from applepassgenerator.models import EventTicket
+from applepassgenerator.singleflight import CoalescingClient, SingleFlight
+
+BASE_PATH = 'tests'
+
+
+def test_threads_share_one_call():
+    requested = threading.Semaphore(0)
+    single_flight = SingleFlight(callback=lambda key, coalesced: requested.release())
+    release = threading.Event()
+    calls = []
+
+    def generate(value):
+        calls.append(value)
+        release.wait()
+        return value * 2
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(single_flight.do("key", generate, 21)))
+        for _ in range(5)
+    ]
+    for thread in threads:
+        thread.start()
+    for _ in threads:
+        assert requested.acquire(timeout=10)
+    release.set()
+    for thread in threads:
+        thread.join(10)
+
+    assert results == [42] * 5 and calls == [21]
+    assert single_flight.stats() == {"requests": 5, "executions": 1, "coalesced": 4, "in_flight": 0}
+
+    def fail():
+        raise KeyError("boom")
+
+    with pytest.raises(KeyError):
+        single_flight.do("key", fail)
+    assert single_flight.do("key", generate, 1) == 2
+
+
+def test_tasks_share_one_call():
+    single_flight = SingleFlight()
+    calls = []
+
+    async def generate(value):
+        calls.append(value)
+        await asyncio.sleep(0.01)
+        return value * 2
+
+    async def main():
+        first = asyncio.ensure_future(single_flight.do_async("key", generate, 1))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await asyncio.gather(*(single_flight.do_async("key", generate, 1) for _ in range(3)))
+
+    assert asyncio.run(main()) == [2, 2, 2]
+    assert calls == [1]
+    assert single_flight.coalesced == 3 and single_flight.in_flight == 0
+
+
+def test_coalescing_client(signer):
+    client = CoalescingClient(
+        ApplePassGeneratorClient("65QNR2XSA2", "pass.com.opassity.app", "Opassity", signer=signer)
+    )
+
+    def get_pass(seat):
+        card_info = EventTicket()
+        card_info.add_primary_field("seat", seat, "SEAT")
+        apple_pass = client.get_pass(card_info)
+        apple_pass.serial_number = "ticket-1"
+        return apple_pass
+
+    assert client.key(get_pass("A1")) == client.key(get_pass("A1"))
+    assert client.key(get_pass("A1")) != client.key(get_pass("A2"))
+
+    async def main():
+        return await asyncio.gather(*(client.create_pass_async(get_pass("A1")) for _ in range(4)))
+
+    archives = asyncio.run(main())
+    assert len(set(archives)) == 1
+    assert zipfile.ZipFile(BytesIO(archives[0])).testzip() is None
+    assert client.create_pass(get_pass("A1"), version=1)
+    assert client.single_flight.stats()["executions"] == 2
@@ -0,0 +1,45 @@
+import asyncio
+import io
+import zipfile
+
+from applepassgenerator.apple_pass import ApplePass
+from applepassgenerator.models import EventTicket
+
+BASE_PATH = 'tests'
+
+
+def build_pass(signer):
+    apple_pass = ApplePass(EventTicket(), signer=signer)
+    apple_pass.add_file("icon.png", open(f"{BASE_PATH}/icon.png", "rb"))
+    return apple_pass
+
+
+class AsyncSink(object):
+    def __init__(self):
+        self.chunks = []
+        self.drained = 0
+
+    async def write(self, chunk):
+        self.chunks.append(chunk)
+
+    async def drain(self):
+        self.drained += 1
+
+
+def test_stream_and_iter_chunks(signer):
+    sink = io.BytesIO()
+    build_pass(signer).stream(sink)
+    assert zipfile.ZipFile(sink).testzip() is None
+
+    chunks = list(build_pass(signer).iter_chunks())
+    assert len(chunks) > 1
+    assert zipfile.ZipFile(io.BytesIO(b"".join(chunks))).namelist() == [
+        "signature", "manifest.json", "pass.json", "icon.png"
+    ]
+
+
+def test_stream_async(signer):
+    sink = AsyncSink()
+    asyncio.run(build_pass(signer).stream_async(sink))
+    assert sink.drained == len(sink.chunks)
+    assert zipfile.ZipFile(io.BytesIO(b"".join(sink.chunks))).testzip() is None
@@ -0,0 +1,79 @@
+import decimal
+import io
+import json
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from applepassgenerator.apple_pass import ApplePass
+from applepassgenerator.cache import MemoryPassCache
+from applepassgenerator.models import EventTicket
+from applepassgenerator.template import PassTemplate, Placeholder
+from applepassgenerator.utils import Barcode, BarcodeFormat
+
+
+def build_pass(serial, seat, message, price):
+    card_info = EventTicket()
+    card_info.add_primary_field("event-name", "Test Event", "EVENT")
+    card_info.add_secondary_field("seat", seat, "SEAT")
+    card_info.add_auxiliary_field("price", price, "PRICE")
+    apple_pass = ApplePass(
+        card_info,
+        pass_type_identifier="pass.com.opassity.app",
+        organization_name="Opassity",
+        team_identifier="65QNR2XSA2",
+    )
+    apple_pass.serial_number = serial
+    apple_pass.description = "Opassity Event"
+    apple_pass.barcode = Barcode(message, BarcodeFormat.QR)
+    return apple_pass
+
+
+VALUES = [
+    {"serial": "abc-1", "seat": "A1", "message": '{"id": 1}', "price": 10},
+    {"serial": "abc-2", "seat": "Siège \"B\"\n2", "message": "ünïcode", "price": decimal.Decimal("9.50")},
+]
+
+
+@pytest.mark.parametrize("values", VALUES)
+def test_render_is_byte_identical_to_normal_path(values):
+    template = PassTemplate(
+        build_pass(Placeholder("serial"), Placeholder("seat"), Placeholder("message"), Placeholder("price"))
+    )
+    expected = build_pass(values["serial"], values["seat"], values["message"], values["price"])
+
+    assert template.placeholders == {"serial", "seat", "message", "price"}
+    assert template.render(values) == expected._create_pass_json()
+
+
+def test_create_from_template(signer):
+    apple_pass = build_pass(Placeholder("serial"), "A1", Placeholder("message"), 10)
+    apple_pass.signer = signer
+    template = PassTemplate(apple_pass)
+
+    with pytest.raises(KeyError):
+        template.render({"serial": "abc-1"})
+    data = template.create({"serial": "abc-1", "message": "hello"}).getvalue()
+    assert b'"serialNumber": "abc-1"' in zipfile.ZipFile(io.BytesIO(data)).read("pass.json")
+
+
+def test_threaded_renders_with_cache(signer):
+    apple_pass = build_pass(Placeholder("serial"), Placeholder("seat"), "message", 10)
+    apple_pass.signer = signer
+    apple_pass.cache = MemoryPassCache()
+    template = PassTemplate(apple_pass)
+    state = dict(apple_pass.__dict__)
+
+    def render(index):
+        values = {"serial": f"abc-{index % 20}", "seat": f"A{index % 20}"}
+        archive = zipfile.ZipFile(template.create(values))
+        return values, json.loads(archive.read("pass.json")), json.loads(archive.read("manifest.json"))
+
+    with ThreadPoolExecutor(8) as executor:
+        for values, pass_json, manifest in executor.map(render, range(200)):
+            assert pass_json["serialNumber"] == values["serial"]
+            assert pass_json["eventTicket"]["secondaryFields"][0]["value"] == values["seat"]
+            assert set(manifest) == {"pass.json"}
+    # Renders leave the template pass untouched
+    assert apple_pass.__dict__ == state
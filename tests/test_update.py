@@ -0,0 +1,69 @@
+import hashlib
+import json
+import zipfile
+
+from applepassgenerator.archive import ZIP_DEFLATED, read_entries
+from applepassgenerator.client import ApplePassGeneratorClient
+from applepassgenerator.models import EventTicket
+
+BASE_PATH = 'tests'
+
+
+def test_update_pass_rewrites_only_pass_json_manifest_and_signature(signer, tmp_path):
+    client = ApplePassGeneratorClient(
+        "65QNR2XSA2", "pass.com.opassity.app", "Opassity", signer=signer, compression=ZIP_DEFLATED
+    )
+    card_info = EventTicket()
+    card_info.add_primary_field("gate", "A1", "GATE")
+    card_info.add_secondary_field("seat", "12", "SEAT")
+    apple_pass = client.get_pass(card_info)
+    apple_pass.add_file("icon.png", open(f"{BASE_PATH}/icon.png", "rb"))
+    source = tmp_path / "original.pkpass"
+    apple_pass.create(zip_file=str(source))
+
+    updated = client.update_pass(
+        str(source),
+        changes={"voided": True},
+        fields={"gate": "B7", "seat": {"value": "14", "changeMessage": "Seat %@"}},
+    )
+
+    archive = zipfile.ZipFile(updated)
+    assert archive.testzip() is None
+    pass_json = archive.read("pass.json")
+    pass_data = json.loads(pass_json)
+    assert pass_data["voided"] is True
+    assert pass_data["eventTicket"]["primaryFields"][0]["value"] == "B7"
+    assert pass_data["eventTicket"]["secondaryFields"][0]["changeMessage"] == "Seat %@"
+    manifest = json.loads(archive.read("manifest.json"))
+    assert manifest["pass.json"] == hashlib.sha1(pass_json).hexdigest()
+
+    original_icon = [e for e in read_entries(str(source)) if e.name == "icon.png"][0]
+    updated_icon = [e for e in read_entries(updated.getvalue()) if e.name == "icon.png"][0]
+    assert updated_icon.payload == original_icon.payload
+    assert updated_icon.header == original_icon.header
+
+
+def test_updated_pass_matches_a_fresh_one_but_the_signature(signer):
+    client = ApplePassGeneratorClient(
+        "65QNR2XSA2", "pass.com.opassity.app", "Opassity", signer=signer,
+        compression=ZIP_DEFLATED, compresslevel=9, deterministic=True,
+    )
+
+    def build(gate, voided=None, background_color=None):
+        card_info = EventTicket()
+        card_info.add_primary_field("gate", gate, "GATE")
+        apple_pass = client.get_pass(card_info)
+        apple_pass.serial_number = "serial-1"
+        apple_pass.voided = voided
+        apple_pass.background_color = background_color
+        apple_pass.add_file("icon.png", open(f"{BASE_PATH}/icon.png", "rb"))
+        return apple_pass.create().getvalue()
+
+    # New top level keys land where a fresh pass has them
+    changes = {"voided": True, "backgroundColor": "rgb(0, 0, 0)"}
+    updated = client.update_pass(build("A1"), changes=changes, fields={"gate": "B7"})
+    updated = read_entries(updated.getvalue())
+    fresh = read_entries(build("B7", voided=True, background_color="rgb(0, 0, 0)"))
+    assert [e.name for e in updated] == [e.name for e in fresh]
+    for updated_entry, fresh_entry in zip(updated[1:], fresh[1:]):
+        assert updated_entry.header + updated_entry.payload == fresh_entry.header + fresh_entry.payload
@@ -0,0 +1,44 @@
+import json
+
+import pytest
+
+from applepassgenerator.apple_pass import ApplePass, pass_handler
+from applepassgenerator.models import EventTicket
+from applepassgenerator.utils import Barcode, BarcodeFormat, CurrencyField, DateField, Field, Location, NumberField
+
+
+def test_json_dict_key_order_and_optional_keys():
+    assert list(DateField("start", "2024-05-11", "START").json_dict()) == [
+        "key", "value", "label", "changeMessage", "textAlignment", "dateStyle", "timeStyle", "isRelative"
+    ]
+    assert DateField("start", "2024-05-11", ignores_time_zone=True).json_dict()["ignoresTimeZone"] is True
+    assert list(CurrencyField("price", 10, currency_code="USD").json_dict())[-2:] == ["numberStyle", "currencyCode"]
+    assert "altText" not in Barcode("message").json_dict()
+    assert Barcode("message", alt_text="alt").json_dict()["altText"] == "alt"
+    assert Location("1.5", None).json_dict() == {
+        "latitude": 1.5, "longitude": 0.0, "altitude": 0.0, "distance": None, "relevantText": ""
+    }
+
+
+def test_optional_field_keys():
+    field = NumberField("points", 10, "POINTS")
+    field.attributedValue = "<a href='https://example.com'>10</a>"
+    field.dataDetectorTypes = []
+    field.row = 1
+    assert list(field.json_dict())[-4:] == ["numberStyle", "attributedValue", "dataDetectorTypes", "row"]
+    assert "semantics" not in field.json_dict()
+
+
+def test_stray_attributes_are_rejected():
+    field = Field("key", "value")
+    with pytest.raises(AttributeError):
+        field.unknown = True
+    assert not hasattr(field, "__dict__")
+
+
+def test_legacy_barcode_for_new_formats():
+    apple_pass = ApplePass(EventTicket())
+    apple_pass.barcode = Barcode("message", BarcodeFormat.CODE128)
+    pass_json = json.loads(json.dumps(apple_pass, default=pass_handler))
+    assert pass_json["barcode"]["format"] == BarcodeFormat.PDF417
+    assert pass_json["barcodes"][0]["format"] == BarcodeFormat.CODE128
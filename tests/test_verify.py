@@ -0,0 +1,117 @@
+import datetime
+import io
+import struct
+import zipfile
+
+import pytest
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.hazmat.primitives.serialization import pkcs7
+
+from applepassgenerator.apple_pass import ApplePass
+from applepassgenerator.models import EventTicket
+from applepassgenerator.signer import load_certificate, load_private_key
+from applepassgenerator.verify import PassVerifier, verify_tree
+
+BASE_PATH = 'tests'
+
+
+@pytest.fixture(scope="module")
+def pkpass(signer):
+    apple_pass = ApplePass(EventTicket(), pass_type_identifier="pass.com.opassity.app", signer=signer)
+    apple_pass.add_file("icon.png", open(f"{BASE_PATH}/icon.png", "rb"))
+    return apple_pass.create().getvalue()
+
+
+def rewrite(pkpass, name, data):
+    source = zipfile.ZipFile(io.BytesIO(pkpass))
+    output = io.BytesIO()
+    with zipfile.ZipFile(output, "w") as archive:
+        for info in source.infolist():
+            archive.writestr(info.filename, data if info.filename == name else source.read(info))
+    return output.getvalue()
+
+
+def test_valid_pass(pkpass):
+    verifier = PassVerifier([f"{BASE_PATH}/certs/out/wwdr.pem"])
+    assert verifier.verify(pkpass) == []
+    assert PassVerifier([f"{BASE_PATH}/certs/out/signerCert.pem"]).verify(pkpass) == [
+        "signature: untrusted signer certificate"
+    ]
+
+
+def test_tampered_passes(pkpass):
+    verifier = PassVerifier([f"{BASE_PATH}/certs/out/wwdr.pem"])
+    assert verifier.verify(rewrite(pkpass, "icon.png", b"other")) == ["icon.png: SHA1 mismatch"]
+    manifest = zipfile.ZipFile(io.BytesIO(pkpass)).read("manifest.json").replace(b"{", b'{"extra.png": "0", ', 1)
+    assert verifier.verify(rewrite(pkpass, "manifest.json", manifest)) == [
+        "extra.png: in manifest but missing",
+        "signature: manifest digest mismatch",
+    ]
+
+
+def test_verify_tree(pkpass, tmp_path):
+    (tmp_path / "nested").mkdir()
+    (tmp_path / "good.pkpass").write_bytes(pkpass)
+    (tmp_path / "nested" / "bad.pkpass").write_bytes(rewrite(pkpass, "icon.png", b"other"))
+    (tmp_path / "nested" / "broken.pkpass").write_bytes(b"not a zip")
+
+    verifier = PassVerifier([f"{BASE_PATH}/certs/out/wwdr.pem"])
+    failures = list(verify_tree(str(tmp_path), verifier, max_workers=2, chunk_size=1))
+    assert sorted(r.path.rsplit("/", 1)[-1] for r in failures) == ["bad.pkpass", "broken.pkpass"]
+    assert len(list(verify_tree(str(tmp_path), verifier, failures_only=False, executor="thread"))) == 3
+
+
+def test_verifier_requires_trusted_certificates():
+    with pytest.raises(ValueError):
+        PassVerifier([])
+
+
+def test_signer_issued_by_a_leaf_is_rejected(pkpass):
+    leaf = load_certificate(f"{BASE_PATH}/certs/out/signerCert.pem")
+    leaf_key = load_private_key(f"{BASE_PATH}/certs/out/signerKey.pem", "test")
+    forged_key = ec.generate_private_key(ec.SECP256R1())
+    now = datetime.datetime.now(datetime.timezone.utc)
+    forged = (
+        x509.CertificateBuilder()
+        .subject_name(leaf.subject)
+        .issuer_name(leaf.subject)
+        .public_key(forged_key.public_key())
+        .serial_number(leaf.serial_number)
+        .not_valid_before(now - datetime.timedelta(days=1))
+        .not_valid_after(now + datetime.timedelta(days=1))
+        .sign(leaf_key, hashes.SHA256())
+    )
+    manifest = zipfile.ZipFile(io.BytesIO(pkpass)).read("manifest.json")
+    signature = (
+        pkcs7.PKCS7SignatureBuilder()
+        .set_data(manifest)
+        .add_signer(forged, forged_key, hashes.SHA256())
+        .add_certificate(leaf)
+        .sign(pkcs7.serialization.Encoding.DER, [pkcs7.PKCS7Options.DetachedSignature, pkcs7.PKCS7Options.Binary])
+    )
+
+    verifier = PassVerifier([f"{BASE_PATH}/certs/out/wwdr.pem"])
+    assert verifier.verify(rewrite(pkpass, "signature", signature)) == ["signature: untrusted signer certificate"]
+
+
+def test_pinned_pass_type(pkpass):
+    wwdr = f"{BASE_PATH}/certs/out/wwdr.pem"
+    assert PassVerifier([wwdr], pass_type_identifier="pass.com.opassity.app").verify(pkpass) == []
+    assert PassVerifier([wwdr], pass_type_identifier="pass.com.other").verify(pkpass) == [
+        "pass.json: unexpected pass type 'pass.com.opassity.app'",
+        "signature: signer of another pass type",
+    ]
+
+
+def test_corrupted_header_offset_is_reported(pkpass, tmp_path):
+    # Point the first central directory entry past the end of the archive
+    data = bytearray(pkpass)
+    central = data.index(b"PK\x01\x02")
+    struct.pack_into("<L", data, central + 42, len(data) - 10)
+    (tmp_path / "corrupt.pkpass").write_bytes(bytes(data))
+
+    verifier = PassVerifier([f"{BASE_PATH}/certs/out/wwdr.pem"])
+    failures = list(verify_tree(str(tmp_path), verifier, executor="thread"))
+    assert len(failures) == 1 and failures[0].errors[0].startswith("unreadable archive: Bad local header")
@@ -0,0 +1,130 @@
+import http.client
+import io
+import json
+import threading
+import zipfile
+from wsgiref.simple_server import WSGIRequestHandler, make_server
+
+import pytest
+
+from applepassgenerator.cache import MemoryPassCache
+from applepassgenerator.client import ApplePassGeneratorClient
+from applepassgenerator.models import EventTicket
+from applepassgenerator.signer import BaseSigner
+from applepassgenerator.webservice import PassRegistry, PassWebService
+
+BASE_PATH = 'tests'
+PASS_TYPE = "pass.com.opassity.app"
+AUTH = {"Authorization": "ApplePass secret-token"}
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+def build_pass(client, gate):
+    card_info = EventTicket()
+    card_info.add_primary_field("gate", gate, "GATE")
+    apple_pass = client.get_pass(card_info)
+    apple_pass.serial_number = "serial-1"
+    apple_pass.web_service_url = "http://localhost/"
+    apple_pass.authentication_token = "secret-token"
+    return apple_pass
+
+
+@pytest.fixture
+def service(signer, tmp_path):
+    client = ApplePassGeneratorClient("65QNR2XSA2", PASS_TYPE, "Opassity", signer=signer)
+    renders = []
+
+    def renderer(pass_type_identifier, serial_number):
+        renders.append(serial_number)
+        return build_pass(client, "A1")
+
+    service = PassWebService(
+        PassRegistry(str(tmp_path / "passes.sqlite")), MemoryPassCache(), renderer, signer
+    )
+    server = make_server("127.0.0.1", 0, service, handler_class=QuietHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield service, client, renders, server.server_port
+    server.shutdown()
+
+
+def request(port, method, path, body=None, headers=None):
+    connection = http.client.HTTPConnection("127.0.0.1", port)
+    connection.request(method, path, body=json.dumps(body) if body else None, headers=headers or {})
+    response = connection.getresponse()
+    return response.status, dict(response.getheaders()), response.read()
+
+
+def test_registration_updates_and_conditional_pass_delivery(service):
+    service, client, renders, port = service
+    assert service.publish(build_pass(client, "A1")) is True
+    assert service.publish(build_pass(client, "A1")) is False
+
+    path = f"/v1/devices/device-1/registrations/{PASS_TYPE}/serial-1"
+    assert request(port, "POST", path, {"pushToken": "push-1"})[0] == 401
+    assert request(port, "POST", path, {"pushToken": "push-1"}, AUTH)[0] == 201
+    assert request(port, "POST", path, {"pushToken": "push-2"}, AUTH)[0] == 200
+    assert service.registry.push_tokens(PASS_TYPE, "serial-1") == ["push-2"]
+
+    status, _, body = request(port, "GET", f"/v1/devices/device-1/registrations/{PASS_TYPE}")
+    tag = json.loads(body)["lastUpdated"]
+    assert status == 200 and json.loads(body)["serialNumbers"] == ["serial-1"]
+    since = f"/v1/devices/device-1/registrations/{PASS_TYPE}?passesUpdatedSince={tag}"
+    assert request(port, "GET", since)[0] == 204
+
+    status, headers, body = request(port, "GET", f"/v1/passes/{PASS_TYPE}/serial-1", headers=AUTH)
+    assert status == 200 and headers["Content-Type"] == "application/vnd.apple.pkpass"
+    assert zipfile.ZipFile(io.BytesIO(body)).testzip() is None
+    conditional = dict(AUTH, **{"If-Modified-Since": headers["Last-Modified"]})
+    assert request(port, "GET", f"/v1/passes/{PASS_TYPE}/serial-1", headers=conditional)[0] == 304
+    conditional = dict(AUTH, **{"If-None-Match": headers["ETag"]})
+    assert request(port, "GET", f"/v1/passes/{PASS_TYPE}/serial-1", headers=conditional)[0] == 304
+    assert renders == []
+
+    assert service.publish(build_pass(client, "B7")) is True
+    status, _, body = request(port, "GET", since)
+    assert status == 200 and json.loads(body)["serialNumbers"] == ["serial-1"]
+    # Republished within the same second, Last-Modified still changes
+    conditional = dict(AUTH, **{"If-Modified-Since": headers["Last-Modified"]})
+    assert request(port, "GET", f"/v1/passes/{PASS_TYPE}/serial-1", headers=conditional)[0] == 200
+    assert request(port, "GET", f"/v1/passes/{PASS_TYPE}/serial-1", headers={"Authorization": "ApplePass wrong"})[0] == 401
+
+    assert request(port, "DELETE", path, headers=AUTH)[0] == 200
+    assert request(port, "POST", "/v1/log", {"logs": ["message"]})[0] == 200
+
+
+def test_evicted_archives_are_rendered_again(service):
+    service, client, renders, port = service
+    service.publish(build_pass(client, "A1"))
+    service.cache = MemoryPassCache()
+
+    status, _, body = request(port, "GET", f"/v1/passes/{PASS_TYPE}/serial-1", headers=AUTH)
+    assert status == 200 and zipfile.is_zipfile(io.BytesIO(body))
+    assert renders == ["serial-1"]
+
+
+def test_passes_without_token_or_cache_key(service):
+    service, client, renders, port = service
+    with pytest.raises(ValueError):
+        service.registry.publish(PASS_TYPE, "serial-2", None, "etag")
+    with pytest.raises(ValueError):
+        service.registry.publish(PASS_TYPE, "serial-2", "token", None)
+
+    class HSMSigner(BaseSigner):
+        def __init__(self, signer):
+            self.signer = signer
+
+        def sign(self, manifest):
+            return self.signer.sign(manifest)
+
+    # Archives that create() can't cache are keyed by their own hash
+    service.signer = HSMSigner(service.signer)
+    assert service.publish(build_pass(client, "A1")) is True
+    service.cache = MemoryPassCache()
+    status, headers, body = request(port, "GET", f"/v1/passes/{PASS_TYPE}/serial-1", headers=AUTH)
+    assert status == 200 and renders == ["serial-1"]
+    assert service.cache.get(headers["ETag"].strip('"')) == body